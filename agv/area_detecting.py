@@ -3,28 +3,46 @@
 
 """
 작업영역 탐지 - 로봇팔 통합 (item_idx 지원)
+여러 물건 (item_idx 목록) 은 한 번의 탐지에서 보이는 마커를 모두 집어 적재 위치에 싣고, 배송 영역에서 한 번에 내림
 """
 
 import threading
 import time
-import cv2
 import numpy as np
 import sys
 import os
 
-# 로봇팔 제어 모듈 import
+# 로봇팔 제어 모듈 경로 (JBArm 은 서보 드라이버를 불러오므로 _init_robot_arm 에서 임포트)
 sys.path.append(os.path.join(os.path.dirname(__file__), 'control'))
-from control.JBArm import JBArm
 from control.BoxDetector import BoxDetector
 
 from config import *
+from camera_model import CameraModel
+from vision_pool import detect_zone
+from metrics import REGISTRY, LONG_TIME_BUCKETS
+from structured_logging import get_logger, WARNING
+
+log = get_logger(__name__)
+
+# 운행 시간 버킷 (초) - 10초 ~ 30분
+TRIP_TIME_BUCKETS = (10.0, 30.0, 60.0, 120.0, 180.0, 300.0, 600.0, 1200.0, 1800.0)
 
 class AreaDetection(threading.Thread):
-    def __init__(self, camera, road_following_controller=None):
-        super().__init__()
+    def __init__(self, camera, road_following_controller=None, camera_model=None, vision_pool=None,
+                 scene_detector=None):
+        super().__init__(name="area-detection")
         self.camera = camera
         self.road_following_controller = road_following_controller
         
+        # 비전 단계 공용 카메라 모델 (왜곡 보정 맵 / 스케일된 intrinsic)
+        self.camera_model = camera_model if camera_model is not None else CameraModel()
+        
+        # 프로세스 모드 (VISION_EXECUTION_MODE="process") - None 이면 이 스레드에서 직접 탐지
+        self.vision_pool = vision_pool
+        
+        # 정적 장면 생략 (scene_change.SceneChangeDetector, 조향과 공유) - None 이면 매번 탐지
+        self.scene_gate = scene_detector.gate("zone") if scene_detector is not None else None
+        
         self.th_flag = True
         self.is_active = False
         self.current_phase = 1  # 1: 집하장소, 2: 배송장소
@@ -33,8 +51,12 @@ class AreaDetection(threading.Thread):
         self.end_area_color = None
         self.grip_done = False
         
-        # 물건 인덱스
-        self.item_idx = 0
+        # 물건 인덱스 (이번 운행 대상 / 집은 물건 / 배송 완료 물건)
+        self.item_indices = [0]
+        self.picked_items = []
+        self.delivered_items = []
+        self.trip_started = None  # 운행 시작 시각 - 운행 식별 (완료 / 중단은 운행마다 한 번)
+        self._finish_lock = threading.Lock()
         
         # 로봇팔 및 물건 탐지 초기화
         self.robot_arm = None
@@ -43,19 +65,37 @@ class AreaDetection(threading.Thread):
         
         self.arrival_callback = None
         self.task_complete_callback = None
+        self.requeue_callback = None  # requeue_callback(물건 목록) - 집지 못한 물건을 작업 큐로 되돌림
+        
+        # 측정값 (영역 탐지 시간 / 마커 탐지 재시도 / 로봇팔 동작 시간)
+        self.zone_detection_time = REGISTRY.histogram("zone_detection_seconds", "작업영역 탐지 1회 처리 시간")
+        self.marker_detection_time = REGISTRY.histogram(
+            "marker_detection_seconds", "마커 탐지 전체 시간 (재시도 포함)", buckets=LONG_TIME_BUCKETS)
+        self.marker_retries = REGISTRY.counter("marker_detection_retries_total", "마커 미발견으로 인한 재시도 횟수")
+        self.marker_failures = REGISTRY.counter("marker_detection_failures_total", "모든 재시도 소진 횟수")
+        self.arm_durations = {
+            op: REGISTRY.histogram("arm_operation_seconds", "로봇팔 동작 시간",
+                                   labels={"op": op}, buckets=LONG_TIME_BUCKETS)
+            for op in ("pick", "place")
+        }
+        self.trip_time = REGISTRY.histogram(
+            "trip_seconds", "운행 1회 (탐지 시작 ~ 배송 완료) 시간", buckets=TRIP_TIME_BUCKETS)
+        self.items_delivered = REGISTRY.counter("items_delivered_total", "배송 완료 물건 수")
+        self.trip_items_per_hour = REGISTRY.gauge("trip_items_per_hour", "직전 운행의 시간당 배송 물건 수")
         
     def _init_robot_arm(self):
         """로봇팔 및 물건 탐지 시스템 초기화"""
         try:
             if ROBOT_ARM_ENABLED:
-                print("로봇팔 초기화 중...")
+                log.info("로봇팔 초기화 중...")
+                from control.JBArm import JBArm
                 self.robot_arm = JBArm()
-                self.box_detector = BoxDetector()
-                print("✅ 로봇팔 초기화 완료")
+                self.box_detector = BoxDetector(camera_model=self.camera_model)
+                log.info("✅ 로봇팔 초기화 완료")
             else:
-                print("⚠️ 로봇팔 비활성화됨")
+                log.warning("⚠️ 로봇팔 비활성화됨")
         except Exception as e:
-            print(f"❌ 로봇팔 초기화 실패: {e}")
+            log.error("❌ 로봇팔 초기화 실패: %s", e)
             self.robot_arm = None
             self.box_detector = None
         
@@ -66,76 +106,84 @@ class AreaDetection(threading.Thread):
                 continue
                 
             try:
+                trip_started = self.trip_started  # 이번 탐지가 속한 운행 (처리 도중 중단 / 다음 운행 시작 구분)
                 image_input = self.camera.value
                 if image_input is None:
                     time.sleep(AREA_DETECTION_INTERVAL)
                     continue
                     
-                hsv = cv2.cvtColor(image_input, cv2.COLOR_BGR2HSV)
-                hsv = cv2.blur(hsv, BLUR_KERNEL_SIZE)
+                color_info = self.start_area_color if self.current_phase == 1 else self.end_area_color
+                if self.scene_gate is not None:
+                    # 장면이 그대로면 마지막 탐지 결과 재사용 - 운행 / 단계가 바뀌면 다시 탐지
+                    arrived = self.scene_gate.process(
+                        image_input, lambda frame: self._timed_detect_area(frame, color_info),
+                        key=(self.trip_started, self.current_phase))
+                else:
+                    arrived = self._timed_detect_area(image_input, color_info)
                 
-                if self.current_phase == 1:
-                    self._detect_area(hsv, self.start_area_color, is_pickup=True)
-                elif self.current_phase == 2:
-                    self._detect_area(hsv, self.end_area_color, is_pickup=False)
+                # 도착 처리 (로봇팔 동작 포함) 는 탐지 시간 측정에서 제외
+                if arrived:
+                    if self.current_phase == 1 and not self.grip_done:
+                        self._handle_pickup_area(trip_started)
+                    elif self.current_phase == 2:
+                        self._handle_delivery_area(trip_started)
                     
             except Exception as e:
-                print(f"영역 탐지 오류: {e}")
+                log.throttled(5.0, WARNING, "영역 탐지 오류: %s", e)
                 
             time.sleep(AREA_DETECTION_INTERVAL)
     
-    def _detect_area(self, hsv, color_info, is_pickup=True):
-        """영역 탐지 및 로봇팔 동작"""
+    def _timed_detect_area(self, frame, color_info):
+        detect_start = time.monotonic()
+        arrived = self._detect_area(frame, color_info)
+        self.zone_detection_time.observe(time.monotonic() - detect_start)
+        return arrived
+    
+    def _detect_area(self, frame, color_info):
+        """영역 탐지 - 목표 영역 중심이 도착 범위 안이면 True"""
         if not color_info:
-            return
-            
-        mask = cv2.inRange(hsv, color_info['lower'], color_info['upper'])
-        mask = cv2.erode(mask, None, iterations=EROSION_ITERATIONS)
-        mask = cv2.dilate(mask, None, iterations=DILATION_ITERATIONS)
+            return False
         
-        contours, _ = cv2.findContours(mask.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        if self.vision_pool is not None:
+            center = self.vision_pool.detect_zone(frame, color_info)
+        else:
+            center = detect_zone(frame, color_info['lower'], color_info['upper'], self.camera_model)
         
-        if contours:
-            c = max(contours, key=cv2.contourArea)
-            area = cv2.contourArea(c)
-            
-            if area < 500:
-                return
-                
-            ((box_x, box_y), radius) = cv2.minEnclosingCircle(c)
-            X, Y = int(box_x), int(box_y)
-            
-            error_X = abs(CAMERA_CENTER_X - X)
-            error_Y = abs(CAMERA_CENTER_Y - Y)
-            
-            if error_X < ARRIVAL_THRESHOLD_X and error_Y < ARRIVAL_THRESHOLD_Y:
-                if self.current_phase == 1 and not self.grip_done:
-                    self._handle_pickup_area()
-                elif self.current_phase == 2:
-                    self._handle_delivery_area()
+        if center is None:
+            return False
+        
+        X, Y = center
+        error_X = abs(CAMERA_CENTER_X - X)
+        error_Y = abs(CAMERA_CENTER_Y - Y)
+        
+        return error_X < ARRIVAL_THRESHOLD_X and error_Y < ARRIVAL_THRESHOLD_Y
     
-    def _handle_pickup_area(self):
+    def _handle_pickup_area(self, trip_started):
         """집하 영역 도착 처리"""
-        print(f"🎯 집하 영역 도착 - 물건 {self.item_idx}")
+        log.info("🎯 집하 영역 도착 - 물건 %s", self.item_indices)
         
         # 1. 로드 팔로잉 정지
         self._stop_road_following()
         
         # 2. 물건 탐지 및 집기
-        if self._pickup_object():
+        picked = self._pickup_object()
+        if not self._trip_active(trip_started):
+            log.warning("집기 도중 운행 종료 - 주행 재개 안 함")
+            return
+        if picked:
             # 3. 다음 단계로 전환
             self._switch_to_phase2()
             
             # 4. 로드 팔로잉 재시작
             self._start_road_following()
         else:
-            print("❌ 물건 집기 실패")
+            log.warning("❌ 물건 집기 실패")
             # 실패 시 로드 팔로잉 재시작
             self._start_road_following()
     
-    def _handle_delivery_area(self):
+    def _handle_delivery_area(self, trip_started):
         """배송 영역 도착 처리"""
-        print(f"🎯 배송 영역 도착 - 물건 {self.item_idx}")
+        log.info("🎯 배송 영역 도착 - 물건 %s", self.picked_items)
         
         # 1. 로드 팔로잉 정지
         self._stop_road_following()
@@ -143,69 +191,104 @@ class AreaDetection(threading.Thread):
         # 2. 물건 놓기
         if self._place_object():
             # 3. 작업 완료
-            self._complete_task()
+            self._complete_task(trip_started)
         else:
-            print("❌ 물건 놓기 실패")
-            self._complete_task()  # 실패해도 작업 완료로 처리
+            log.warning("❌ 물건 놓기 실패")
+            self._complete_task(trip_started)  # 실패해도 작업 완료로 처리
+    
+    def _requeue_missed(self):
+        """이번 운행에서 집지 못한 물건 (미발견 / 적재 위치 부족) 을 작업 큐로 되돌림"""
+        missed = [idx for idx in self.item_indices if idx not in self.picked_items]
+        if not missed:
+            return
+        log.warning("⚠️ 물건 %s 미적재 - 작업 큐로 되돌림", missed)
+        if self.requeue_callback:
+            self.requeue_callback(missed)
+    
+    def _is_batch(self):
+        """여러 물건 운행 - 집은 물건을 그리퍼에 들고 있지 않고 적재 위치에 내려둠"""
+        return len(self.item_indices) > 1
     
     def _pickup_object(self):
-        """물건 집기 동작"""
+        """물건 집기 동작 - 한 번의 탐지에서 보이는 대상 마커를 모두 집음"""
         if not self.robot_arm or not self.box_detector:
-            print("⚠️ 로봇팔 또는 물건 탐지 시스템 없음")
+            log.warning("⚠️ 로봇팔 또는 물건 탐지 시스템 없음")
             time.sleep(ARM_OPERATION_DELAY)
+            self.picked_items = list(self.item_indices)
             return True  # 시뮬레이션
         
         try:
-            print(f"🔍 물건 {self.item_idx} 탐지 시작...")
+            log.info("🔍 물건 %s 탐지 시작...", self.item_indices)
             
             # 물건 위치 탐지 (ArUco 마커 기반)
-            object_position = self._detect_object_position()
+            object_positions = self._detect_object_positions()
             
-            if object_position is not None:
-                print(f"📍 물건 {self.item_idx} 위치: {object_position}")
+            if not object_positions:
+                log.warning("❌ 물건 %s 탐지 실패", self.item_indices)
+                return False
+            
+            for item_idx, object_position in object_positions.items():
+                if self._is_batch() and len(self.picked_items) >= len(ARM_CARRY_POSITIONS):
+                    log.warning("⚠️ 적재 위치 부족 - 물건 %s 제외", item_idx)
+                    break
+                log.info("📍 물건 %s 위치: %s", item_idx, object_position)
                 
-                # 로봇팔로 집기
+                # 로봇팔로 집기 (여러 물건이면 적재 위치에 내려둠)
+                arm_start = time.monotonic()
                 self.robot_arm.pick(object_position)
-                self.grip_done = True
+                if self._is_batch():
+                    self.robot_arm.place(np.array(ARM_CARRY_POSITIONS[len(self.picked_items)]))
+                self.arm_durations["pick"].observe(time.monotonic() - arm_start)
+                self.picked_items.append(item_idx)
                 
-                print(f"✅ 물건 {self.item_idx} 집기 완료")
-                return True
-            else:
-                print(f"❌ 물건 {self.item_idx} 탐지 실패")
-                return False
+                log.info("✅ 물건 %s 집기 완료", item_idx)
+            
+            self._requeue_missed()
+            self.grip_done = True
+            return True
                 
         except Exception as e:
-            print(f"물건 집기 오류: {e}")
-            return False
+            log.error("물건 집기 오류: %s", e)
+            if self.picked_items:
+                self._requeue_missed()
+            return bool(self.picked_items)  # 일부라도 집었으면 배송 진행
     
     def _place_object(self):
-        """물건 놓기 동작"""
+        """물건 놓기 동작 - 집은 물건을 배송 영역에 나란히 내림"""
         if not self.robot_arm:
-            print("⚠️ 로봇팔 시스템 없음")
+            log.warning("⚠️ 로봇팔 시스템 없음")
             time.sleep(ARM_OPERATION_DELAY)
+            self.delivered_items = list(self.picked_items)
             return True  # 시뮬레이션
         
         try:
-            print(f"📦 물건 {self.item_idx} 놓기 시작...")
-            
-            # 현재 위치에서 약간 앞쪽에 놓기
-            place_position = np.array([200, 0, 50])  # 기본 놓기 위치
-            
-            # 로봇팔로 놓기
-            self.robot_arm.place(place_position)
-            
-            print(f"✅ 물건 {self.item_idx} 놓기 완료")
+            for slot, item_idx in enumerate(self.picked_items):
+                log.info("📦 물건 %s 놓기 시작...", item_idx)
+                
+                # 현재 위치에서 약간 앞쪽에 놓기 (여러 물건이면 옆으로 간격을 두고)
+                place_position = np.array(ARM_PLACE_POSITION) + np.array([0, slot * ARM_PLACE_SPACING, 0])
+                
+                # 로봇팔로 놓기
+                arm_start = time.monotonic()
+                if self._is_batch():
+                    self.robot_arm.pick(np.array(ARM_CARRY_POSITIONS[slot]))
+                self.robot_arm.place(place_position)
+                self.arm_durations["place"].observe(time.monotonic() - arm_start)
+                self.delivered_items.append(item_idx)
+                
+                log.info("✅ 물건 %s 놓기 완료", item_idx)
             return True
             
         except Exception as e:
-            print(f"물건 놓기 오류: {e}")
+            log.error("물건 놓기 오류: %s", e)
             return False
     
-    def _detect_object_position(self):
-        """ArUco 마커 기반 물건 위치 탐지"""
+    def _detect_object_positions(self):
+        """ArUco 마커 기반 물건 위치 탐지 - 한 번의 탐지에서 보인 대상 마커 {물건 인덱스: 위치}"""
         if not self.box_detector:
-            return None
+            return {}
         
+        detect_start = time.monotonic()
         for attempt in range(MARKER_DETECTION_RETRIES):
             try:
                 # 카메라에서 이미지 획득
@@ -213,68 +296,115 @@ class AreaDetection(threading.Thread):
                 if frame is None:
                     continue
                 
-                # 이미지 크기 조정
-                frame_resized = cv2.resize(frame, (300, 300), interpolation=cv2.INTER_LINEAR)
+                # 박스 탐지 (카메라 모델이 해상도에 맞는 intrinsic 제공 - 리사이즈 불필요)
+                if self.vision_pool is not None:
+                    detected_boxes = self.vision_pool.detect_markers(frame)
+                else:
+                    detected_boxes = self.box_detector.detect_boxes(frame)
                 
-                # 박스 탐지
-                detected_boxes = self.box_detector.detect_boxes(frame_resized)
+                # 물건 인덱스와 일치하는 마커 찾기 (요청 순서 유지)
+                found = {idx: detected_boxes[idx] for idx in self.item_indices if idx in detected_boxes}
+                if found:
+                    log.info("🎯 마커 %s 탐지 성공", list(found))
+                    self.marker_detection_time.observe(time.monotonic() - detect_start)
+                    return found
                 
-                # 물건 인덱스와 일치하는 마커 찾기
-                if self.item_idx in detected_boxes:
-                    object_position = detected_boxes[self.item_idx]
-                    print(f"🎯 마커 {self.item_idx} 탐지 성공: {object_position}")
-                    return object_position
-                
-                print(f"⏳ 시도 {attempt + 1}/{MARKER_DETECTION_RETRIES} - 마커 {self.item_idx} 미발견")
+                log.debug("⏳ 시도 %s/%s - 마커 %s 미발견", attempt + 1, MARKER_DETECTION_RETRIES, self.item_indices)
+                self.marker_retries.inc()
                 time.sleep(0.5)
                 
             except Exception as e:
-                print(f"물건 탐지 오류 (시도 {attempt + 1}): {e}")
+                log.warning("물건 탐지 오류 (시도 %s): %s", attempt + 1, e)
         
-        print(f"❌ 마커 {self.item_idx} 탐지 실패 - 모든 시도 소진")
-        return None
+        log.warning("❌ 마커 %s 탐지 실패 - 모든 시도 소진", self.item_indices)
+        self.marker_failures.inc()
+        self.marker_detection_time.observe(time.monotonic() - detect_start)
+        return {}
     
     def _stop_road_following(self):
-        """로드 팔로잉 정지"""
+        """로드 팔로잉 정지 (반환 시점에 모터 정지 완료 - 별도 대기 불필요)"""
         if self.road_following_controller:
             self.road_following_controller.stop_following()
-            print("⏸️ 로드 팔로잉 정지")
-        time.sleep(0.5)  # 완전 정지 대기
+            log.info("⏸️ 로드 팔로잉 정지")
     
     def _start_road_following(self):
         """로드 팔로잉 시작"""
         if self.road_following_controller:
             self.road_following_controller.start_following()
-            print("▶️ 로드 팔로잉 재시작")
-        time.sleep(0.5)  # 시작 대기
+            log.info("▶️ 로드 팔로잉 재시작")
     
     def _switch_to_phase2(self):
         """2단계로 전환"""
         self.current_phase = 2
-        print(f"🔄 물건 {self.item_idx} - 2단계(배송)로 전환")
+        log.info("🔄 물건 %s - 2단계(배송)로 전환", self.picked_items)
     
-    def _complete_task(self):
-        """작업 완료"""
-        print(f"🏁 물건 {self.item_idx} 작업 완료")
-        self.is_active = False
+    def _trip_active(self, trip_started):
+        return self.is_active and self.trip_started == trip_started
+    
+    def _finish_once(self, trip_started):
+        """운행 종료 (완료 / 중단) 선점 - 운행마다 먼저 호출한 쪽만 True (완료 콜백 중복 방지)"""
+        with self._finish_lock:
+            if not self._trip_active(trip_started):
+                return False
+            self.is_active = False
+            return True
+    
+    def _complete_task(self, trip_started):
+        """작업 완료 - 운행 결과 (배송 물건 수 / 시간당 배송 수) 를 콜백으로 전달"""
+        if not self._finish_once(trip_started):
+            log.warning("이미 종료된 운행 - 완료 처리 생략")
+            return
+        trip = self._trip_summary()
+        log.info("🏁 물건 %s 작업 완료", self.delivered_items, **trip)
+        if self.task_complete_callback:
+            self.task_complete_callback(trip)
+    
+    def abort_task(self, reason):
+        """운행 중단 (연속 충돌 등, 작업 스레드) - 아직 집지 않은 물건은 작업 큐로 되돌리고 운행 결과를 완료 콜백으로 전달"""
+        if not self._finish_once(self.trip_started):
+            return
+        if not self.grip_done:
+            self._requeue_missed()
+        trip = self._trip_summary()
+        trip["aborted"] = reason
+        log.error("🛑 물건 %s 운행 중단: %s (적재한 물건 %s)", self.item_indices, reason,
+                  [idx for idx in self.picked_items if idx not in self.delivered_items])
         if self.task_complete_callback:
-            self.task_complete_callback()
+            self.task_complete_callback(trip)
+    
+    def _trip_summary(self):
+        duration = time.monotonic() - self.trip_started if self.trip_started else 0.0
+        delivered = len(self.delivered_items)
+        items_per_hour = round(delivered / duration * 3600, 1) if duration > 0 else None
+        
+        self.trip_time.observe(duration)
+        self.items_delivered.inc(delivered)
+        if items_per_hour is not None:
+            self.trip_items_per_hour.set(items_per_hour)
+        
+        return {
+            "items": list(self.item_indices),
+            "delivered": list(self.delivered_items),
+            "missed": [idx for idx in self.item_indices if idx not in self.delivered_items],
+            "duration_sec": round(duration, 1),
+            "items_per_hour": items_per_hour,
+        }
     
     def set_target_areas(self, start_color_name, end_color_name):
         """목표 영역 설정"""
         self.start_area_color = self._get_color_info(start_color_name)
         self.end_area_color = self._get_color_info(end_color_name)
-        print(f"🎯 목표 영역 설정: {start_color_name} → {end_color_name}")
+        log.info("🎯 목표 영역 설정: %s → %s", start_color_name, end_color_name)
     
     def set_item_index(self, item_idx):
-        """물건 인덱스 설정"""
-        self.item_idx = item_idx
-        print(f"📦 물건 인덱스 설정: {item_idx}")
+        """물건 인덱스 설정 - 정수 1개 또는 목록 (같은 집하/배송 영역의 여러 물건을 한 번에 운행)"""
+        self.item_indices = list(item_idx) if isinstance(item_idx, (list, tuple)) else [item_idx]
+        log.info("📦 물건 인덱스 설정: %s", self.item_indices)
     
     def set_road_following_controller(self, controller):
         """로드 팔로잉 컨트롤러 설정"""
         self.road_following_controller = controller
-        print("🛣️ 로드 팔로잉 컨트롤러 연결됨")
+        log.debug("🛣️ 로드 팔로잉 컨트롤러 연결됨")
     
     def _get_color_info(self, color_name):
         """색상 정보 반환"""
@@ -282,15 +412,20 @@ class AreaDetection(threading.Thread):
     
     def start_detection(self):
         """탐지 시작"""
-        self.is_active = True
-        self.current_phase = 1
-        self.grip_done = False
-        print(f"🔍 물건 {self.item_idx} 영역 탐지 시작")
+        with self._finish_lock:
+            self.current_phase = 1
+            self.grip_done = False
+            self.picked_items = []
+            self.delivered_items = []
+            self.trip_started = time.monotonic()
+            self.is_active = True
+        log.info("🔍 물건 %s 영역 탐지 시작", self.item_indices)
     
     def stop_detection(self):
         """탐지 정지"""
-        self.is_active = False
-        print(f"⏹️ 물건 {self.item_idx} 영역 탐지 정지")
+        with self._finish_lock:
+            self.is_active = False
+        log.info("⏹️ 물건 %s 영역 탐지 정지", self.item_indices)
     
     def stop(self):
         """스레드 종료"""
@@ -301,12 +436,13 @@ class AreaDetection(threading.Thread):
         if self.robot_arm:
             try:
                 self.robot_arm.ready()
-                print("🏠 로봇팔 안전 위치로 이동")
+                log.info("🏠 로봇팔 안전 위치로 이동")
             except:
                 pass
         
-        print("⏹️ 영역 탐지 스레드 종료")
+        log.info("⏹️ 영역 탐지 스레드 종료")
     
-    def set_callbacks(self, task_complete_callback=None):
+    def set_callbacks(self, task_complete_callback=None, requeue_callback=None):
         """콜백 함수 설정"""
-        self.task_complete_callback = task_complete_callback
\ No newline at end of file
+        self.task_complete_callback = task_complete_callback
+        self.requeue_callback = requeue_callback
\ No newline at end of file
@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+비전 실행 모드 비교 - 스레드 모드 vs 프로세스 모드 (vision_pool.py) 의 조향 루프 지연
+
+조향 루프 대역: 224x224 프레임 전처리 (정규화 / CHW 변환) + 조향 계산, 주기 sleep
+탐지 부하: 별도 스레드에서 합성 프레임 (색상 영역 + ArUco 마커) 으로 작업영역 / 마커 탐지 반복
+조향 루프 1회 처리 시간과 주기 초과 지연의 p50 / p90 / p99 를 JSON 으로 출력
+
+사용법: python bench_vision_modes.py [--duration 10] [--interval 0.01] [--modes thread,process] [--output 결과.json]
+"""
+
+import argparse
+import json
+import threading
+import time
+
+import cv2
+import numpy as np
+from config import *
+from camera_model import CameraModel
+from control.BoxDetector import BoxDetector
+from vision_pool import VisionPool, detect_zone
+
+def make_frame(color_name="orange", marker_id=0, size=(FRAME_HEIGHT, FRAME_WIDTH)):
+    """중앙에 색상 영역, 모서리에 ArUco 마커가 있는 합성 프레임 (BGR)"""
+    h, w = size
+    frame = np.full((h, w, 3), 200, dtype=np.uint8)
+
+    color = next(c for c in COLOR_RANGES if c['name'] == color_name)
+    hsv_center = ((color['lower'] + color['upper']) // 2).astype(np.uint8)
+    bgr = cv2.cvtColor(hsv_center.reshape(1, 1, 3), cv2.COLOR_HSV2BGR)[0, 0]
+    cv2.circle(frame, (w // 2, h // 2), min(h, w) // 5, tuple(int(v) for v in bgr), -1)
+
+    marker_size = min(h, w) // 4
+    marker = cv2.aruco.generateImageMarker(
+        cv2.aruco.getPredefinedDictionary(cv2.aruco.DICT_4X4_50), marker_id, marker_size)
+    frame[8:8 + marker_size, 8:8 + marker_size] = marker[:, :, None]
+    return frame
+
+def percentiles(values):
+    if not values:
+        return None
+    arr = np.array(values) * 1000.0
+    return {
+        "count": len(values),
+        "mean_ms": round(float(arr.mean()), 3),
+        "p50_ms": round(float(np.percentile(arr, 50)), 3),
+        "p90_ms": round(float(np.percentile(arr, 90)), 3),
+        "p99_ms": round(float(np.percentile(arr, 99)), 3),
+        "max_ms": round(float(arr.max()), 3),
+    }
+
+def steering_loop(frame, interval, stop_event, work_times, overshoots):
+    """road_following.RoadFollowing.run 의 Python 측 처리 대역 (모델 추론 제외)"""
+    mean = np.array(IMAGENET_MEAN, dtype=np.float32)
+    std = np.array(IMAGENET_STD, dtype=np.float32)
+    angle_last = 0.0
+    next_tick = time.perf_counter()
+
+    while not stop_event.is_set():
+        start = time.perf_counter()
+        overshoots.append(max(0.0, start - next_tick))
+
+        x = (frame.astype(np.float32) / 255.0 - mean) / std
+        x = np.ascontiguousarray(x.transpose(2, 0, 1))[None]
+        xy = x.reshape(2, -1).mean(axis=1)
+        angle = float(np.arctan2(xy[0], (0.5 - xy[1]) / 2.0))
+        steering = float(np.clip(angle * STEERING_GAIN + (angle - angle_last) * STEERING_DGAIN + STEERING_BIAS, -1.0, 1.0))
+        angle_last = angle
+        _ = (np.clip(SPEED_GAIN + steering, 0.0, 1.0), np.clip(SPEED_GAIN - steering, 0.0, 1.0))
+
+        work_times.append(time.perf_counter() - start)
+        next_tick = start + interval
+        time.sleep(max(0.0, next_tick - time.perf_counter()))
+
+def detection_load(mode, frame, stop_event, counts, pool=None):
+    """area_detecting.AreaDetection 대역 - 쉬지 않고 작업영역 / 마커 탐지 반복"""
+    camera_model = CameraModel()
+    box_detector = BoxDetector(camera_model=camera_model)
+    color_info = next(c for c in COLOR_RANGES if c['name'] == "orange")
+
+    while not stop_event.is_set():
+        if mode == "process":
+            pool.detect_zone(frame, color_info)
+            pool.detect_markers(frame)
+        else:
+            detect_zone(frame, color_info['lower'], color_info['upper'], camera_model)
+            box_detector.detect_boxes(frame)
+        counts["detections"] += 1
+
+def run_mode(mode, duration, interval, frame):
+    pool = None
+    if mode == "process":
+        pool = VisionPool(VISION_WORKERS, VISION_MAX_FRAME_SHAPE, VISION_TASK_TIMEOUT)
+        pool.start()
+        pool.detect_zone(frame, COLOR_RANGES[0])  # 작업자 기동 대기
+
+    stop_event = threading.Event()
+    work_times, overshoots = [], []
+    counts = {"detections": 0}
+    threads = [
+        threading.Thread(target=steering_loop, args=(frame, interval, stop_event, work_times, overshoots),
+                         name="road-following"),
+        threading.Thread(target=detection_load, args=(mode, frame, stop_event, counts, pool),
+                         name="area-detection"),
+    ]
+    try:
+        for thread in threads:
+            thread.start()
+        time.sleep(duration)
+    finally:
+        stop_event.set()
+        for thread in threads:
+            thread.join()
+        if pool is not None:
+            pool.stop()
+
+    return {
+        "mode": mode,
+        "duration_sec": duration,
+        "steering_work": percentiles(work_times),
+        "steering_overshoot": percentiles(overshoots),
+        "detections_per_sec": round(counts["detections"] / duration, 1),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="비전 실행 모드별 조향 루프 지연 비교")
+    parser.add_argument("--duration", type=float, default=10.0, help="모드별 측정 시간 (초)")
+    parser.add_argument("--interval", type=float, default=0.01, help="조향 루프 주기 (초)")
+    parser.add_argument("--modes", default="thread,process", help="측정할 모드 (쉼표 구분)")
+    parser.add_argument("--output", default=None, help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    frame = make_frame()
+    results = [run_mode(mode.strip(), args.duration, args.interval, frame) for mode in args.modes.split(",")]
+
+    text = json.dumps(results, ensure_ascii=False, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+if __name__ == "__main__":
+    main()
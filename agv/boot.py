@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+부팅 순서 관리 - 서로 독립적인 초기화 단계 (로봇팔 원점 복귀 / 모델 로드 / MQTT 연결 등) 를 동시에 실행
+
+단계마다 선행 단계 (after) 를 지정하면 선행 단계가 끝난 뒤 자기 스레드에서 시작
+필수 단계가 실패하면 그 단계에 의존하는 단계는 건너뛰고 run() 이 False 반환
+각 단계의 시작 / 종료 시각은 타임라인으로 출력 (부팅 시간 단축 확인용)
+"""
+
+import threading
+import time
+from metrics import REGISTRY, LONG_TIME_BUCKETS
+from structured_logging import get_logger
+
+log = get_logger(__name__)
+
+# 부팅 단계 시간 버킷 (초) - 0.1초 ~ 2분
+BOOT_TIME_BUCKETS = LONG_TIME_BUCKETS + (60.0, 120.0)
+
+def system_uptime():
+    """전원 인가 후 경과 시간 (초) - /proc/uptime 이 없으면 None"""
+    try:
+        with open("/proc/uptime", 'r') as f:
+            return float(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+
+class BootStep:
+    __slots__ = ("name", "func", "after", "required", "started", "finished", "status", "error", "done")
+
+    def __init__(self, name, func, after, required):
+        self.name = name
+        self.func = func
+        self.after = tuple(after)
+        self.required = required
+        self.started = None
+        self.finished = None
+        self.status = "pending"  # pending / running / ok / failed / skipped
+        self.error = None
+        self.done = threading.Event()
+
+class BootSequencer:
+    def __init__(self):
+        self._steps = {}
+        self.t0 = time.monotonic()
+        self.ready_at = None
+        self.uptime_at_ready = None
+        self.step_time = REGISTRY.histogram("boot_step_seconds", "부팅 단계별 소요 시간", buckets=BOOT_TIME_BUCKETS)
+        self.ready_time = REGISTRY.gauge("boot_ready_seconds", "부팅 시작부터 준비 완료까지 시간")
+
+    def add(self, name, func, after=(), required=True):
+        """단계 등록 - after: 먼저 끝나야 하는 단계 이름 목록"""
+        for dependency in after:
+            if dependency not in self._steps:
+                raise ValueError(f"등록되지 않은 선행 단계: {dependency}")
+        self._steps[name] = BootStep(name, func, after, required)
+
+    def run(self):
+        """모든 단계 실행 후 대기 - 필수 단계가 모두 성공하면 True"""
+        threads = [
+            threading.Thread(target=self._run_step, args=(step,), name=f"boot-{step.name}", daemon=True)
+            for step in self._steps.values()
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.ready_at = time.monotonic() - self.t0
+        self.uptime_at_ready = system_uptime()
+        self.ready_time.set(self.ready_at)
+        return all(step.status == "ok" for step in self._steps.values() if step.required)
+
+    def _run_step(self, step):
+        try:
+            for dependency in step.after:
+                self._steps[dependency].done.wait()
+            failed = [d for d in step.after if self._steps[d].status != "ok" and self._steps[d].required]
+            if failed:
+                step.status = "skipped"
+                log.warning("부팅 단계 건너뜀: %s (선행 단계 실패: %s)", step.name, ", ".join(failed))
+                return
+
+            step.status = "running"
+            step.started = time.monotonic() - self.t0
+            try:
+                step.func()
+                step.status = "ok"
+            except Exception as e:
+                step.status = "failed"
+                step.error = e
+                log.error("❌ 부팅 단계 실패: %s - %s", step.name, e)
+            finally:
+                step.finished = time.monotonic() - self.t0
+                self.step_time.observe(step.finished - step.started)
+                log.info("부팅 단계 %s: %s (%.2f초)", step.status, step.name, step.finished - step.started)
+        finally:
+            step.done.set()
+
+    def errors(self):
+        """실패한 필수 단계 [(이름, 예외), ...]"""
+        return [(s.name, s.error) for s in self._steps.values() if s.required and s.status == "failed"]
+
+    def timeline(self):
+        return [
+            {
+                "step": step.name,
+                "status": step.status,
+                "start_sec": None if step.started is None else round(step.started, 2),
+                "end_sec": None if step.finished is None else round(step.finished, 2),
+                "after": list(step.after),
+            }
+            for step in self._steps.values()
+        ]
+
+    def format_timeline(self, width=40):
+        """단계별 막대 타임라인 문자열"""
+        total = max(self.ready_at or 0.0, 1e-6)
+        name_width = max((len(name) for name in self._steps), default=4)
+        lines = [f"=== 부팅 타임라인 (준비 완료 {total:.2f}초) ==="]
+        for step in self._steps.values():
+            if step.started is None:
+                lines.append(f"{step.name:<{name_width}} | {'':<{width}} | {step.status}")
+                continue
+            begin = int(step.started / total * width)
+            end = max(begin + 1, int(step.finished / total * width))
+            bar = " " * begin + "█" * (end - begin)
+            lines.append(f"{step.name:<{name_width}} |{bar:<{width}}| "
+                         f"{step.started:6.2f} → {step.finished:6.2f}초 {step.status}")
+        if self.uptime_at_ready is not None:
+            lines.append(f"전원 인가 후 {self.uptime_at_ready:.1f}초에 준비 완료")
+        return "\n".join(lines)
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+카메라 모델 - 캘리브레이션 1회 로드, 해상도별 왜곡 보정 맵 캐싱
+"""
+
+import threading
+import numpy as np
+import cv2
+from config import *
+from structured_logging import get_logger
+
+log = get_logger(__name__)
+
+class CameraModel:
+    def __init__(self, intrinsic=None, dist=None, calib_size=None, calibration_path=None):
+        self.intrinsic = np.array(CAMERA_INTRINSIC if intrinsic is None else intrinsic, dtype=np.float64)
+        self.dist = np.array(CAMERA_DIST if dist is None else dist, dtype=np.float64)
+        self.calib_size = tuple(CAMERA_CALIBRATION_SIZE if calib_size is None else calib_size)
+
+        path = CAMERA_CALIBRATION_PATH if calibration_path is None else calibration_path
+        if path:
+            self.load_calibration(path)
+
+        # 해상도 (w, h) 별 캐시
+        self._lock = threading.Lock()
+        self._intrinsics = {}
+        self._maps = {}
+
+    def load_calibration(self, path):
+        """np.savez 캘리브레이션 파일 로드 (K, dist, size)"""
+        try:
+            data = np.load(path)
+            self.intrinsic = np.array(data['K'], dtype=np.float64)
+            self.dist = np.array(data['dist'], dtype=np.float64).flatten()
+            self.calib_size = tuple(int(v) for v in data['size'])
+            log.info("📷 카메라 캘리브레이션 로드: %s (%sx%s)", path, self.calib_size[0], self.calib_size[1])
+        except Exception as e:
+            log.warning("카메라 캘리브레이션 로드 실패 - 기본값 사용: %s", e)
+
+    def intrinsic_for(self, size):
+        """(w, h) 해상도에 맞게 스케일된 카메라 행렬 - 이미지 리사이즈 대신 사용"""
+        size = (int(size[0]), int(size[1]))
+        K = self._intrinsics.get(size)
+        if K is not None:
+            return K
+
+        sx = size[0] / self.calib_size[0]
+        sy = size[1] / self.calib_size[1]
+
+        K = self.intrinsic.copy()
+        K[0, 0] *= sx
+        K[1, 1] *= sy
+        K[0, 1] *= sx
+        # 주점은 픽셀 중심 기준으로 스케일
+        K[0, 2] = (K[0, 2] + 0.5) * sx - 0.5
+        K[1, 2] = (K[1, 2] + 0.5) * sy - 0.5
+
+        with self._lock:
+            self._intrinsics[size] = K
+        return K
+
+    def intrinsic_for_frame(self, frame):
+        h, w = frame.shape[:2]
+        return self.intrinsic_for((w, h))
+
+    def maps_for(self, size):
+        """(w, h) 해상도용 remap 테이블 (최초 1회 계산 후 캐시)"""
+        size = (int(size[0]), int(size[1]))
+        maps = self._maps.get(size)
+        if maps is not None:
+            return maps
+
+        K = self.intrinsic_for(size)
+        map1, map2 = cv2.initUndistortRectifyMap(K, self.dist, None, K, size, cv2.CV_16SC2)
+
+        with self._lock:
+            maps = self._maps.setdefault(size, (map1, map2))
+        return maps
+
+    def undistort(self, frame, roi=None):
+        """
+        왜곡 보정 이미지 반환
+        roi: (x, y, w, h) - 보정된 좌표계 기준 관심 영역만 remap
+        """
+        h, w = frame.shape[:2]
+        map1, map2 = self.maps_for((w, h))
+
+        if roi is not None:
+            x, y, rw, rh = roi
+            map1 = map1[y:y + rh, x:x + rw]
+            map2 = map2[y:y + rh, x:x + rw]
+
+        return cv2.remap(frame, map1, map2, cv2.INTER_LINEAR)
+
+    def undistort_points(self, points, size):
+        """왜곡된 픽셀 좌표 -> 보정된 픽셀 좌표"""
+        K = self.intrinsic_for(size)
+        pts = np.asarray(points, dtype=np.float64).reshape(-1, 1, 2)
+        return cv2.undistortPoints(pts, K, self.dist, P=K).reshape(-1, 2)
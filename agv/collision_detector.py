@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+충돌 / 정체 감지 - 조향 루프 틱마다 명령 속도와 영상 움직임 비교
+
+- 프레임을 COLLISION_FRAME_SIZE (80x60) 흑백으로 축소 + 흐림 (센서 잡음이 특징점으로 잡히지 않게), 직전 프레임 특징점의 광류 (Lucas-Kanade) 이동량 중앙값 = 영상 움직임 (px/초)
+  특징점이 부족하면 (무늬 없는 벽 등) 평균 밝기 차이가 COLLISION_STATIC_DIFF 미만일 때만 정지로 판단
+- stall: 주행 명령 중인데 영상 움직임이 COLLISION_STALL_FLOW 미만인 상태가 COLLISION_STALL_TIME 이상 지속
+- impact: 주행 명령 중 화면 전체가 급변 (평균 밝기 차이가 COLLISION_IMPACT_DIFF 이상이고 주행 중 평균의 COLLISION_IMPACT_RATIO 배 이상)
+- 주행 시작 후 COLLISION_GRACE_TIME 동안은 판단하지 않음 (모터 가속 구간)
+- 같은 카메라 프레임이 다시 들어오면 (조향 루프가 카메라보다 빠를 때) 계산 생략
+
+CollisionRecorder: 주행 1회의 축소 프레임 / 명령 속도 / 감지 이벤트를 npz 로 저장 - collision_replay.py 로 임계값 검증
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+import cv2
+import numpy as np
+from config import *
+from metrics import REGISTRY
+from structured_logging import get_logger
+
+log = get_logger(__name__)
+
+class CollisionDetector:
+    def __init__(self, frame_size=COLLISION_FRAME_SIZE, min_command=COLLISION_MIN_COMMAND,
+                 stall_flow=COLLISION_STALL_FLOW, stall_time=COLLISION_STALL_TIME,
+                 impact_diff=COLLISION_IMPACT_DIFF, impact_ratio=COLLISION_IMPACT_RATIO,
+                 grace_time=COLLISION_GRACE_TIME):
+        self.frame_size = tuple(frame_size)
+        self.min_command = min_command
+        self.stall_flow = stall_flow
+        self.stall_time = stall_time
+        self.impact_diff = impact_diff
+        self.impact_ratio = impact_ratio
+        self.grace_time = grace_time
+
+        self.check_time = REGISTRY.histogram("collision_check_seconds", "충돌 판단 1회 처리 시간 (축소 + 광류)")
+        self.motion_gauge = REGISTRY.gauge("collision_visual_motion", "영상 움직임 (축소 프레임 px/초)")
+        self.events = {
+            kind: REGISTRY.counter("collision_events_total", "감지한 충돌 / 정체 수", labels={"kind": kind})
+            for kind in ("stall", "impact")
+        }
+        self.reset()
+
+    def reset(self, now=None):
+        """새 주행 명령 - 이전 프레임 / 정체 시작 시각을 버리고 유예 시간부터 다시"""
+        self.started_at = now
+        self.last_gray = None
+        self._frame = None
+        self._prev_time = None
+        self._stall_since = None
+        self._diff_avg = None  # 주행 중 프레임 간 평균 밝기 차이 (지수 이동 평균)
+
+    def prepare(self, frame):
+        """카메라 프레임 → 축소 흑백 + 흐림 (이미 축소 흑백이면 그대로 - 기록 재생용)"""
+        if frame.ndim == 2 and frame.shape[::-1] == self.frame_size:
+            return frame
+        small = cv2.resize(frame, self.frame_size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(small, (5, 5), 0)
+
+    def update(self, frame, left, right, now):
+        """이번 틱 판단 - 충돌이면 이벤트 dict, 아니면 None"""
+        if frame is None or frame is self._frame:
+            return None
+        start = time.monotonic()
+        self._frame = frame
+        gray = self.prepare(frame)
+        prev, prev_time = self.last_gray, self._prev_time
+        self.last_gray, self._prev_time = gray, now
+        if self.started_at is None:
+            self.started_at = now
+        if prev is None or now <= prev_time:
+            return None
+
+        diff = float(cv2.absdiff(prev, gray).mean())
+        flow = self._flow(prev, gray)
+        if flow is not None:
+            motion = flow / (now - prev_time)
+        else:
+            motion = 0.0 if diff < COLLISION_STATIC_DIFF else None
+        if motion is not None:
+            self.motion_gauge.set(motion)
+
+        event = self._judge(now, (left + right) / 2.0, motion, diff)
+        self.check_time.observe(time.monotonic() - start)
+        return event
+
+    def _flow(self, prev, gray):
+        """직전 프레임 특징점의 이동량 중앙값 (px) - 추적 성공 특징점이 부족하면 None"""
+        points = cv2.goodFeaturesToTrack(prev, COLLISION_MAX_FEATURES, 0.01, 5)
+        if points is None or len(points) < COLLISION_MIN_FEATURES:
+            return None
+        moved, status, _ = cv2.calcOpticalFlowPyrLK(prev, gray, points, None, winSize=(9, 9), maxLevel=2)
+        tracked = status.ravel() == 1
+        if tracked.sum() < COLLISION_MIN_FEATURES:
+            return None
+        return float(np.median(np.linalg.norm((moved - points).reshape(-1, 2)[tracked], axis=1)))
+
+    def _judge(self, now, command, motion, diff):
+        driving = command >= self.min_command
+        if not driving or now - self.started_at < self.grace_time:
+            self._stall_since = None
+            if driving:
+                self._track_diff(diff)
+            return None
+
+        kind = None
+        if self._diff_avg is not None and diff >= self.impact_diff and diff >= self.impact_ratio * self._diff_avg:
+            kind = "impact"
+        elif motion is not None and motion < self.stall_flow:
+            if self._stall_since is None:
+                self._stall_since = now
+            if now - self._stall_since >= self.stall_time:
+                kind = "stall"
+        else:
+            # 움직임 확인 (또는 판단 불가) - 정체 구간 종료
+            self._stall_since = None
+        self._track_diff(diff)
+
+        if kind is None:
+            return None
+        self.events[kind].inc()
+        event = {
+            "kind": kind,
+            "command": round(float(command), 3),
+            "motion": None if motion is None else round(motion, 2),
+            "diff": round(diff, 2),
+            "stalled_sec": None if self._stall_since is None else round(now - self._stall_since, 2),
+        }
+        self._stall_since = None
+        return event
+
+    def _track_diff(self, diff):
+        self._diff_avg = diff if self._diff_avg is None else self._diff_avg * 0.9 + diff * 0.1
+
+class CollisionRecorder:
+    """주행 1회 기록 - save() 는 백그라운드 스레드에서 npz 압축 저장"""
+
+    def __init__(self, directory=COLLISION_RECORD_DIR, max_frames=COLLISION_RECORD_MAX_FRAMES):
+        self.directory = directory
+        self.max_frames = max_frames
+        os.makedirs(directory, exist_ok=True)
+        self._clear()
+
+    def _clear(self):
+        self._t0 = None
+        self._times, self._frames, self._left, self._right = [], [], [], []
+        self._events = []
+
+    def add(self, now, gray, left, right):
+        if gray is None or len(self._frames) >= self.max_frames:
+            return
+        if self._frames and gray is self._frames[-1]:
+            return  # 새 카메라 프레임 없음
+        if self._t0 is None:
+            self._t0 = now
+        self._times.append(now - self._t0)
+        self._frames.append(gray)
+        self._left.append(left)
+        self._right.append(right)
+
+    def event(self, now, kind):
+        if self._t0 is not None:
+            self._events.append((now - self._t0, kind))
+
+    def save(self):
+        """현재 기록을 파일로 넘기고 비움 - 기록이 없으면 None"""
+        if not self._frames:
+            self._clear()
+            return None
+        path = os.path.join(self.directory, datetime.now().strftime("run_%Y%m%d_%H%M%S_%f.npz"))
+        data = {
+            "t": np.array(self._times, dtype=np.float64),
+            "frames": self._frames,  # 쌓기 (복사) 는 저장 스레드에서
+            "left": np.array(self._left, dtype=np.float32),
+            "right": np.array(self._right, dtype=np.float32),
+            "event_t": np.array([t for t, _ in self._events], dtype=np.float64),
+            "event_kind": np.array([kind for _, kind in self._events], dtype=str),
+        }
+        self._clear()
+        threading.Thread(target=self._write, args=(path, data), name="collision-record", daemon=True).start()
+        return path
+
+    def _write(self, path, data):
+        try:
+            data["frames"] = np.stack(data["frames"])
+            np.savez_compressed(path, **data)
+            log.info("주행 기록 저장: %s (%s프레임)", path, len(data["t"]))
+        except Exception as e:
+            log.error("주행 기록 저장 실패 (%s): %s", path, e)
+
+def load_recording(path):
+    """collision_replay.py 용 - 기록 파일 → dict (t, frames, left, right, event_t, event_kind)"""
+    with np.load(path) as data:
+        return {key: data[key] for key in data.files}
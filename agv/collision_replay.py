@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+충돌 감지 검증 - 주행 기록 (COLLISION_RECORD_DIR 의 npz) 을 CollisionDetector 로 재생
+
+기록의 축소 프레임 / 명령 속도 / 시각을 그대로 넣어 감지 시점을 구함 (감지 후에는 실제 주행처럼 재시작 - 유예 시간부터)
+--labels 를 주면 실제 충돌 시각 기준으로 감지 / 누락 / 오탐과 감지 지연을, 없으면 기록 당시 감지 (event_t) 와의 일치를 집계
+틱당 판단 시간 p50 / p99 를 조향 루프 주기 (ROAD_FOLLOWING_INTERVAL) 와 비교
+임계값은 옵션으로 바꿔 가며 비교 (기본값은 config.py)
+
+라벨 파일 (JSON): {"run_20250522_143015_000000.npz": [12.4, [40.1, 48.0]], ...} - 기록 시작 후 실제 충돌 시각 (초)
+  [시작, 끝] 은 접촉이 이어진 구간 (구간 안의 두 번째 이후 감지는 오탐이 아닌 반복 감지), 충돌 없는 주행은 []
+
+사용법: python collision_replay.py 기록.npz [기록2.npz ...] [--labels labels.json] [--stall-flow 4.0] [--output 결과.json]
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+from config import *
+from collision_detector import CollisionDetector, load_recording
+
+def replay(recording, detector):
+    """기록 1개 재생 - (감지 [(시각, 종류)], 틱당 판단 시간 [초])"""
+    detections, check_times = [], []
+    detector.reset(0.0)
+    for t, frame, left, right in zip(recording["t"], recording["frames"], recording["left"], recording["right"]):
+        start = time.perf_counter()
+        event = detector.update(frame, float(left), float(right), float(t))
+        check_times.append(time.perf_counter() - start)
+        if event is not None:
+            detections.append((float(t), event["kind"]))
+            detector.reset(float(t))
+    return detections, check_times
+
+def match(detections, truth, window):
+    """
+    실제 충돌 (시각 또는 [시작, 끝] 구간) 마다 시작 ~ 끝 + window 안의 첫 감지를 짝지음
+    (지연 목록, 누락 수, 반복 감지 수, 오탐 수)
+    """
+    intervals = sorted((item, item) if isinstance(item, (int, float)) else tuple(item) for item in truth)
+    used = set()
+    latencies, missed, repeats = [], 0, 0
+    for begin, end in intervals:
+        inside = [i for i, (t, _) in enumerate(detections) if i not in used and begin - 0.1 <= t <= end + window]
+        if not inside:
+            missed += 1
+            continue
+        used.update(inside)
+        latencies.append(detections[inside[0]][0] - begin)
+        repeats += len(inside) - 1
+    return latencies, missed, repeats, len(detections) - len(used)
+
+def percentile(values, q):
+    return None if not values else round(float(np.percentile(values, q)), 4)
+
+def main():
+    parser = argparse.ArgumentParser(description="주행 기록으로 충돌 감지 검증")
+    parser.add_argument("recordings", nargs="+", help="collision_detector.CollisionRecorder 가 저장한 npz")
+    parser.add_argument("--labels", default=None, help="실제 충돌 시각 JSON ({파일 이름: [초, ...]})")
+    parser.add_argument("--window", type=float, default=2.0, help="실제 충돌 후 이 시간 (초) 안의 감지만 정답")
+    parser.add_argument("--stall-flow", type=float, default=COLLISION_STALL_FLOW)
+    parser.add_argument("--stall-time", type=float, default=COLLISION_STALL_TIME)
+    parser.add_argument("--impact-diff", type=float, default=COLLISION_IMPACT_DIFF)
+    parser.add_argument("--impact-ratio", type=float, default=COLLISION_IMPACT_RATIO)
+    parser.add_argument("--min-command", type=float, default=COLLISION_MIN_COMMAND)
+    parser.add_argument("--output", default=None, help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    labels = None
+    if args.labels:
+        with open(args.labels, 'r', encoding='utf-8') as f:
+            labels = json.load(f)
+
+    runs, all_latencies, all_checks = [], [], []
+    totals = {"frames": 0, "detections": 0, "missed": 0, "repeats": 0, "false_positives": 0}
+    for path in args.recordings:
+        recording = load_recording(path)
+        frame_size = recording["frames"].shape[1:][::-1]
+        detector = CollisionDetector(frame_size, args.min_command, args.stall_flow, args.stall_time,
+                                     args.impact_diff, args.impact_ratio)
+        detections, check_times = replay(recording, detector)
+
+        name = os.path.basename(path)
+        if labels is not None:
+            truth, source = labels.get(name, []), "labels"
+        else:
+            truth, source = [float(t) for t in recording["event_t"]], "recorded"
+        latencies, missed, repeats, false_positives = match(detections, truth, args.window)
+
+        runs.append({
+            "recording": name,
+            "frames": len(recording["t"]),
+            "duration_sec": round(float(recording["t"][-1]), 2) if len(recording["t"]) else 0.0,
+            "truth_source": source,
+            "truth": truth,
+            "detections": [{"t": round(t, 2), "kind": kind} for t, kind in detections],
+            "missed": missed,
+            "repeats": repeats,
+            "false_positives": false_positives,
+            "latency_sec": [round(v, 3) for v in latencies],
+            "check_p99_ms": percentile([v * 1000 for v in check_times], 99),
+        })
+        totals["frames"] += len(recording["t"])
+        totals["detections"] += len(detections)
+        totals["missed"] += missed
+        totals["repeats"] += repeats
+        totals["false_positives"] += false_positives
+        all_latencies.extend(latencies)
+        all_checks.extend(check_times)
+
+    check_ms = [v * 1000 for v in all_checks]
+    result = {
+        "config": {
+            "stall_flow": args.stall_flow, "stall_time": args.stall_time, "impact_diff": args.impact_diff,
+            "impact_ratio": args.impact_ratio, "min_command": args.min_command, "window": args.window,
+        },
+        "runs": runs,
+        "summary": dict(
+            totals,
+            detected=len(all_latencies),
+            latency_p50_sec=percentile(all_latencies, 50),
+            latency_max_sec=round(max(all_latencies), 3) if all_latencies else None,
+            check_p50_ms=percentile(check_ms, 50),
+            check_p99_ms=percentile(check_ms, 99),
+            loop_budget_ms=ROAD_FOLLOWING_INTERVAL * 1000,
+        ),
+    }
+
+    text = json.dumps(result, indent=2, ensure_ascii=False)
+    print(text)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+if __name__ == "__main__":
+    main()
@@ -13,16 +13,64 @@ AGV_ID = "1"  # 각 AGV마다 고유 ID 설정 (1, 2, 3 등)
 # MQTT 설정
 MQTT_BROKER_ADDRESS = "192.168.0.22"
 MQTT_BROKER_PORT = 1883
-COMMAND_TOPIC = f"agv/{AGV_ID}/command"
-SENSING_TOPIC = f"agv/{AGV_ID}/sensing"
+# 토픽 템플릿 - {agv_id} 는 MQTTManager 의 agv_id (기본 AGV_ID, 모의 실행에서는 인스턴스별)
+COMMAND_TOPIC = "agv/{agv_id}/command"
+SENSING_TOPIC = "agv/{agv_id}/sensing"
+IMAGE_TOPIC = "agv/{agv_id}/image"
+TASK_QUEUE_TOPIC = "agv/{agv_id}/queue"  # 작업 큐 상태 (길이 / 대기 시간)
 
 # 센서 데이터 송신 설정
 SENSING_INTERVAL = 0.5  # 0.5초마다 송신
+SENSING_PROTOCOL_VERSION = 2  # 1: JSON + base64 이미지 (기존), 2: 바이너리 헤더 + 별도 이미지 토픽
+SENSING_IMAGE_INTERVAL = 5.0  # v2 이미지 송신 주기 (초) - 이벤트(start/col/end) 발생 시에는 즉시 송신
+
+# 텔레메트리 이미지 인코더 설정 (v2)
+TELEMETRY_BYTE_BUDGET = 16000  # AGV당 이미지 바이트 예산 (bytes/s)
+TELEMETRY_RATE_WINDOW = 10.0  # 송신률 평균 윈도우 (초)
+TELEMETRY_JPEG_QUALITY_RANGE = (30, 85)  # JPEG 품질 (최소, 최대)
+TELEMETRY_QUALITY_STEP = 10
+TELEMETRY_SCALE_STEPS = (1.0, 0.75, 0.5)  # 품질이 최소일 때 단계적으로 해상도 축소
+TELEMETRY_DIFF_SIZE = (32, 32)  # 변화 감지용 축소 크기
+TELEMETRY_CHANGE_THRESHOLD = 4.0  # 축소 흑백 프레임 평균 차이 (0~255) 미만이면 송신 생략
+
+# MQTT 송신 큐 설정
+PUBLISH_JOURNAL_PATH = "publish_journal.jsonl"  # 제어 이벤트(start/col/end) 저널 파일, None이면 비활성화
+PUBLISH_QUEUE_TELEMETRY_MAX = 20  # 일반 센싱 메시지 최대 대기 수 (초과 시 오래된 것부터 폐기)
+PUBLISH_QUEUE_IMAGE_MAX = 3  # 이미지 최대 대기 수 (초과 시 오래된 것부터 폐기)
+PUBLISH_MAX_INFLIGHT = 10  # ACK 대기 중인 최대 메시지 수 (paho 내부 큐 적체 방지)
+
+# 작업 큐 설정 (task_queue.py) - 실행 중 들어온 명령은 대기 후 순서대로 실행
+TASK_QUEUE_PATH = "task_queue.json"  # 대기 작업 저장 파일 (재시작 시 복원), None이면 메모리에만 유지
+TASK_QUEUE_MAX = 20  # 최대 대기 작업 수 (초과 시 새 명령 거부)
+TASK_REQUEUE_MAX = 3  # 집지 못한 물건 (미발견 / 적재 위치 부족) 을 다시 운행하는 최대 횟수 (첫 운행 포함)
+TIMER_WHEEL_TICK = 0.1  # 지연 시작 타이머 해상도 (초)
+TIMER_WHEEL_SLOTS = 512  # 타이머 휠 슬롯 수 (한 바퀴 = TICK x SLOTS 초)
+
+# 로깅 설정 (structured_logging.py)
+LOG_LEVEL = "INFO"  # DEBUG 로 바꾸면 마커 재시도 / 원본 명령 등 상세 로그 출력
+LOG_FORMAT = "text"  # "text" 또는 "json" (한 줄 JSON)
+
+# 프로파일링 설정 (profiler.py) - 종료 시 PROFILING_OUTPUT_DIR 에 결과 저장
+PROFILING_ENABLED = False  # 스레드별 CPU 사용량 / GIL 대기 추정
+PROFILING_STACK_SAMPLING = False  # 샘플링 스택 프로파일 (.folded, flamegraph.pl / speedscope 용)
+PROFILING_SAMPLE_INTERVAL = 0.01  # 스택 샘플링 주기 (초)
+PROFILING_CPU_INTERVAL = 1.0  # 스레드 CPU 집계 주기 (초)
+PROFILING_OUTPUT_DIR = "profiles"
+
+# 런타임 측정값 엔드포인트 (GET /metrics: Prometheus 텍스트, GET /metrics.json)
+METRICS_ENABLED = True
+METRICS_HOST = "127.0.0.1"  # 외부에서 수집하려면 "0.0.0.0"
+METRICS_PORT = 9100
 
 # AI 모델 설정
 MODEL_PATH = "../best.pth"
 IMAGENET_MEAN = [0.485, 0.456, 0.406]
 IMAGENET_STD = [0.229, 0.224, 0.225]
+STEERING_WARMUP_FRAMES = 20  # 로드 후 합성 프레임 예열 추론 횟수 (준비 완료 전)
+MODEL_TOPIC = "agv/{agv_id}/model"  # 모델 교체 명령 {"path": ..., "sha256": (선택)}, 결과는 .../model/status
+MODEL_DIR = ".."  # 교체 명령으로 받을 수 있는 모델 파일 위치 - 이 디렉터리 아래 경로만 허용 (상대 경로는 이 기준)
+MODEL_WATCH_ENABLED = True  # MODEL_PATH 파일이 바뀌면 자동 교체
+MODEL_WATCH_INTERVAL = 5.0  # 파일 변경 확인 주기 (초)
 
 # 카메라 설정
 FRAME_WIDTH = 224
@@ -30,6 +78,18 @@ FRAME_HEIGHT = 224
 CAMERA_CENTER_X = 112
 CAMERA_CENTER_Y = 112
 
+# 카메라 캘리브레이션 설정
+CAMERA_CALIBRATION_PATH = None  # np.savez 파일 (K, dist, size), None이면 아래 기본값 사용
+CAMERA_INTRINSIC = [
+    [146.7755, 0, 151.9934],
+    [0, 196.3291, 134.7969],
+    [0, 0, 1]
+]
+CAMERA_DIST = [-0.2865, 0.0591, 0.0, 0.0, 0.0]
+CAMERA_CALIBRATION_SIZE = (300, 300)  # 캘리브레이션 당시 이미지 크기 (w, h)
+AREA_UNDISTORT_ENABLED = False  # 영역 탐지 시 왜곡 보정 사용 여부 - 도착 판단 임계값 (면적 500 / Y 좌표) 은 보정 없는 영상 기준, 켜려면 다시 조정
+AREA_DETECTION_ROI = None  # (x, y, w, h) - None이면 전체 프레임
+
 # 영상처리 설정
 BLUR_KERNEL_SIZE = (15, 15)
 EROSION_ITERATIONS = 2
@@ -40,6 +100,18 @@ ARRIVAL_THRESHOLD_X = 15
 ARRIVAL_THRESHOLD_Y = 15
 AREA_DETECTION_INTERVAL = 0.1
 
+# 비전 단계 실행 모드 (vision_pool.py) - 작업영역 / 마커 탐지
+VISION_EXECUTION_MODE = "thread"  # "thread": 탐지 스레드에서 직접 실행, "process": 작업 프로세스 (GIL 분리)
+VISION_WORKERS = 1  # 작업 프로세스 수 (영역 탐지와 마커 탐지는 순차 실행이므로 보통 1)
+VISION_MAX_FRAME_SHAPE = (480, 640, 3)  # 공유 메모리 슬롯 크기 (h, w, c) - 이보다 큰 프레임은 처리 불가
+VISION_TASK_TIMEOUT = 2.0  # 작업자 응답 대기 (초) - 초과 시 작업자 재시작
+
+# 정적 장면 생략 (scene_change.py) - 조향 추론 / 작업영역 탐지가 마지막 결과 재사용
+SCENE_SKIP_ENABLED = True
+SCENE_SIGNATURE_SIZE = (16, 16)  # 장면 서명 (흑백 축소) 크기 (w, h)
+SCENE_CHANGE_THRESHOLD = 2.0  # 마지막 처리 프레임과의 평균 밝기 차이 (0~255) 미만이면 생략
+SCENE_REFRESH_INTERVAL = 1.0  # 장면이 그대로여도 이 시간 (초) 이 지나면 다시 처리
+
 # HSV 색상 범위
 COLOR_LIST = ["red", "green", "blue", "purple", "yellow", "orange"]
 COLOR_RANGES = [
@@ -58,12 +130,47 @@ STEERING_DGAIN = 0.0
 STEERING_BIAS = 0.0
 ROAD_FOLLOWING_INTERVAL = 0.1
 
+# 조향 필터 / 속도 스케줄 (steering_filter.py) - False 면 매 틱 추론 + 고정 SPEED_GAIN
+STEERING_FILTER_ENABLED = True
+STEERING_FILTER_ALPHA = 0.5  # 위치 보정 비율 (클수록 측정값을 빠르게 따름)
+STEERING_FILTER_BETA = 0.1  # 속도 보정 비율
+STEERING_FILTER_MAX_PREDICT = 0.5  # 추론 없이 외삽하는 최대 시간 (초) - 이후 신뢰도 0
+STEERING_INFERENCE_EVERY = 2  # N 틱마다 1회 추론, 나머지 틱은 필터 예측으로 조향
+STEERING_RESIDUAL_SCALE = 0.1  # 예측 오차 이동 평균이 이 값이면 신뢰도 0.5
+SPEED_MIN = 0.12  # 급커브 / 낮은 신뢰도에서의 속도
+SPEED_MAX = 0.24  # 직선 + 높은 신뢰도에서의 속도
+SPEED_CURVE_ANGLE = 0.5  # 이 조향각 (rad) 이상이면 SPEED_MIN
+SPEED_LOOKAHEAD = 0.3  # 곡률 예측 시점 (초)
+SPEED_ACCEL_LIMIT = 0.01  # 틱당 속도 증가 한도
+SPEED_DECEL_LIMIT = 0.03  # 틱당 속도 감소 한도 - SPEED_MAX → SPEED_MIN 4틱 (SPEED_LOOKAHEAD 로 커브 전에 감속 시작)
+
+# 충돌 / 정체 감지 (collision_detector.py) - 조향 루프에서 명령 속도와 영상 움직임 비교, 감지 시 즉시 정지 + "col" 송신
+COLLISION_DETECTION_ENABLED = True
+COLLISION_FRAME_SIZE = (80, 60)  # 광류 계산용 흑백 축소 크기 (w, h)
+COLLISION_MAX_FEATURES = 40  # 추적 특징점 최대 수
+COLLISION_MIN_FEATURES = 8  # 추적 성공 특징점이 이보다 적으면 광류 대신 프레임 차이로 판단
+COLLISION_MIN_COMMAND = 0.1  # 좌우 평균 명령 속도가 이 이상일 때만 판단 (주행 중)
+COLLISION_STALL_FLOW = 4.0  # 영상 움직임 (축소 프레임 px/초, 특징점 이동량 중앙값) 이 이 미만이면 정체
+COLLISION_STATIC_DIFF = 1.0  # 특징점 부족 시 평균 밝기 차이 (0~255) 가 이 미만이면 정체
+COLLISION_STALL_TIME = 0.5  # 정체가 이 시간 (초) 이상 이어지면 충돌
+COLLISION_IMPACT_DIFF = 40.0  # 직전 프레임과의 평균 밝기 차이가 이 이상이고
+COLLISION_IMPACT_RATIO = 4.0  # 주행 중 평균 차이의 이 배 이상이면 충돌 (화면 전체 급변)
+COLLISION_GRACE_TIME = 1.0  # 주행 시작 후 판단 유예 (초) - 모터 가속 구간
+COLLISION_RESUME_DELAY = 3.0  # 충돌 정지 후 주행 재개까지 대기 (초) - None 이면 정지 유지
+COLLISION_MAX_RETRIES = 3  # 재개한 주행이 다른 명령 없이 다시 충돌하면 연속 충돌 - 이 횟수만큼 재개한 뒤에도 충돌하면 운행 중단 (None 이면 제한 없음)
+COLLISION_RECORD_DIR = None  # 주행 기록 (축소 프레임 + 명령 속도) 저장 경로 - collision_replay.py 검증용, None 이면 기록 안 함
+COLLISION_RECORD_MAX_FRAMES = 6000  # 주행 1회 기록 최대 프레임 수 (10Hz 기준 10분)
+
 # 로봇팔 설정
 ROBOT_ARM_ENABLED = True  # 로봇팔 사용 여부
 ARM_PICK_HEIGHT_OFFSET = 20  # 집기 전 높이 오프셋 (mm)
 ARM_PLACE_HEIGHT_OFFSET = 50  # 놓기 전 높이 오프셋 (mm)
 ARM_SAFE_HEIGHT = 100  # 안전 높이 (mm)
 ARM_OPERATION_DELAY = 2.0  # 로봇팔 동작 대기 시간 (초)
+ARM_PLACE_POSITION = (200, 0, 50)  # 배송 영역 놓기 위치 (mm)
+ARM_PLACE_SPACING = 40  # 여러 물건을 놓을 때 y 방향 간격 (mm)
+ARM_BATCH_ENABLED = False  # 여러 물건 운행 (ARM_CARRY_POSITIONS 에 적재) - 적재 위치 실측 전에는 끔, False 면 운행당 물건 1개
+ARM_CARRY_POSITIONS = [(-60, 80, 40), (-60, -80, 40), (-120, 0, 40)]  # 여러 물건 운행 시 AGV 적재 위치 (mm, 실측 후 조정) - 개수가 한 번에 실을 수 있는 최대 물건 수
 
 # 물건 탐지 설정
 OBJECT_DETECTION_TIMEOUT = 10.0  # 물건 탐지 타임아웃 (초)
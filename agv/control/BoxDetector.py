@@ -2,9 +2,10 @@ import cv2
 import numpy as np
 
 class BoxDetector:
-    def __init__(self):
-        
-        # camera parameter
+    def __init__(self, camera_model=None):
+
+        # camera parameter (camera_model이 없을 때 사용, 300x300 기준)
+        self.camera_model = camera_model
         self.cam_intrinsic = np.array([
             [146.7755, 0, 151.9934],
             [0, 196.3291, 134.7969],
@@ -40,10 +41,19 @@ class BoxDetector:
         corners, ids, rejected = self.detector.detectMarkers(frame)
         ret = {}
 
+        if self.camera_model is not None:
+            # 프레임 해상도에 맞게 스케일된 intrinsic 사용 (리사이즈 불필요)
+            cam_intrinsic = self.camera_model.intrinsic_for_frame(frame)
+            cam_dist = self.camera_model.dist
+        else:
+            cam_intrinsic = self.cam_intrinsic
+            cam_dist = self.cam_dist
+
         if ids is not None:
+            ids = ids.flatten()  # OpenCV 4.x: (N, 1), 5.x: (N,)
             for i, corner in enumerate(corners):
                 corner = corner.reshape((4, 2))
-                success, rvec, tvec = cv2.solvePnP(self.marker_3d_edges, corner, self.cam_intrinsic, self.cam_dist)
+                success, rvec, tvec = cv2.solvePnP(self.marker_3d_edges, corner, cam_intrinsic, cam_dist)
 
                 if success:
                     R, _        = cv2.Rodrigues(rvec)
@@ -56,7 +66,7 @@ class BoxDetector:
                     off_x = np.cos(target_theta) * self.off_r
                     off_y = np.sin(target_theta) * self.off_r
 
-                    ret[int(ids[i][0])] = x_world[:3] + np.array([off_x, off_y, self.off_z])
+                    ret[int(ids[i])] = x_world[:3] + np.array([off_x, off_y, self.off_z])
 
         return ret
         
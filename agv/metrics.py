@@ -0,0 +1,337 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+런타임 측정값 집계 - 카운터 / 게이지 / 고정 버킷 히스토그램, Prometheus 텍스트 엔드포인트
+
+기록 경로는 락 없이 동작 (제어 루프에서 상시 사용 가능)
+- 카운터 / 히스토그램: 스레드별 셀에 누적, 조회 시에만 합산
+  (종료된 스레드의 셀은 새 셀 생성 / 조회 시 기본 셀에 합쳐 제거 - 짧게 사는 스레드가 셀을 쌓지 않음)
+- 게이지: 단일 값 대입 (또는 조회 시 호출되는 함수)
+"""
+
+import bisect
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 기본 버킷 상한 (초) - 0.5ms ~ 2s
+DEFAULT_TIME_BUCKETS = (
+    0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05,
+    0.1, 0.2, 0.5, 1.0, 2.0
+)
+
+# 로봇팔 동작 등 긴 구간용 버킷 (초)
+LONG_TIME_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 10.0, 20.0, 30.0)
+
+class _ThreadCells:
+    """스레드별 셀 목록 - 셀 생성 / 조회 시에만 락 사용, fold(base, cell): 종료된 스레드의 셀을 기본 셀에 합침"""
+
+    def __init__(self, factory, fold):
+        self._factory = factory
+        self._fold = fold
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._base = factory()
+        self._cells = []  # (스레드, 셀)
+
+    def get(self):
+        cell = getattr(self._local, "cell", None)
+        if cell is None:
+            cell = self._factory()
+            with self._lock:
+                self._prune_locked()
+                self._cells.append((threading.current_thread(), cell))
+            self._local.cell = cell
+        return cell
+
+    def _prune_locked(self):
+        # 종료된 스레드는 더 이상 기록하지 않으므로 락 없이 합쳐도 안전
+        alive = []
+        for thread, cell in self._cells:
+            if thread.is_alive():
+                alive.append((thread, cell))
+            else:
+                self._fold(self._base, cell)
+        self._cells = alive
+
+    def all(self):
+        with self._lock:
+            self._prune_locked()
+            return [self._base] + [cell for _, cell in self._cells]
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help="", labels=None):
+        self.name = name
+        self.help = help
+        self.labels = labels or {}
+        self._cells = _ThreadCells(lambda: [0], self._fold)
+
+    @staticmethod
+    def _fold(base, cell):
+        base[0] += cell[0]
+
+    def inc(self, amount=1):
+        self._cells.get()[0] += amount
+
+    def value(self):
+        return sum(cell[0] for cell in self._cells.all())
+
+    def snapshot(self):
+        return self.value()
+
+class Gauge:
+    kind = "gauge"
+
+    def __init__(self, name, help="", labels=None, func=None):
+        self.name = name
+        self.help = help
+        self.labels = labels or {}
+        self._value = 0.0
+        self._func = func
+
+    def set(self, value):
+        self._value = value
+
+    def set_function(self, func):
+        """조회 시점에 값을 계산 (큐 깊이 등)"""
+        self._func = func
+
+    def value(self):
+        if self._func is not None:
+            try:
+                return self._func()
+            except Exception:
+                return None
+        return self._value
+
+    def snapshot(self):
+        return self.value()
+
+class _HistogramCell:
+    __slots__ = ("generation", "counts", "sum", "count", "min", "max")
+
+    def __init__(self, size, generation):
+        self.generation = generation
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+        self.min = None
+        self.max = None
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, buckets=DEFAULT_TIME_BUCKETS, help="", labels=None):
+        self.name = name
+        self.help = help
+        self.labels = labels or {}
+        self.buckets = tuple(buckets)
+        self._generation = 0
+        self._cells = _ThreadCells(lambda: _HistogramCell(len(self.buckets) + 1, self._generation), self._fold)
+
+    def reset(self):
+        """다음 기록부터 각 스레드 셀을 비움 (이전 세대 셀은 조회에서 제외)"""
+        self._generation += 1
+
+    def _clear(self, cell):
+        cell.counts = [0] * (len(self.buckets) + 1)  # 마지막은 +Inf
+        cell.sum = 0.0
+        cell.count = 0
+        cell.min = None
+        cell.max = None
+        cell.generation = self._generation
+
+    def _fold(self, base, cell):
+        if cell.generation != self._generation:
+            return
+        if base.generation != self._generation:
+            self._clear(base)
+        for i, c in enumerate(cell.counts):
+            base.counts[i] += c
+        base.sum += cell.sum
+        base.count += cell.count
+        if cell.min is not None and (base.min is None or cell.min < base.min):
+            base.min = cell.min
+        if cell.max is not None and (base.max is None or cell.max > base.max):
+            base.max = cell.max
+
+    def observe(self, value):
+        idx = bisect.bisect_left(self.buckets, value)
+        cell = self._cells.get()
+        if cell.generation != self._generation:
+            self._clear(cell)
+        cell.counts[idx] += 1
+        cell.sum += value
+        cell.count += 1
+        if cell.min is None or value < cell.min:
+            cell.min = value
+        if cell.max is None or value > cell.max:
+            cell.max = value
+
+    def _merged(self):
+        counts = [0] * (len(self.buckets) + 1)
+        total, count, vmin, vmax = 0.0, 0, None, None
+        for cell in self._cells.all():
+            if cell.generation != self._generation:
+                continue
+            for i, c in enumerate(cell.counts):
+                counts[i] += c
+            total += cell.sum
+            count += cell.count
+            if cell.min is not None and (vmin is None or cell.min < vmin):
+                vmin = cell.min
+            if cell.max is not None and (vmax is None or cell.max > vmax):
+                vmax = cell.max
+        return counts, total, count, vmin, vmax
+
+    def percentile(self, q):
+        """버킷 상한 기준 근사 백분위수 (q: 0~1)"""
+        counts, _, count, _, vmax = self._merged()
+        return self._percentile(counts, count, vmax, q)
+
+    def _percentile(self, counts, count, vmax, q):
+        if count == 0:
+            return None
+        target = q * count
+        acc = 0
+        for i, c in enumerate(counts):
+            acc += c
+            if acc >= target and c > 0:
+                return self.buckets[i] if i < len(self.buckets) else vmax
+        return vmax
+
+    def snapshot(self):
+        """현재 집계 결과"""
+        counts, total, count, vmin, vmax = self._merged()
+        return {
+            "count": count,
+            "sum": total,
+            "mean": total / count if count else None,
+            "min": vmin,
+            "max": vmax,
+            "p50": self._percentile(counts, count, vmax, 0.5),
+            "p90": self._percentile(counts, count, vmax, 0.9),
+            "p99": self._percentile(counts, count, vmax, 0.99),
+            "buckets": dict(zip(list(self.buckets) + ["+Inf"], counts)),
+        }
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}  # (name, labels) -> 측정 항목
+
+    def _get_or_create(self, cls, name, labels, **kwargs):
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            metric = self._metrics.get(key)
+            if metric is None:
+                metric = cls(name, labels=labels, **kwargs)
+                self._metrics[key] = metric
+            elif not isinstance(metric, cls):
+                raise ValueError(f"측정 항목 종류 불일치: {name}")
+            return metric
+
+    def counter(self, name, help="", labels=None):
+        return self._get_or_create(Counter, name, labels, help=help)
+
+    def gauge(self, name, help="", labels=None, func=None):
+        gauge = self._get_or_create(Gauge, name, labels, help=help)
+        if func is not None:
+            gauge.set_function(func)
+        return gauge
+
+    def histogram(self, name, help="", labels=None, buckets=DEFAULT_TIME_BUCKETS):
+        return self._get_or_create(Histogram, name, labels, help=help, buckets=buckets)
+
+    def metrics(self):
+        with self._lock:
+            return sorted(self._metrics.values(), key=lambda m: (m.name, sorted(m.labels.items())))
+
+    def snapshot(self):
+        """JSON 용 전체 측정값 {이름{라벨}: 값}"""
+        return {_series_name(m.name, m.labels): m.snapshot() for m in self.metrics()}
+
+    def render_prometheus(self):
+        """Prometheus 텍스트 형식 (0.0.4)"""
+        lines = []
+        described = set()
+        for metric in self.metrics():
+            if metric.name not in described:
+                described.add(metric.name)
+                if metric.help:
+                    lines.append(f"# HELP {metric.name} {metric.help}")
+                lines.append(f"# TYPE {metric.name} {metric.kind}")
+
+            if metric.kind != "histogram":
+                value = metric.value()
+                if value is not None:
+                    lines.append(f"{_series_name(metric.name, metric.labels)} {_format_value(value)}")
+                continue
+
+            counts, total, count, _, _ = metric._merged()
+            acc = 0
+            for upper, c in zip(list(metric.buckets) + ["+Inf"], counts):
+                acc += c
+                labels = dict(metric.labels, le=upper if upper == "+Inf" else _format_value(upper))
+                lines.append(f"{_series_name(metric.name + '_bucket', labels)} {acc}")
+            lines.append(f"{_series_name(metric.name + '_sum', metric.labels)} {_format_value(total)}")
+            lines.append(f"{_series_name(metric.name + '_count', metric.labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+def _series_name(name, labels):
+    if not labels:
+        return name
+    body = ",".join(f'{key}="{_escape(value)}"' for key, value in sorted(labels.items()))
+    return f"{name}{{{body}}}"
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_value(value):
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+# AGV 프로세스 공용 레지스트리
+REGISTRY = MetricsRegistry()
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.startswith("/metrics.json"):
+            body = json.dumps(self.registry.snapshot(), default=str).encode('utf-8')
+            content_type = "application/json"
+        elif self.path.startswith("/metrics"):
+            body = self.registry.render_prometheus().encode('utf-8')
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # 요청마다 출력하지 않음
+
+class MetricsServer(threading.Thread):
+    """측정값 HTTP 엔드포인트 - GET /metrics (Prometheus 텍스트), GET /metrics.json"""
+
+    def __init__(self, host="127.0.0.1", port=9100, registry=REGISTRY):
+        super().__init__(name="metrics-http", daemon=True)
+        handler = type("MetricsHandler", (_MetricsHandler,), {"registry": registry})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+
+    def run(self):
+        self.httpd.serve_forever()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -14,33 +14,88 @@ import cv2
 import random
 from datetime import datetime
 from config import *
+import sensing_protocol
+from telemetry_encoder import TelemetryImageEncoder
+from metrics import REGISTRY
+from scheduling import DeadlineTicker
+from publish_queue import PublishQueue, PRIORITY_CONTROL, PRIORITY_TELEMETRY, PRIORITY_IMAGE
+from structured_logging import get_logger, WARNING
+
+log = get_logger(__name__)
 
 class MQTTManager:
-    def __init__(self, command_callback=None, camera=None):
+    def __init__(self, command_callback=None, camera=None, model_callback=None, agv_id=AGV_ID,
+                 broker_address=MQTT_BROKER_ADDRESS, broker_port=MQTT_BROKER_PORT,
+                 journal_path=PUBLISH_JOURNAL_PATH):
+        """agv_id / broker_* / journal_path: 한 프로세스에서 여러 AGV 를 띄울 때 (fleet_sim.py) 인스턴스별 지정"""
         self.client = None
         self.is_connected = False
         self.command_callback = command_callback
+        self.model_callback = model_callback  # 모델 교체 명령 (agv/{id}/model)
         self.camera = camera
         
+        # AGV 식별 / 토픽 (기본값은 config.py)
+        self.agv_id = str(agv_id)
+        self.broker_address = broker_address
+        self.broker_port = broker_port
+        self.command_topic = COMMAND_TOPIC.format(agv_id=self.agv_id)
+        self.sensing_topic = SENSING_TOPIC.format(agv_id=self.agv_id)
+        self.image_topic = IMAGE_TOPIC.format(agv_id=self.agv_id)
+        self.task_queue_topic = TASK_QUEUE_TOPIC.format(agv_id=self.agv_id)
+        self.model_topic = MODEL_TOPIC.format(agv_id=self.agv_id)
+        
+        # 우선순위 송신 큐 (오프라인 버퍼링 / 제어 이벤트 저널)
+        self.publish_queue = PublishQueue(journal_path, self.agv_id)
+        
         # 송신 관련
         self.is_task_running = False
         self.is_finished = False
+        self.delivered_count = None
+        self.end_sent = False
         self.sensing_thread = None
         self.sensing_thread_flag = False
+        self.sensing_stop_event = threading.Event()
+        
+        # 센싱 주기 측정 (틱 지연 / 인코딩 / 송신 시간)
+        self.sensing_ticker = DeadlineTicker(SENSING_INTERVAL)
+        labels = {"agv": self.agv_id}  # 모의 실행에서 한 프로세스에 여러 AGV
+        self.sensing_histograms = {
+            "tick_jitter": REGISTRY.histogram("sensing_tick_jitter_seconds", "센싱 주기 데드라인 대비 지연", labels=labels),
+            "encode": REGISTRY.histogram("sensing_encode_seconds", "센싱 이미지 인코딩 시간", labels=labels),
+            "publish": REGISTRY.histogram("sensing_publish_seconds", "센싱 메시지 송신 요청 시간", labels=labels),
+        }
+        REGISTRY.gauge("sensing_missed_ticks", "처리 지연으로 건너뛴 센싱 주기 수", labels=labels,
+                       func=lambda: self.sensing_ticker.missed_ticks)
         
         # 작업 상태 관리
         self.current_work_id = None
         self.work_started = False
         self.collision_occurred = False
         
+        # v2 바이너리 포맷 관련
+        self.seq = 0
+        self.last_image_time = 0.0
+        self.box_idx = 0
+        self.image_encoder = None
+        
     def connect(self):
         try:
             self.client = mqtt.Client()
             self.client.on_connect = self._on_connect
+            self.client.on_disconnect = self._on_disconnect
             self.client.on_message = self._on_message
+            self.client.on_publish = self._on_publish
+            
+            self.publish_queue.set_client(self.client)
+            if not self.publish_queue.is_alive():
+                self.publish_queue.start()
             
-            self.client.connect(MQTT_BROKER_ADDRESS, MQTT_BROKER_PORT, 60)
+            self.client.connect(self.broker_address, self.broker_port, 60)
             self.client.loop_start()
+            # 프로파일러 / 스택 샘플에서 구분할 수 있도록 paho 네트워크 스레드 이름 지정
+            network_thread = getattr(self.client, "_thread", None)
+            if network_thread is not None:
+                network_thread.name = "mqtt-network"
             return True
         except:
             return False
@@ -48,11 +103,22 @@ class MQTTManager:
     def _on_connect(self, client, userdata, flags, rc):
         if rc == 0:
             self.is_connected = True
-            client.subscribe(COMMAND_TOPIC, 1)
-            print(f"MQTT 연결 성공 및 토픽 구독: {COMMAND_TOPIC}")
+            client.subscribe([(self.command_topic, 1), (self.model_topic, 1)])
+            log.info("MQTT 연결 성공 및 토픽 구독: %s, %s", self.command_topic, self.model_topic)
+            
+            # 대기 중인 송신 큐 순서대로 재전송
+            self.publish_queue.set_connected(True)
         else:
             self.is_connected = False
-            print(f"MQTT 연결 실패: {rc}")
+            log.warning("MQTT 연결 실패: %s", rc)
+    
+    def _on_disconnect(self, client, userdata, rc):
+        self.is_connected = False
+        self.publish_queue.set_connected(False)
+        log.warning("MQTT 연결 해제: %s - 송신 데이터는 큐에 보관", rc)
+    
+    def _on_publish(self, client, userdata, mid):
+        self.publish_queue.on_publish(mid)
     
     def _convert_location_to_string(self, location):
         """위치 데이터를 문자열로 변환"""
@@ -61,35 +127,38 @@ class MQTTManager:
                 if location in COLOR_LIST:
                     return location
                 else:
-                    print(f"알 수 없는 색상명: {location}")
+                    log.warning("알 수 없는 색상명: %s", location)
                     return None
             
             elif isinstance(location, int):
                 if 0 <= location < len(COLOR_LIST):
                     color_name = COLOR_LIST[location]
-                    print(f"정수 {location} -> 색상 '{color_name}'으로 변환")
+                    log.debug("정수 %s -> 색상 '%s'으로 변환", location, color_name)
                     return color_name
                 else:
-                    print(f"색상 인덱스 범위 초과: {location}")
+                    log.warning("색상 인덱스 범위 초과: %s", location)
                     return None
             
             else:
-                print(f"지원하지 않는 위치 데이터 타입: {type(location)}")
+                log.warning("지원하지 않는 위치 데이터 타입: %s", type(location))
                 return None
                 
         except Exception as e:
-            print(f"위치 변환 오류: {e}")
+            log.warning("위치 변환 오류: %s", e)
             return None
     
     def _on_message(self, client, userdata, msg):
+        if msg.topic == self.model_topic:
+            self._on_model_message(msg)
+            return
         try:
             command_data = json.loads(msg.payload.decode("utf-8"))
-            print(f"원본 명령 수신: {command_data}")
+            log.debug("원본 명령 수신: %s", command_data)
             
             # 필수 필드 확인
             required_fields = ["timedata", "start", "end", "delays", "item_idx"]
             if not all(field in command_data for field in required_fields):
-                print("필수 필드 누락된 명령 무시")
+                log.warning("필수 필드 누락된 명령 무시")
                 return
             
             # 위치 데이터 변환
@@ -97,78 +166,232 @@ class MQTTManager:
             end_location = self._convert_location_to_string(command_data["end"])
             
             if start_location is None or end_location is None:
-                print("위치 데이터 변환 실패 - 명령 무시")
+                log.warning("위치 데이터 변환 실패 - 명령 무시")
                 return
             
+            # 물건 인덱스: 정수 1개 또는 목록 (여러 물건 운행)
+            item_idx = command_data["item_idx"]
+            if isinstance(item_idx, list):
+                if not item_idx:
+                    log.warning("빈 물건 목록 - 명령 무시")
+                    return
+                item_idx = [int(idx) for idx in item_idx]
+            
             # 변환된 데이터로 새 명령 생성
             converted_command = {
                 "timedata": command_data["timedata"],
                 "start": start_location,
                 "end": end_location,
                 "delays": command_data["delays"],
-                "item_idx": command_data["item_idx"]
+                "item_idx": item_idx,
+                "priority": command_data.get("priority", 0)
             }
             
-            print(f"변환된 명령: {converted_command}")
+            log.info("변환된 명령: %s", converted_command)
             
             if self.command_callback:
                 self.command_callback(converted_command)
                 
         except Exception as e:
-            print(f"명령 처리 오류: {e}")
+            log.error("명령 처리 오류: %s", e)
+    
+    def _on_model_message(self, msg):
+        """모델 교체 명령 - {"path": 가중치 파일 경로, "sha256": (선택) 파일 해시}"""
+        try:
+            request = json.loads(msg.payload.decode("utf-8"))
+            if not isinstance(request, dict) or not request.get("path"):
+                log.warning("모델 교체 명령에 path 없음 - 무시")
+                return
+            log.info("모델 교체 명령 수신: %s", request["path"])
+            if self.model_callback:
+                self.model_callback(request)
+        except Exception as e:
+            log.error("모델 교체 명령 처리 오류: %s", e)
     
     def start_sensing_transmission(self):
-        """센서 데이터 송신 시작 (0.5초마다)"""
+        """센서 데이터 송신 시작 (SENSING_INTERVAL 마다)"""
         if self.sensing_thread and self.sensing_thread.is_alive():
             return
             
         self.is_task_running = True
         self.is_finished = False
+        self.delivered_count = None
+        self.end_sent = False
         self.sensing_thread_flag = True
+        self.sensing_stop_event.clear()
+        self.sensing_ticker.reset()
         
         # 작업 시작 시 새로운 workId 생성
         self.current_work_id = random.randint(100000, 999999)
         self.work_started = False
         self.collision_occurred = False
+        self.seq = 0
+        self.last_image_time = 0.0
+        
+        if SENSING_PROTOCOL_VERSION >= 2:
+            if self.image_encoder is None:
+                self.image_encoder = TelemetryImageEncoder(
+                    self._publish_image, encode_histogram=self.sensing_histograms["encode"]
+                )
+                self.image_encoder.start()
+            self.image_encoder.reset_reference()
         
-        self.sensing_thread = threading.Thread(target=self._sensing_loop)
+        self.sensing_thread = threading.Thread(target=self._sensing_loop, name="sensing")
         self.sensing_thread.daemon = True
         self.sensing_thread.start()
-        print(f"센서 데이터 송신 시작 - Work ID: {self.current_work_id}")
+        log.info("센서 데이터 송신 시작 - Work ID: %s", self.current_work_id)
     
     def stop_sensing_transmission(self):
-        """센서 데이터 송신 정지"""
+        """센서 데이터 송신 정지 - 완료 상태인데 end 를 아직 못 보냈으면 (같은 틱에 col 등) 송신 루프가 보낼 때까지 잠시 대기"""
+        if self.is_finished and not self.end_sent and self.sensing_thread and self.sensing_thread.is_alive():
+            self.sensing_thread.join(timeout=SENSING_INTERVAL * 4)
+            if not self.end_sent:
+                log.warning("작업 완료 신호 (end) 미전송 상태로 송신 정지 - Work ID: %s", self.current_work_id)
         self.sensing_thread_flag = False
         self.is_task_running = False
+        self.sensing_stop_event.set()
         
         if self.sensing_thread and self.sensing_thread.is_alive():
             self.sensing_thread.join(timeout=1.0)
-        print("센서 데이터 송신 정지")
+        
+        if self.image_encoder:
+            stats = self.image_encoder.stats()
+            log.info("센서 데이터 송신 정지", images=stats['sent_frames'], bytes_per_sec=stats['bytes_per_sec'],
+                     quality=stats['quality'], scale=stats['scale'], skipped_static=stats['skipped_static'],
+                     skipped_budget=stats['skipped_budget'])
+        else:
+            log.info("센서 데이터 송신 정지")
     
-    def set_task_finished(self):
-        """작업 완료 상태 설정"""
+    def set_task_finished(self, delivered=None):
+        """작업 완료 상태 설정 - delivered: 배송 완료 물건 수 (end 메시지에 실어 디스패처가 완료 집계에 사용)"""
+        self.delivered_count = delivered
         self.is_finished = True
     
     def trigger_collision(self):
         """충돌 발생 신호"""
         self.collision_occurred = True
-        print("충돌 발생 감지")
+        log.info("충돌 발생 감지")
     
     def _sensing_loop(self):
-        """0.5초마다 센서 데이터 송신하는 루프"""
+        """SENSING_INTERVAL 마다 센서 데이터 송신하는 루프 (monotonic 데드라인 기준, 지연된 틱은 건너뜀)"""
         while self.sensing_thread_flag and self.is_task_running:
+            jitter = self.sensing_ticker.wait(self.sensing_stop_event)
+            if jitter is None or not self.sensing_thread_flag:
+                break
+            self.sensing_histograms["tick_jitter"].observe(jitter)
+            
             try:
                 self._send_sensing_data()
-                time.sleep(0.5)
             except Exception as e:
-                print(f"센서 데이터 송신 오류: {e}")
-                time.sleep(0.5)
+                log.throttled(5.0, WARNING, "센서 데이터 송신 오류: %s", e)
+    
+    def get_sensing_timing(self):
+        """센싱 주기 측정 결과 (런타임 조회용)"""
+        timing = {name: hist.snapshot() for name, hist in self.sensing_histograms.items()}
+        timing["ticks"] = self.sensing_ticker.ticks
+        timing["missed_ticks"] = self.sensing_ticker.missed_ticks
+        timing["interval"] = self.sensing_ticker.interval
+        return timing
+    
+    def _next_cmd_string(self):
+        """이번 송신의 cmd_string 결정"""
+        cmd_string = None
+        if not self.work_started:
+            # 작업 시작
+            cmd_string = "start"
+            self.work_started = True
+            log.info("작업 시작 신호 전송 - Work ID: %s", self.current_work_id)
+        elif self.collision_occurred:
+            # 충돌 발생
+            cmd_string = "col"
+            self.collision_occurred = False  # 충돌 신호 리셋
+            log.info("충돌 신호 전송 - Work ID: %s", self.current_work_id)
+        elif self.is_finished:
+            # 작업 완료
+            cmd_string = "end"
+            log.info("작업 완료 신호 전송 - Work ID: %s", self.current_work_id)
+        else:
+            # 작업 중
+            cmd_string = None
+        return cmd_string
     
     def _send_sensing_data(self):
-        """센서 데이터 송신 - 새로운 JSON 포맷"""
-        if not self.is_connected:
-            return
+        """센서 데이터 송신 - SENSING_PROTOCOL_VERSION 에 따라 포맷 선택 (연결 끊김 시에도 큐에 보관)"""
+        if SENSING_PROTOCOL_VERSION >= 2:
+            cmd_string = self._send_sensing_data_v2()
+        else:
+            cmd_string = self._send_sensing_data_v1()
+        
+        # 완료 상태가 된 틱에 start / col 을 보냈으면 다음 틱에 end 를 보낸 뒤 종료
+        if cmd_string == "end":
+            self.end_sent = True
+            log.info("작업 완료 - 센서 데이터 송신 종료")
+            self.sensing_thread_flag = False
+    
+    def _send_sensing_data_v2(self):
+        """센서 데이터 송신 - 바이너리 헤더, 이미지는 이벤트/저주기로 별도 토픽 송신 (송신 큐에 넣은 cmd_string 반환)"""
+        try:
+            now = time.time()
+            cmd_string = self._next_cmd_string()
+            self.seq += 1
+            
+            # 이미지는 이벤트 발생 시 또는 SENSING_IMAGE_INTERVAL 마다 인코더 스레드로 전달
+            # (변화 없는 프레임 생략 / 품질 조절은 인코더가 담당 - 센싱 주기를 지연시키지 않음)
+            image_submitted = False
+            if cmd_string or now - self.last_image_time >= SENSING_IMAGE_INTERVAL:
+                frame = self.camera.value if self.camera else None
+                if frame is not None and self.image_encoder:
+                    meta = (self.current_work_id, self.seq, cmd_string, self.is_finished, self.box_idx, now)
+                    self.image_encoder.submit(frame, meta, force=cmd_string is not None)
+                    self.last_image_time = now
+                    image_submitted = True
+            
+            delivered = self.delivered_count if cmd_string == "end" else None
+            header = sensing_protocol.pack_sensing(
+                self.agv_id, self.current_work_id, self.seq, cmd_string,
+                self.is_finished, self.box_idx, image_submitted, now, delivered
+            )
+            priority = PRIORITY_CONTROL if cmd_string else PRIORITY_TELEMETRY
+            publish_start = time.monotonic()
+            self.publish_queue.put(self.sensing_topic, header, 1, priority)
+            self.sensing_histograms["publish"].observe(time.monotonic() - publish_start)
             
+            if cmd_string:
+                log.info("센싱 데이터 전송: cmd_string=%s, workId=%s, seq=%s", cmd_string, self.current_work_id, self.seq)
+            return cmd_string
+                
+        except Exception as e:
+            log.throttled(5.0, WARNING, "센서 데이터 생성/송신 오류: %s", e)
+        return None
+    
+    def _publish_image(self, jpeg_bytes, meta):
+        """인코더 스레드에서 호출 - 이미지 토픽으로 송신"""
+        work_id, seq, cmd_string, is_finished, box_idx, timestamp = meta
+        image_payload = sensing_protocol.pack_image(
+            self.agv_id, work_id, seq, jpeg_bytes, cmd_string, is_finished, box_idx, timestamp
+        )
+        self.publish_queue.put(self.image_topic, image_payload, 1, PRIORITY_IMAGE)
+    
+    def publish_task_queue(self, status):
+        """작업 큐 상태 송신 (agv/{agv_id}/queue)"""
+        payload = json.dumps(status, ensure_ascii=False)
+        self.publish_queue.put(self.task_queue_topic, payload, 1, PRIORITY_TELEMETRY)
+    
+    def publish_model_status(self, status):
+        """모델 교체 결과 송신 (agv/{agv_id}/model/status)"""
+        payload = json.dumps(status, ensure_ascii=False)
+        self.publish_queue.put(self.model_topic + "/status", payload, 1, PRIORITY_CONTROL)
+    
+    def get_publish_queue_stats(self):
+        """송신 큐 깊이 / 폐기 / ACK 지연 통계"""
+        return self.publish_queue.stats()
+    
+    def get_image_stats(self):
+        """텔레메트리 이미지 송신 통계 (bytes/s, 품질, 생략 횟수 등)"""
+        return self.image_encoder.stats() if self.image_encoder else {}
+    
+    def _send_sensing_data_v1(self):
+        """센서 데이터 송신 - 기존 JSON 포맷 (base64 이미지 포함, 송신 큐에 넣은 cmd_string 반환)"""
         try:
             # 현재 시간
             current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -176,54 +399,41 @@ class MQTTManager:
             # 카메라에서 이미지 획득
             image_b64 = None
             if self.camera and self.camera.value is not None:
+                encode_start = time.monotonic()
                 _, buffer = cv2.imencode('.jpg', self.camera.value)
                 image_b64 = base64.b64encode(buffer).decode('utf-8')
+                self.sensing_histograms["encode"].observe(time.monotonic() - encode_start)
             
-            # cmd_string 결정
-            cmd_string = None
-            if not self.work_started:
-                # 작업 시작
-                cmd_string = "start"
-                self.work_started = True
-                print(f"작업 시작 신호 전송 - Work ID: {self.current_work_id}")
-            elif self.collision_occurred:
-                # 충돌 발생
-                cmd_string = "col"
-                self.collision_occurred = False  # 충돌 신호 리셋
-                print(f"충돌 신호 전송 - Work ID: {self.current_work_id}")
-            elif self.is_finished:
-                # 작업 완료
-                cmd_string = "end"
-                print(f"작업 완료 신호 전송 - Work ID: {self.current_work_id}")
-            else:
-                # 작업 중
-                cmd_string = None
+            cmd_string = self._next_cmd_string()
             
             # 새로운 JSON 데이터 구성
             sensing_data = {
-                "agvId": int(AGV_ID),
+                "agvId": int(self.agv_id),
                 "workId": self.current_work_id,
                 "cmd_string": cmd_string,
                 "time": current_time,
                 "image": image_b64,
-                "box_idx": 0,  # 필요시 실제 box_idx 값으로 업데이트
+                "box_idx": self.box_idx,
                 "is_finished": 1 if self.is_finished else 0
             }
+            if cmd_string == "end" and self.delivered_count is not None:
+                sensing_data["delivered"] = self.delivered_count
             
             # MQTT로 송신
             json_data = json.dumps(sensing_data)
-            self.client.publish(SENSING_TOPIC, json_data, 1)
+            priority = PRIORITY_CONTROL if cmd_string else PRIORITY_IMAGE
+            publish_start = time.monotonic()
+            self.publish_queue.put(self.sensing_topic, json_data, 1, priority)
+            self.sensing_histograms["publish"].observe(time.monotonic() - publish_start)
             
             # 로그 출력 (cmd_string이 있을 때만)
             if cmd_string:
-                print(f"센싱 데이터 전송: cmd_string={cmd_string}, workId={self.current_work_id}")
-            
-            if self.is_finished:
-                print("작업 완료 - 센서 데이터 송신 종료")
-                self.sensing_thread_flag = False
+                log.info("센싱 데이터 전송: cmd_string=%s, workId=%s", cmd_string, self.current_work_id)
+            return cmd_string
                 
         except Exception as e:
-            print(f"센서 데이터 생성/송신 오류: {e}")
+            log.throttled(5.0, WARNING, "센서 데이터 생성/송신 오류: %s", e)
+        return None
     
     def set_box_index(self, box_idx):
         """박스 인덱스 설정"""
@@ -233,8 +443,12 @@ class MQTTManager:
         """연결 종료"""
         self.stop_sensing_transmission()
         
+        if self.image_encoder:
+            self.image_encoder.stop()
+        self.publish_queue.stop()
+        
         if self.client:
             self.client.loop_stop()
             self.client.disconnect()
             self.is_connected = False
-            print("MQTT 연결 종료")
\ No newline at end of file
+            log.info("MQTT 연결 종료")
\ No newline at end of file
@@ -0,0 +1,227 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+런타임 프로파일러 - 스레드별 CPU 사용량, GIL 대기 추정, 샘플링 스택 프로파일 (config.py 의 PROFILING_* 로 전환)
+
+- 스레드별 CPU: /proc/self/task/{tid}/stat (utime+stime), schedstat (실행 대기), status (문맥 전환 횟수)
+- GIL 대기 추정: 프로브 스레드가 짧게 sleep 후 다시 실행되기까지의 초과 지연을 측정
+  (다른 스레드가 GIL 을 쥐고 있던 시간에 해당, 스레드별 CPU 점유율과 함께 보면 누가 쥐고 있는지 확인 가능)
+- 스택 샘플링: sys._current_frames() 를 주기적으로 읽어 "스레드;모듈:함수;..." 접힌 스택으로 집계
+  종료 시 flamegraph.pl / speedscope 에서 바로 읽을 수 있는 .folded 파일과 CPU 요약 JSON 저장
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter as StackCounter
+
+from metrics import REGISTRY
+from structured_logging import get_logger
+
+log = get_logger(__name__)
+
+CLK_TCK = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+GIL_PROBE_BUCKETS = (0.0001, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2)
+
+def read_thread_cpu(native_id):
+    """스레드 CPU 시간 (초), 실행 대기 시간 (초), 비자발적 문맥 전환 수 - /proc 이 없으면 None"""
+    base = f"/proc/self/task/{native_id}"
+    try:
+        with open(f"{base}/stat", 'r') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        cpu = (int(fields[11]) + int(fields[12])) / CLK_TCK  # utime + stime
+    except (OSError, IndexError, ValueError):
+        return None
+
+    runqueue_wait = None
+    try:
+        with open(f"{base}/schedstat", 'r') as f:
+            runqueue_wait = int(f.read().split()[1]) / 1e9
+    except (OSError, IndexError, ValueError):
+        pass
+
+    involuntary = None
+    try:
+        with open(f"{base}/status", 'r') as f:
+            for line in f:
+                if line.startswith("nonvoluntary_ctxt_switches"):
+                    involuntary = int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+
+    return cpu, runqueue_wait, involuntary
+
+class Profiler:
+    def __init__(self, output_dir="profiles", cpu_interval=1.0, stack_sampling=False,
+                 sample_interval=0.01, gil_probe_interval=0.005):
+        self.output_dir = output_dir
+        self.cpu_interval = cpu_interval
+        self.stack_sampling = stack_sampling
+        self.sample_interval = sample_interval
+        self.gil_probe_interval = gil_probe_interval
+
+        self._stop_event = threading.Event()
+        self._threads = []
+        self._started_at = None
+
+        # 스레드별 누적 (이름 기준 - 같은 이름의 스레드가 다시 생성되어도 합산)
+        self._lock = threading.Lock()
+        self._cpu = {}  # name -> {"cpu": 초, "runqueue_wait": 초, "involuntary_switches": 수}
+        self._last = {}  # native_id -> (name, cpu, wait, switches)
+        self._cpu_gauges = {}
+
+        self.gil_latency = REGISTRY.histogram(
+            "gil_probe_latency_seconds", "sleep 후 재실행까지 초과 지연 (GIL 대기 추정)", buckets=GIL_PROBE_BUCKETS)
+        self.stacks = StackCounter()
+        self.samples = 0
+
+    def start(self):
+        self._started_at = time.monotonic()
+        self.sample_cpu(baseline=True)
+        workers = [("profiler-cpu", self._cpu_loop), ("profiler-gil", self._gil_probe_loop)]
+        if self.stack_sampling:
+            workers.append(("profiler-stack", self._stack_loop))
+        for name, target in workers:
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        log.info("🔬 프로파일링 시작", stack_sampling=self.stack_sampling, output_dir=self.output_dir)
+
+    def _own_thread_ids(self):
+        return {thread.ident for thread in self._threads}
+
+    # ---- 스레드별 CPU ----
+
+    def _cpu_loop(self):
+        while not self._stop_event.wait(self.cpu_interval):
+            self.sample_cpu()
+
+    def sample_cpu(self, baseline=False):
+        """baseline: 시작 시점 누적값만 기록 (프로파일링 이전 CPU 사용량 제외)"""
+        for thread in threading.enumerate():
+            native_id = getattr(thread, "native_id", None)
+            if native_id is None:
+                continue
+            reading = read_thread_cpu(native_id)
+            if reading is None:
+                continue
+            cpu, wait, switches = reading
+
+            with self._lock:
+                prev = self._last.get(native_id)
+                self._last[native_id] = (thread.name, cpu, wait, switches)
+                totals = self._cpu.setdefault(thread.name, {"cpu": 0.0, "runqueue_wait": 0.0, "involuntary_switches": 0})
+                if prev is None:
+                    if baseline:
+                        continue
+                    totals["cpu"] += cpu  # 프로파일링 도중 생성된 스레드는 누적분 전체
+                    totals["runqueue_wait"] += wait or 0.0
+                    totals["involuntary_switches"] += switches or 0
+                else:
+                    totals["cpu"] += cpu - prev[1]
+                    if wait is not None and prev[2] is not None:
+                        totals["runqueue_wait"] += wait - prev[2]
+                    if switches is not None and prev[3] is not None:
+                        totals["involuntary_switches"] += switches - prev[3]
+
+                if thread.name not in self._cpu_gauges:
+                    self._cpu_gauges[thread.name] = REGISTRY.gauge(
+                        "thread_cpu_seconds", "스레드별 누적 CPU 시간", labels={"thread": thread.name})
+                self._cpu_gauges[thread.name].set(round(totals["cpu"], 3))
+
+    # ---- GIL 대기 추정 ----
+
+    def _gil_probe_loop(self):
+        interval = self.gil_probe_interval
+        while not self._stop_event.is_set():
+            start = time.perf_counter()
+            time.sleep(interval)
+            self.gil_latency.observe(max(0.0, time.perf_counter() - start - interval))
+
+    # ---- 스택 샘플링 ----
+
+    def _stack_loop(self):
+        names = {}
+        while not self._stop_event.wait(self.sample_interval):
+            own = self._own_thread_ids() | {threading.get_ident()}
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            frames = sys._current_frames()
+            with self._lock:
+                for ident, frame in frames.items():
+                    if ident in own:
+                        continue
+                    self.stacks[self._fold(names.get(ident, str(ident)), frame)] += 1
+                self.samples += 1
+
+    @staticmethod
+    def _fold(thread_name, frame):
+        parts = []
+        while frame is not None:
+            code = frame.f_code
+            module = os.path.splitext(os.path.basename(code.co_filename))[0]
+            parts.append(f"{module}:{code.co_name}")
+            frame = frame.f_back
+        parts.append(thread_name.replace(';', '_'))
+        return ';'.join(reversed(parts))
+
+    # ---- 결과 ----
+
+    def summary(self):
+        """스레드별 CPU 사용률 (%) 과 GIL 프로브 지연"""
+        elapsed = time.monotonic() - self._started_at if self._started_at else 0.0
+        with self._lock:
+            threads = {
+                name: {
+                    "cpu_sec": round(t["cpu"], 3),
+                    "cpu_pct": round(t["cpu"] / elapsed * 100, 1) if elapsed else None,
+                    "runqueue_wait_sec": round(t["runqueue_wait"], 3),
+                    "involuntary_switches": t["involuntary_switches"],
+                }
+                for name, t in sorted(self._cpu.items(), key=lambda item: -item[1]["cpu"])
+            }
+        return {
+            "elapsed_sec": round(elapsed, 1),
+            "threads": threads,
+            "gil_probe": self.gil_latency.snapshot(),
+            "stack_samples": self.samples,
+        }
+
+    def dump(self):
+        """CPU 요약 JSON 과 접힌 스택 파일 저장 - 저장한 경로 목록 반환"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d_%H%M%S")
+        paths = []
+
+        summary_path = os.path.join(self.output_dir, f"profile_{stamp}_threads.json")
+        with open(summary_path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, ensure_ascii=False, indent=2, default=str)
+        paths.append(summary_path)
+
+        if self.stack_sampling:
+            folded_path = os.path.join(self.output_dir, f"profile_{stamp}.folded")
+            with self._lock:
+                stacks = sorted(self.stacks.items())
+            with open(folded_path, 'w', encoding='utf-8') as f:
+                for stack, count in stacks:
+                    f.write(f"{stack} {count}\n")
+            paths.append(folded_path)
+
+        return paths
+
+    def stop(self):
+        """샘플링 종료 후 결과 저장"""
+        self._stop_event.set()
+        for thread in self._threads:
+            thread.join(timeout=1.0)
+        self.sample_cpu()
+        try:
+            paths = self.dump()
+            log.info("🔬 프로파일 저장: %s", ", ".join(paths))
+            return paths
+        except OSError as e:
+            log.error("프로파일 저장 실패: %s", e)
+            return []
@@ -0,0 +1,292 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+MQTT 송신 큐 - 우선순위별 제한, 오프라인 버퍼링, 제어 이벤트 저널
+- 제어 이벤트 (start/col/end): 유실 불가, 로컬 저널에 기록 후 ACK 시 제거
+- 일반 센싱 / 이미지: 크기 제한, 가득 차면 오래된 것부터 폐기
+- 송신 / 재연결 후 재전송은 우선순위와 무관하게 큐에 넣은 순서 (item_id) 대로 - 우선순위는 폐기 대상에만 적용
+  (서버가 end 뒤에 그 이전 센싱을 받아 이미 끝난 작업의 상태를 덮어쓰지 않도록)
+- paho 내부 큐에는 최대 PUBLISH_MAX_INFLIGHT 개만 전달 (ACK 기반 흐름 제어)
+"""
+
+import base64
+import json
+import os
+import threading
+import time
+from collections import deque
+import paho.mqtt.client as mqtt
+from config import *
+from metrics import REGISTRY
+from structured_logging import get_logger, WARNING
+
+log = get_logger(__name__)
+
+PRIORITY_CONTROL = 0
+PRIORITY_TELEMETRY = 1
+PRIORITY_IMAGE = 2
+
+PRIORITY_NAMES = {
+    PRIORITY_CONTROL: "control",
+    PRIORITY_TELEMETRY: "telemetry",
+    PRIORITY_IMAGE: "image",
+}
+
+class PublishItem:
+    __slots__ = ("item_id", "topic", "payload", "qos", "priority", "enqueued_at")
+
+    def __init__(self, item_id, topic, payload, qos, priority):
+        self.item_id = item_id
+        self.topic = topic
+        self.payload = payload
+        self.qos = qos
+        self.priority = priority
+        self.enqueued_at = time.monotonic()
+
+class PublishJournal:
+    """제어 이벤트 저널 - JSON 라인 (put / ack), 미확인 항목이 없으면 파일 비움"""
+
+    def __init__(self, path):
+        self.path = path
+        self.pending = set()
+
+    def load(self):
+        """이전 실행에서 ACK 받지 못한 항목 복원"""
+        if not self.path or not os.path.exists(self.path):
+            return []
+
+        entries = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # 기록 중 종료된 마지막 줄
+                    if record.get("op") == "put":
+                        entries[record["id"]] = record
+                    elif record.get("op") == "ack":
+                        entries.pop(record["id"], None)
+        except Exception as e:
+            log.error("송신 저널 로드 오류: %s", e)
+            return []
+
+        items = []
+        for item_id in sorted(entries):
+            record = entries[item_id]
+            payload = base64.b64decode(record["payload"])
+            items.append(PublishItem(item_id, record["topic"], payload, record["qos"], PRIORITY_CONTROL))
+            self.pending.add(item_id)
+        return items
+
+    def append(self, item):
+        if not self.path:
+            return
+        payload = item.payload if isinstance(item.payload, bytes) else str(item.payload).encode('utf-8')
+        self._write({
+            "op": "put",
+            "id": item.item_id,
+            "topic": item.topic,
+            "qos": item.qos,
+            "payload": base64.b64encode(payload).decode('ascii'),
+        })
+        self.pending.add(item.item_id)
+
+    def ack(self, item_id):
+        if not self.path or item_id not in self.pending:
+            return
+        self.pending.discard(item_id)
+        if self.pending:
+            self._write({"op": "ack", "id": item_id})
+        else:
+            # 미확인 항목이 없으면 저널 초기화
+            open(self.path, 'w').close()
+
+    def _write(self, record):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+class PublishQueue(threading.Thread):
+    def __init__(self, journal_path=PUBLISH_JOURNAL_PATH, agv_id=AGV_ID):
+        super().__init__(name="mqtt-publish")
+        self.daemon = True
+        self.client = None
+
+        self.th_flag = True
+        self._cond = threading.Condition()
+        self._connected = False
+
+        self._queues = {p: deque() for p in PRIORITY_NAMES}
+        self._limits = {
+            PRIORITY_CONTROL: None,  # 제한 없음 (폐기 불가)
+            PRIORITY_TELEMETRY: PUBLISH_QUEUE_TELEMETRY_MAX,
+            PRIORITY_IMAGE: PUBLISH_QUEUE_IMAGE_MAX,
+        }
+        self._inflight = {}  # mid -> PublishItem
+        self._early_acks = set()  # publish() 반환 전에 도착한 ACK
+        self._acked_control = []  # 저널 반영 대기
+
+        self.journal = PublishJournal(journal_path)
+        self._next_id = 0
+
+        # 통계
+        self.enqueued = {p: 0 for p in PRIORITY_NAMES}
+        self.dropped = {p: 0 for p in PRIORITY_NAMES}
+        self.published = 0
+        # 측정값은 AGV 별 시계열 (모의 실행에서 한 프로세스에 여러 AGV)
+        labels = {"agv": str(agv_id)}
+        self.ack_latency = REGISTRY.histogram("mqtt_publish_ack_latency_seconds", "송신 요청부터 브로커 ACK 까지 지연",
+                                              labels=labels)
+        self.published_total = REGISTRY.counter("mqtt_published_total", "브로커 ACK 받은 메시지 수", labels=labels)
+        self.dropped_total = {
+            p: REGISTRY.counter("mqtt_publish_dropped_total", "큐 초과로 폐기된 메시지 수",
+                                labels=dict(labels, priority=name))
+            for p, name in PRIORITY_NAMES.items()
+        }
+        for p, name in PRIORITY_NAMES.items():
+            REGISTRY.gauge("mqtt_publish_queue_depth", "우선순위별 송신 대기 메시지 수",
+                           labels=dict(labels, priority=name), func=self._queues[p].__len__)
+        REGISTRY.gauge("mqtt_publish_inflight", "ACK 대기 중인 메시지 수", labels=labels, func=self._inflight.__len__)
+        REGISTRY.gauge("mqtt_connected", "브로커 연결 상태", labels=labels, func=lambda: self._connected)
+
+        # 이전 실행의 미전송 제어 이벤트 복원
+        restored = self.journal.load()
+        if restored:
+            self._queues[PRIORITY_CONTROL].extend(restored)
+            self._next_id = restored[-1].item_id + 1
+            log.info("📒 송신 저널에서 미전송 이벤트 %s개 복원", len(restored))
+
+    def set_client(self, client):
+        with self._cond:
+            self.client = client
+            self._cond.notify()
+
+    def set_connected(self, connected):
+        """연결 상태 변경 - 재연결 시 대기 중인 큐를 순서대로 재전송"""
+        with self._cond:
+            self._connected = connected
+            self._cond.notify()
+
+    def put(self, topic, payload, qos=1, priority=PRIORITY_TELEMETRY):
+        """송신 요청 (논블로킹)"""
+        with self._cond:
+            item = PublishItem(self._next_id, topic, payload, qos, priority)
+            self._next_id += 1
+
+            if priority == PRIORITY_CONTROL:
+                try:
+                    self.journal.append(item)
+                except Exception as e:
+                    log.error("송신 저널 기록 오류: %s", e)
+
+            queue = self._queues[priority]
+            limit = self._limits[priority]
+            if limit is not None and len(queue) >= limit:
+                queue.popleft()  # 오래된 것부터 폐기
+                self.dropped[priority] += 1
+                self.dropped_total[priority].inc()
+
+            queue.append(item)
+            self.enqueued[priority] += 1
+            self._cond.notify()
+
+    def on_publish(self, mid):
+        """paho on_publish 콜백에서 호출 (네트워크 스레드)"""
+        with self._cond:
+            item = self._inflight.pop(mid, None)
+            if item is None:
+                self._early_acks.add(mid)
+                return
+            self._complete_locked(item)
+            self._cond.notify()
+
+    def _complete_locked(self, item):
+        self.published += 1
+        self.published_total.inc()
+        self.ack_latency.observe(time.monotonic() - item.enqueued_at)
+        if item.priority == PRIORITY_CONTROL:
+            self._acked_control.append(item.item_id)
+
+    def _next_item_locked(self):
+        """가장 먼저 넣은 항목 - 각 큐는 item_id 순서이므로 큐 앞쪽끼리만 비교"""
+        heads = [q for q in self._queues.values() if q]
+        if not heads:
+            return None
+        return min(heads, key=lambda q: q[0].item_id).popleft()
+
+    def _can_send_locked(self):
+        return (self._connected and self.client is not None
+                and len(self._inflight) < PUBLISH_MAX_INFLIGHT
+                and any(self._queues.values()))
+
+    def run(self):
+        while self.th_flag:
+            with self._cond:
+                self._flush_journal_acks_locked()
+                while self.th_flag and not self._can_send_locked():
+                    self._cond.wait(0.5)
+                    self._flush_journal_acks_locked()
+                if not self.th_flag:
+                    break
+                item = self._next_item_locked()
+                client = self.client
+
+            # paho 내부 락과의 교착을 피하기 위해 publish 는 락 밖에서 호출
+            try:
+                info = client.publish(item.topic, item.payload, item.qos)
+            except Exception as e:
+                log.throttled(5.0, WARNING, "MQTT 송신 오류: %s", e)
+                self._requeue(item)
+                time.sleep(0.1)
+                continue
+
+            # QoS 1 이상은 연결이 끊겨도 paho 가 보관 후 재연결 시 재전송 (NO_CONN 포함)
+            accepted = info.rc == mqtt.MQTT_ERR_SUCCESS or (info.rc == mqtt.MQTT_ERR_NO_CONN and item.qos > 0)
+            if not accepted:
+                self._requeue(item)
+                time.sleep(0.1)
+                continue
+
+            with self._cond:
+                if info.mid in self._early_acks:
+                    self._early_acks.discard(info.mid)
+                    self._complete_locked(item)
+                else:
+                    self._inflight[info.mid] = item
+
+    def _requeue(self, item):
+        """송신 실패 항목을 큐 앞쪽으로 되돌림 (이후 들어온 항목보다 item_id 가 작으므로 순서 유지)"""
+        with self._cond:
+            self._queues[item.priority].appendleft(item)
+
+    def _flush_journal_acks_locked(self):
+        if not self._acked_control:
+            return
+        acked, self._acked_control = self._acked_control, []
+        for item_id in acked:
+            try:
+                self.journal.ack(item_id)
+            except Exception as e:
+                log.error("송신 저널 갱신 오류: %s", e)
+
+    def stats(self):
+        """큐 깊이 / 폐기 / 전송 통계"""
+        with self._cond:
+            return {
+                "connected": self._connected,
+                "depth": {PRIORITY_NAMES[p]: len(q) for p, q in self._queues.items()},
+                "inflight": len(self._inflight),
+                "journal_pending": len(self.journal.pending),
+                "enqueued": {PRIORITY_NAMES[p]: n for p, n in self.enqueued.items()},
+                "dropped": {PRIORITY_NAMES[p]: n for p, n in self.dropped.items()},
+                "published": self.published,
+                "ack_latency": self.ack_latency.snapshot(),
+            }
+
+    def stop(self):
+        self.th_flag = False
+        with self._cond:
+            self._cond.notify()
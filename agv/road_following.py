@@ -8,77 +8,209 @@
 import threading
 import time
 import numpy as np
-import torch
-import torchvision.transforms as transforms
-import PIL.Image
 from config import *
+from collision_detector import CollisionDetector, CollisionRecorder
+from metrics import REGISTRY
+from shared_state import MotionMailbox
+from steering_filter import AlphaBetaFilter, SpeedScheduler, steering_angle
+from structured_logging import get_logger, WARNING
+
+log = get_logger(__name__)
 
 class RoadFollowing(threading.Thread):
-    def __init__(self, camera, robot, model, mean, std):
-        super().__init__()
+    def __init__(self, camera, robot, steering_model, motion=None, scene_detector=None):
+        super().__init__(name="road-following")
         self.camera = camera
         self.robot = robot
-        self.model = model
-        self.mean = mean
-        self.std = std
+        # 조향 모델 (steering_model.SteeringModel) - 전처리 / 추론, 가중치 교체는 틱 사이에 반영
+        self.steering_model = steering_model
+        
+        # 주행 명령 메일박스 (start/stop 명령 번호 확인 후에만 모터 기록)
+        self.motion = motion if motion is not None else MotionMailbox(robot)
+        
+        # 정적 장면 생략 (scene_change.SceneChangeDetector, 영역 탐지와 공유) - None 이면 매번 추론
+        self.scene_gate = scene_detector.gate("steering") if scene_detector is not None else None
         
         self.th_flag = True
-        self.is_active = False
         self.angle_last = 0.0
         
+        # 목표점 필터 / 속도 스케줄 (STEERING_FILTER_ENABLED) - 주행 명령 (seq) 마다 초기화
+        self.target_filter = None
+        self.speed_scheduler = None
+        if STEERING_FILTER_ENABLED:
+            self.target_filter = AlphaBetaFilter(STEERING_FILTER_ALPHA, STEERING_FILTER_BETA,
+                                                 STEERING_RESIDUAL_SCALE, STEERING_FILTER_MAX_PREDICT)
+            self.speed_scheduler = SpeedScheduler(SPEED_MIN, SPEED_MAX, SPEED_CURVE_ANGLE, SPEED_ACCEL_LIMIT,
+                                                  SPEED_DECEL_LIMIT)
+        self._seq = None
+        self._tick = 0
+        
+        # 충돌 / 정체 감지 (COLLISION_DETECTION_ENABLED) - 감지 틱에서 바로 정지 후 collision_callback(event) 호출
+        self.collision_detector = CollisionDetector() if COLLISION_DETECTION_ENABLED else None
+        self.collision_recorder = None
+        if self.collision_detector is not None and COLLISION_RECORD_DIR:
+            self.collision_recorder = CollisionRecorder(COLLISION_RECORD_DIR, COLLISION_RECORD_MAX_FRAMES)
+        self.collision_callback = None
+        
+        # 측정값 (조향 루프 주기 / 추론 지연)
+        self.loop_period = REGISTRY.histogram("steering_loop_period_seconds", "조향 루프 1회 주기")
+        self.loop_hz = REGISTRY.gauge("steering_loop_hz", "조향 루프 주파수 (지수 이동 평균)")
+        self.inference_latency = REGISTRY.histogram("steering_inference_seconds", "조향 모델 추론 지연 (전처리 포함)")
+        self.loop_errors = REGISTRY.counter("steering_errors_total", "조향 루프 예외 발생 횟수")
+        self.stale_writes = REGISTRY.counter("steering_stale_writes_total", "정지/재시작 명령 이후라 버려진 모터 기록")
+        self.predicted_ticks = REGISTRY.counter("steering_predicted_ticks_total", "추론 없이 필터 예측으로 조향한 틱 수")
+        self.speed_gauge = REGISTRY.gauge("steering_speed", "속도 스케줄의 현재 기본 속도")
+        self.confidence_gauge = REGISTRY.gauge("steering_confidence", "목표점 필터 신뢰도 (0~1)")
+        self._last_loop_time = None
+        self._hz_avg = 0.0
+        
     def run(self):
         while self.th_flag:
-            if not self.is_active:
+            seq, active = self.motion.state
+            if not active:
+                self._last_loop_time = None
                 time.sleep(ROAD_FOLLOWING_INTERVAL)
                 continue
                 
+            self._observe_loop()
+            if seq != self._seq:
+                self._reset_estimator(seq)
+            
             try:
-                image = self.camera.value
-                if image is None:
+                xy = self._estimate_target()
+                if xy is None:
                     time.sleep(ROAD_FOLLOWING_INTERVAL)
                     continue
-                    
-                xy = self.model(self._preprocess(image)).detach().float().cpu().numpy().flatten()
-                x = xy[0]
-                y = (0.5 - xy[1]) / 2.0
                 
-                angle = np.arctan2(x, y)
+                angle = steering_angle(xy)
                 pid = (angle * STEERING_GAIN + (angle - self.angle_last) * STEERING_DGAIN)
                 self.angle_last = angle
                 
                 final_steering = pid + STEERING_BIAS
                 final_steering = np.clip(final_steering, -1.0, 1.0)
                 
-                left_speed = np.clip(SPEED_GAIN + final_steering, 0.0, 1.0)
-                right_speed = np.clip(SPEED_GAIN - final_steering, 0.0, 1.0)
+                base_speed = self._schedule_speed(angle)
+                left_speed = np.clip(base_speed + final_steering, 0.0, 1.0)
+                right_speed = np.clip(base_speed - final_steering, 0.0, 1.0)
                 
-                self.robot.left_motor.value = left_speed
-                self.robot.right_motor.value = right_speed
+                # 추론 도중 정지 명령이 들어왔으면 기록하지 않음
+                if not self.motion.write_motors(seq, left_speed, right_speed):
+                    self.stale_writes.inc()
+                elif self.collision_detector is not None:
+                    self._check_collision(left_speed, right_speed)
                 
-            except:
+            except Exception as e:
+                self.loop_errors.inc()
+                log.throttled(5.0, WARNING, "조향 루프 오류: %s", e)
                 self.robot.stop()
                 
             time.sleep(ROAD_FOLLOWING_INTERVAL)
         
         self.robot.stop()
+        if self.collision_recorder is not None:
+            self.collision_recorder.save()
     
-    def _preprocess(self, image):
-        try:
-            image = PIL.Image.fromarray(image)
-            image = transforms.functional.to_tensor(image).to('cuda').half()
-            image.sub_(self.mean[:, None, None]).div_(self.std[:, None, None])
-            return image[None, ...]
-        except:
-            return None
+    def _reset_estimator(self, seq):
+        """새 주행 명령 - 이전 주행의 필터 상태 / 속도를 버림"""
+        self._seq = seq
+        self._tick = 0
+        self.angle_last = 0.0
+        if self.target_filter is not None:
+            self.target_filter.reset()
+            self.speed_scheduler.reset()
+        if self.collision_detector is not None:
+            self.collision_detector.reset(time.monotonic())
+            if self.collision_recorder is not None:
+                self.collision_recorder.save()
+    
+    def _estimate_target(self):
+        """
+        이번 틱의 목표점 (x, y) - 필터 사용 시 STEERING_INFERENCE_EVERY 틱마다 추론, 나머지는 예측
+        프레임이 없고 예측도 불가하면 None
+        """
+        now = time.monotonic()
+        tick = self._tick
+        self._tick += 1
+        
+        if self.target_filter is not None and self.target_filter.initialized \
+                and tick % max(1, STEERING_INFERENCE_EVERY):
+            self.predicted_ticks.inc()
+            return self.target_filter.predict(now)
+        
+        image = self.camera.value
+        if image is None:
+            return self.target_filter.predict(now) if self.target_filter is not None else None
+        
+        # 틱마다 모델 참조를 한 번만 읽음 - 교체는 다음 틱부터 반영
+        model = self.steering_model.model
+        if self.scene_gate is not None:
+            # 장면이 그대로면 마지막 추론 결과 재사용 - 주행 명령 / 모델이 바뀌면 다시 추론
+            xy = self.scene_gate.process(image, lambda frame: self._infer(frame, model),
+                                         key=(self._seq, id(model)))
+        else:
+            xy = self._infer(image, model)
+        
+        if self.target_filter is None:
+            return xy
+        return self.target_filter.update(xy, time.monotonic())
+    
+    def _infer(self, image, model):
+        infer_start = time.monotonic()
+        xy = self.steering_model.infer(image, model)
+        self.inference_latency.observe(time.monotonic() - infer_start)
+        return xy
+    
+    def _schedule_speed(self, angle):
+        """기본 속도 - 필터 사용 시 예측 곡률 / 신뢰도로 SPEED_MIN ~ SPEED_MAX, 아니면 SPEED_GAIN"""
+        if self.target_filter is None:
+            return SPEED_GAIN
+        now = time.monotonic()
+        confidence = self.target_filter.confidence(now)
+        angle_ahead = steering_angle(self.target_filter.predict(now + SPEED_LOOKAHEAD))
+        speed = self.speed_scheduler.update(angle, angle_ahead, confidence)
+        self.speed_gauge.set(speed)
+        self.confidence_gauge.set(confidence)
+        return speed
+    
+    def _check_collision(self, left, right):
+        """충돌 / 정체 판단 - 감지하면 이 틱에서 바로 모터 정지 (정지 지연은 판단 시간 + 루프 1틱 이내)"""
+        now = time.monotonic()
+        event = self.collision_detector.update(self.camera.value, left, right, now)
+        if self.collision_recorder is not None:
+            self.collision_recorder.add(now, self.collision_detector.last_gray, left, right)
+        if event is None:
+            return
+        
+        self.motion.stop()
+        if self.collision_recorder is not None:
+            self.collision_recorder.event(now, event["kind"])
+        log.warning("💥 충돌 감지 - 주행 정지", **event)
+        if self.collision_callback:
+            self.collision_callback(event)
+    
+    def _observe_loop(self):
+        """루프 주기 / 주파수 기록"""
+        now = time.monotonic()
+        if self._last_loop_time is not None:
+            period = now - self._last_loop_time
+            self.loop_period.observe(period)
+            if period > 0:
+                hz = 1.0 / period
+                self._hz_avg = hz if self._hz_avg == 0.0 else self._hz_avg * 0.9 + hz * 0.1
+                self.loop_hz.set(self._hz_avg)
+        self._last_loop_time = now
+    
+    @property
+    def is_active(self):
+        return self.motion.state[1]
     
     def start_following(self):
-        self.is_active = True
+        self.motion.start()
     
     def stop_following(self):
-        self.is_active = False
-        self.robot.stop()
+        """반환 시점에 모터 정지 완료 - 진행 중인 루프의 이후 기록은 무시됨"""
+        self.motion.stop()
     
     def stop(self):
         self.th_flag = False
-        self.is_active = False
-        self.robot.stop()
\ No newline at end of file
+        self.motion.stop()
\ No newline at end of file
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+장면 변화 감지 - 정적 장면에서 비전 단계 (조향 추론 / 작업영역 탐지) 생략
+
+- 프레임을 SCENE_SIGNATURE_SIZE (16x16) 흑백으로 축소한 서명을 비교 (프레임당 1회 계산, 단계 간 공유)
+- 단계마다 마지막으로 처리한 프레임의 서명과 평균 차이가 SCENE_CHANGE_THRESHOLD 미만이면 마지막 결과 재사용
+  (직전 프레임이 아니라 마지막 처리 프레임과 비교 - 느린 변화도 누적되면 처리)
+- 결과 키 (주행 명령 / 모델 버전 / 탐지 대상 등) 가 바뀌었거나 SCENE_REFRESH_INTERVAL 이 지나면 무조건 처리
+- 생략한 프레임 수와 절약한 처리 시간 (단계별 처리 시간 이동 평균 기준 추정) 을 측정값으로 기록
+"""
+
+import threading
+import time
+import cv2
+from config import *
+from metrics import REGISTRY
+
+class SceneChangeDetector:
+    """비전 단계 공용 - 같은 프레임 객체의 서명은 한 번만 계산"""
+
+    def __init__(self, size=SCENE_SIGNATURE_SIZE, threshold=SCENE_CHANGE_THRESHOLD,
+                 refresh_interval=SCENE_REFRESH_INTERVAL):
+        self.size = tuple(size)
+        self.threshold = threshold
+        self.refresh_interval = refresh_interval
+
+        self._lock = threading.Lock()
+        self._frame = None  # 마지막으로 서명을 계산한 프레임 (카메라는 프레임마다 새 배열을 대입)
+        self._signature = None
+
+        self.signature_time = REGISTRY.histogram("scene_signature_seconds", "장면 서명 계산 시간 (축소 + 흑백)")
+
+    def signature(self, frame):
+        with self._lock:
+            if frame is self._frame:
+                return self._signature
+            start = time.monotonic()
+            small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+            if small.ndim == 3:
+                small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+            self.signature_time.observe(time.monotonic() - start)
+            self._frame, self._signature = frame, small
+            return small
+
+    def difference(self, a, b):
+        """두 서명의 평균 밝기 차이 (0~255)"""
+        return float(cv2.absdiff(a, b).mean())
+
+    def gate(self, stage):
+        return SceneGate(self, stage)
+
+class SceneGate:
+    """단계별 생략 판단 - 마지막 처리 프레임의 서명 / 결과 / 결과 키 보관"""
+
+    def __init__(self, detector, stage):
+        self.detector = detector
+        self.stage = stage
+        self.reset()
+
+        labels = {"stage": stage}
+        self.processed = REGISTRY.counter("vision_frames_processed_total", "처리한 프레임 수", labels=labels)
+        self.skipped = REGISTRY.counter("vision_frames_skipped_total", "정적 장면이라 생략한 프레임 수",
+                                        labels=labels)
+        self.saved_seconds = REGISTRY.counter("vision_compute_saved_seconds_total",
+                                              "생략으로 절약한 처리 시간 추정 (초)", labels=labels)
+        self._cost = 0.0  # 처리 1회 시간 이동 평균 (초)
+
+    def reset(self):
+        """다음 프레임은 무조건 처리"""
+        self._signature = None
+        self._result = None
+        self._key = None
+        self._processed_at = None
+
+    def process(self, frame, func, key=None):
+        """func(frame) 결과 - 장면이 그대로이고 key 가 같으면 마지막 결과 재사용"""
+        signature = self.detector.signature(frame)
+        now = time.monotonic()
+        if (self._signature is not None and key == self._key
+                and now - self._processed_at < self.detector.refresh_interval
+                and self.detector.difference(signature, self._signature) < self.detector.threshold):
+            self.skipped.inc()
+            self.saved_seconds.inc(self._cost)
+            return self._result
+
+        start = time.monotonic()
+        result = func(frame)
+        elapsed = time.monotonic() - start
+        self._cost = elapsed if self._cost == 0.0 else self._cost * 0.9 + elapsed * 0.1
+        self.processed.inc()
+        self._signature, self._result, self._key, self._processed_at = signature, result, key, now
+        return result
@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+주기 실행 스케줄러 - monotonic 기준 데드라인으로 드리프트 없는 주기 유지
+지연 실행 타이머 - 단일 스레드 타이머 휠 (예약마다 threading.Timer 스레드를 만들지 않음)
+"""
+
+import threading
+import time
+from structured_logging import get_logger
+
+log = get_logger(__name__)
+
+class DeadlineTicker:
+    def __init__(self, interval):
+        self.interval = interval
+        self.next_deadline = None
+        self.ticks = 0
+        self.missed_ticks = 0
+
+    def reset(self):
+        self.next_deadline = None
+
+    def wait(self, stop_event=None):
+        """
+        다음 데드라인까지 대기 후 지연 시간(jitter, 초) 반환
+        처리 시간이 길어 데드라인을 넘긴 틱은 몰아서 실행하지 않고 건너뜀 (missed_ticks 집계)
+        stop_event 가 설정되면 대기를 중단하고 None 반환
+        """
+        now = time.monotonic()
+        if self.next_deadline is None:
+            self.next_deadline = now
+
+        delay = self.next_deadline - now
+        if delay > 0:
+            if stop_event is not None:
+                if stop_event.wait(delay):
+                    return None
+            else:
+                time.sleep(delay)
+            now = time.monotonic()
+
+        jitter = now - self.next_deadline
+        self.ticks += 1
+
+        # 다음 데드라인 계산 (주기의 정수배 유지)
+        self.next_deadline += self.interval
+        if now >= self.next_deadline:
+            missed = int((now - self.next_deadline) // self.interval) + 1
+            self.missed_ticks += missed
+            self.next_deadline += missed * self.interval
+
+        return jitter
+
+class TimerHandle:
+    __slots__ = ("rounds", "callback", "args", "cancelled")
+
+    def __init__(self, rounds, callback, args):
+        self.rounds = rounds
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+class TimerWheel:
+    """
+    해시 타이머 휠 - tick 간격의 슬롯 num_slots 개, 한 바퀴를 넘는 지연은 남은 회전 수로 관리
+    예약 / 취소 O(1), 콜백은 휠 스레드에서 실행 (오래 걸리는 작업은 콜백 안에서 넘겨줄 것)
+    """
+
+    def __init__(self, tick=0.1, num_slots=512):
+        self.tick = tick
+        self.num_slots = num_slots
+        self._slots = [[] for _ in range(num_slots)]
+        self._cursor = 0
+        self._lock = threading.Lock()
+        self._ticker = DeadlineTicker(tick)
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.fired = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="timer-wheel", daemon=True)
+        self._thread.start()
+
+    def schedule(self, delay, callback, *args):
+        """delay 초 뒤 callback(*args) 실행 (tick 단위로 올림) - 취소용 핸들 반환"""
+        ticks = max(1, int(-(-max(0.0, delay) // self.tick)))
+        with self._lock:
+            slot = (self._cursor + ticks) % self.num_slots
+            handle = TimerHandle((ticks - 1) // self.num_slots, callback, args)
+            self._slots[slot].append(handle)
+        return handle
+
+    def pending(self):
+        with self._lock:
+            return sum(1 for slot in self._slots for handle in slot if not handle.cancelled)
+
+    def _advance(self):
+        """슬롯 1칸 진행 - 만료된 핸들 목록 반환"""
+        with self._lock:
+            self._cursor = (self._cursor + 1) % self.num_slots
+            due, remaining = [], []
+            for handle in self._slots[self._cursor]:
+                if handle.cancelled:
+                    continue
+                if handle.rounds == 0:
+                    due.append(handle)
+                else:
+                    handle.rounds -= 1
+                    remaining.append(handle)
+            self._slots[self._cursor] = remaining
+        return due
+
+    def _run(self):
+        while self._ticker.wait(self._stop_event) is not None:
+            # 처리 지연으로 건너뛴 틱만큼 슬롯을 따라잡음
+            missed, self._ticker.missed_ticks = self._ticker.missed_ticks, 0
+            for _ in range(1 + missed):
+                for handle in self._advance():
+                    self.fired += 1
+                    try:
+                        handle.callback(*handle.args)
+                    except Exception as e:
+                        log.error("타이머 콜백 오류: %s", e)
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
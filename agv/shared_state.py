@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+AGVSystem 컴포넌트 간 공유 상태 - 주행 명령 메일박스 / 작업 상태
+
+MotionMailbox:
+  start / stop 명령마다 명령 번호(seq) 증가, 현재 상태는 (seq, active) 튜플 하나로 교체
+  조향 루프는 state 속성 1회 읽기로 일관된 스냅샷 획득 (틱마다 객체 생성 없음)
+  모터 쓰기는 락 안에서 명령 번호를 다시 확인 - stop() 반환 이후에는 이전 명령 기준의 쓰기가 반영되지 않음
+TaskState:
+  현재 작업 / 실행 여부를 락으로 보호 (명령 콜백 / 타이머 휠 스레드 / 작업 완료 콜백에서 접근)
+"""
+
+import threading
+
+class MotionMailbox:
+    def __init__(self, robot):
+        self.robot = robot
+        self._lock = threading.Lock()
+        self.state = (0, False)  # (명령 번호, 주행 여부) - 읽기 전용, 교체로만 갱신
+
+    def start(self):
+        """주행 시작 명령 - 새 명령 번호 반환"""
+        with self._lock:
+            seq = self.state[0] + 1
+            self.state = (seq, True)
+            return seq
+
+    def stop(self):
+        """주행 정지 명령 - 모터 정지까지 완료한 뒤 반환"""
+        with self._lock:
+            seq = self.state[0] + 1
+            self.state = (seq, False)
+            self.robot.stop()
+            return seq
+
+    def write_motors(self, seq, left, right):
+        """seq 명령이 아직 유효할 때만 모터 값 기록 - 기록 여부 반환"""
+        with self._lock:
+            if self.state[0] != seq or not self.state[1]:
+                return False
+            self.robot.left_motor.value = left
+            self.robot.right_motor.value = right
+            return True
+
+class TaskState:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._task = None
+        self._running = False
+
+    def claim(self, task):
+        """대기 중일 때만 작업 등록 - 등록 여부 반환"""
+        with self._lock:
+            if self._task is not None:
+                return False
+            self._task = task
+            return True
+
+    def begin(self):
+        """등록된 작업 실행 시작 - 작업 정보 반환 (없으면 None)"""
+        with self._lock:
+            if self._task is None:
+                return None
+            self._running = True
+            return self._task
+
+    def finish(self):
+        with self._lock:
+            self._task = None
+            self._running = False
+
+    @property
+    def current_task(self):
+        return self._task
+
+    @property
+    def is_running(self):
+        return self._running
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+조향 목표점 필터 / 속도 스케줄
+
+AlphaBetaFilter:
+  모델이 예측한 목표점 (x, y) 에 대한 위치 + 속도 추정 (alpha-beta 필터)
+  추론이 없는 틱은 마지막 추정에서 등속 외삽 (최대 max_predict 초까지) - 추론 주기를 낮춰도 조향은 틱마다 갱신
+  신뢰도 = 혁신 (예측과 측정의 차이) 의 이동 평균이 작을수록 1 에 가까움
+  마지막 측정 후 max_predict 의 절반까지는 그대로 (추론 사이 예측 틱마다 흔들리지 않게), 이후 max_predict 에서 0 이 되도록 감소
+SpeedScheduler:
+  예측 곡률 (현재 / lookahead 시점 조향각 중 큰 값) 이 작고 신뢰도가 높을수록 빠르게
+  가속은 틱당 accel_limit, 감속은 틱당 decel_limit 로 제한 (바퀴 급변 방지)
+"""
+
+import math
+import numpy as np
+
+class AlphaBetaFilter:
+    def __init__(self, alpha=0.5, beta=0.1, residual_scale=0.1, max_predict=0.5):
+        self.alpha = alpha
+        self.beta = beta
+        self.residual_scale = residual_scale
+        self.max_predict = max_predict
+        self.reset()
+
+    def reset(self):
+        self.position = None
+        self.velocity = np.zeros(2)
+        self.updated_at = None
+        self.residual = 0.0  # 혁신 크기 지수 이동 평균
+
+    @property
+    def initialized(self):
+        return self.position is not None
+
+    def predict(self, now):
+        """now 시점 목표점 (등속 외삽, max_predict 초까지)"""
+        if self.position is None:
+            return None
+        dt = min(max(0.0, now - self.updated_at), self.max_predict)
+        return self.position + self.velocity * dt
+
+    def update(self, measurement, now):
+        """측정값 반영 - 필터링된 목표점 반환"""
+        measurement = np.asarray(measurement, dtype=float)[:2]
+        if self.position is None:
+            self.position = measurement
+            self.updated_at = now
+            return self.position
+
+        dt = now - self.updated_at
+        predicted = self.predict(now)
+        innovation = measurement - predicted
+        self.position = predicted + self.alpha * innovation
+        if dt > 0:
+            self.velocity = self.velocity + (self.beta / dt) * innovation
+        self.updated_at = now
+        self.residual = 0.8 * self.residual + 0.2 * float(np.linalg.norm(innovation))
+        return self.position
+
+    def confidence(self, now):
+        """0~1 - 혁신이 residual_scale 이면 0.5, 마지막 측정 후 max_predict / 2 부터 감소해 max_predict 에서 0"""
+        if self.position is None:
+            return 0.0
+        measured = 1.0 / (1.0 + (self.residual / self.residual_scale) ** 2)
+        half = self.max_predict / 2.0
+        freshness = min(1.0, max(0.0, 1.0 - (now - self.updated_at - half) / half))
+        return measured * freshness
+
+class SpeedScheduler:
+    def __init__(self, min_speed=0.12, max_speed=0.24, curve_angle=0.5, accel_limit=0.02, decel_limit=0.03):
+        self.min_speed = min_speed
+        self.max_speed = max_speed
+        self.curve_angle = curve_angle
+        self.accel_limit = accel_limit
+        self.decel_limit = decel_limit
+        self.reset()
+
+    def reset(self):
+        self.speed = self.min_speed
+
+    def update(self, angle, angle_ahead, confidence):
+        """조향각 (rad) / lookahead 조향각 / 신뢰도 → 이번 틱 기본 속도"""
+        curvature = max(abs(angle), abs(angle_ahead))
+        straight = max(0.0, 1.0 - curvature / self.curve_angle)
+        target = self.min_speed + (self.max_speed - self.min_speed) * straight * confidence
+        if target > self.speed:
+            self.speed = min(target, self.speed + self.accel_limit)
+        else:
+            self.speed = max(target, self.speed - self.decel_limit)
+        return self.speed
+
+def steering_angle(xy):
+    """모델 출력 (x, y) → 조향각 (rad)"""
+    return math.atan2(xy[0], (0.5 - xy[1]) / 2.0)
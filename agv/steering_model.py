@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+조향 모델 - 로드 / 예열 / 재시작 없는 가중치 교체
+
+- 로드 후 합성 프레임으로 STEERING_WARMUP_FRAMES 회 추론 (cuDNN 알고리즘 선택 / 메모리 할당을 주행 전에 끝냄)
+- 교체 요청 (MQTT agv/{id}/model 또는 MODEL_PATH 파일 변경 감지) 은 백그라운드 스레드에서
+  로드 → 검증 (출력 형태 / 유한값) → 예열 후 모델 참조 하나만 교체
+  조향 루프는 틱마다 참조를 한 번 읽으므로 진행 중인 틱은 이전 모델로 끝나고 다음 틱부터 새 모델 사용
+- 검증에 실패하면 기존 모델 유지
+- 모델 파일은 MODEL_DIR 아래 경로만 허용하고 가중치만 로드 (torch.load weights_only - 파일에 든 코드는 실행하지 않음)
+"""
+
+import hashlib
+import os
+import threading
+import time
+import numpy as np
+import PIL.Image
+from config import *
+from metrics import REGISTRY, LONG_TIME_BUCKETS
+from structured_logging import get_logger
+
+log = get_logger(__name__)
+
+def resolve_model_path(path, model_dir=MODEL_DIR):
+    """교체 요청 경로 → 실제 경로 (상대 경로는 model_dir 기준) - model_dir 밖이면 ValueError"""
+    root = os.path.realpath(model_dir)
+    resolved = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, resolved]) != root:
+        raise ValueError(f"허용되지 않은 모델 경로 (MODEL_DIR 밖): {path}")
+    return resolved
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class SteeringModel:
+    def __init__(self, path=MODEL_PATH, warmup_frames=STEERING_WARMUP_FRAMES):
+        import torch
+        self.torch = torch
+        self.path = path
+        self.warmup_frames = warmup_frames
+        self.device = torch.device('cuda')
+        self.mean = torch.Tensor(IMAGENET_MEAN).to(self.device).half()
+        self.std = torch.Tensor(IMAGENET_STD).to(self.device).half()
+
+        import torchvision.transforms as transforms
+        self._to_tensor = transforms.functional.to_tensor
+
+        self.model = None  # 조향 루프가 틱마다 한 번 읽는 현재 모델 (교체는 참조 대입 1회)
+        self.version = 0
+        self.sha256 = None
+        self.ready = threading.Event()
+
+        self._swap_lock = threading.Lock()  # 교체 작업은 한 번에 하나
+        self._watch_thread = None
+        self._watch_stop = threading.Event()
+        self.status_callback = None  # status_callback(status dict) - 교체 결과 보고
+
+        self.load_time = REGISTRY.histogram("steering_model_load_seconds", "모델 로드 + 검증 + 예열 시간",
+                                            buckets=LONG_TIME_BUCKETS)
+        self.swaps = REGISTRY.counter("steering_model_swaps_total", "조향 모델 교체 횟수")
+        self.swap_failures = REGISTRY.counter("steering_model_swap_failures_total", "검증 실패로 거부한 모델 수")
+        REGISTRY.gauge("steering_model_version", "현재 조향 모델 번호 (부팅 시 1, 교체마다 증가)",
+                       func=lambda: self.version)
+
+    def load_initial(self):
+        """부팅 시 모델 로드 + 예열 - 끝나야 ready"""
+        model, frames = self._build(self.path)
+        self._validate(model, frames)
+        self._install(model, self.path, file_sha256(self.path))
+        self.ready.set()
+
+    # ---- 추론 (조향 루프 스레드) ----
+
+    def preprocess(self, image):
+        """HWC uint8 (RGB) → 정규화된 1x3xHxW half 텐서"""
+        tensor = self._to_tensor(PIL.Image.fromarray(image)).to(self.device).half()
+        tensor.sub_(self.mean[:, None, None]).div_(self.std[:, None, None])
+        return tensor[None, ...]
+
+    def infer(self, image, model=None):
+        """조향 좌표 (x, y) - model 을 주면 그 모델로 (틱 시작 시 읽은 참조 유지용)"""
+        model = model if model is not None else self.model
+        with self.torch.no_grad():
+            return model(self.preprocess(image)).float().cpu().numpy().flatten()
+
+    # ---- 로드 / 검증 ----
+
+    def _build(self, path):
+        torch = self.torch
+        import torchvision
+
+        start = time.monotonic()
+        model = torchvision.models.resnet18(pretrained=False)
+        model.fc = torch.nn.Linear(512, 2)
+        model.load_state_dict(torch.load(path, map_location='cpu', weights_only=True))
+        model = model.to(self.device).eval().half()
+
+        # 예열 / 검증용 합성 프레임 (노이즈 + 가로 밝기 변화)
+        rng = np.random.default_rng(0)
+        frames = []
+        for i in range(max(1, self.warmup_frames)):
+            frame = rng.integers(0, 256, (FRAME_HEIGHT, FRAME_WIDTH, 3), dtype=np.uint8)
+            frame[:, : FRAME_WIDTH * (i % 4 + 1) // 4] //= 2
+            frames.append(frame)
+        for frame in frames:
+            self.infer(frame, model)
+        torch.cuda.synchronize()
+        self.load_time.observe(time.monotonic() - start)
+        return model, frames
+
+    def _validate(self, model, frames):
+        """출력이 (2,) 유한값인지 확인 - 현재 모델과의 평균 차이 반환"""
+        outputs = np.array([self.infer(frame, model) for frame in frames[:4]])
+        if outputs.shape[1:] != (2,):
+            raise ValueError(f"출력 형태 오류: {outputs.shape[1:]}")
+        if not np.all(np.isfinite(outputs)):
+            raise ValueError("출력에 NaN / inf 포함")
+        if self.model is None:
+            return None
+        current = np.array([self.infer(frame) for frame in frames[:4]])
+        return float(np.abs(outputs - current).mean())
+
+    def _install(self, model, path, sha256):
+        self.model = model
+        self.path = path
+        self.sha256 = sha256
+        self.version += 1
+        log.info("🧠 조향 모델 적용", version=self.version, path=path, sha256=sha256[:12])
+
+    # ---- 교체 ----
+
+    def request_swap(self, path, sha256=None, source="mqtt"):
+        """백그라운드에서 로드 / 검증 / 예열 후 교체 - 이미 교체 중이면 False"""
+        if not self._swap_lock.acquire(blocking=False):
+            log.warning("모델 교체 진행 중 - 요청 무시: %s", path)
+            return False
+        threading.Thread(target=self._swap, args=(path, sha256, source), name="model-swap", daemon=True).start()
+        return True
+
+    def _swap(self, path, sha256, source):
+        status = {"path": path, "source": source, "previous_version": self.version}
+        try:
+            path = resolve_model_path(path)
+            actual = file_sha256(path)
+            if sha256 and actual != sha256.lower():
+                raise ValueError(f"sha256 불일치: {actual[:12]}")
+            start = time.monotonic()
+            model, frames = self._build(path)
+            delta = self._validate(model, frames)
+            self._install(model, path, actual)
+            self.swaps.inc()
+            status.update(ok=True, version=self.version, sha256=actual, mean_output_delta=delta,
+                          load_sec=round(time.monotonic() - start, 2))
+        except Exception as e:
+            self.swap_failures.inc()
+            log.error("❌ 모델 교체 실패 (%s): %s", path, e)
+            status.update(ok=False, version=self.version, error=str(e))
+        finally:
+            self._swap_lock.release()
+        if self.status_callback:
+            self.status_callback(status)
+
+    def watch(self, path=None, interval=MODEL_WATCH_INTERVAL):
+        """파일 변경 감지 시작 - 크기 / 수정 시각이 두 번 연속 같을 때 (복사 완료 후) 교체"""
+        path = path or self.path
+        self._watch_thread = threading.Thread(target=self._watch_loop, args=(path, interval),
+                                              name="model-watch", daemon=True)
+        self._watch_thread.start()
+
+    def _watch_loop(self, path, interval):
+        def signature():
+            try:
+                st = os.stat(path)
+                return st.st_mtime_ns, st.st_size
+            except OSError:
+                return None
+
+        applied = signature()
+        pending = None
+        while not self._watch_stop.wait(interval):
+            current = signature()
+            if current is None or current == applied:
+                pending = None
+                continue
+            if current != pending:
+                pending = current  # 기록 중일 수 있음 - 다음 확인까지 대기
+                continue
+            if self.request_swap(path, source="file"):
+                applied = current
+            pending = None
+
+    def stop(self):
+        self._watch_stop.set()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+AGV 작업 큐 - 실행 중에 들어온 명령을 버리지 않고 우선순위 / 시작 가능 시각 순으로 대기
+- priority 가 큰 작업 먼저, 같으면 먼저 들어온 작업 먼저
+- delays 는 시작 가능 시각 (not_before) 으로 저장 - 그 전에는 꺼내지 않음
+- 대기 작업은 변경 시마다 파일에 저장 (임시 파일 기록 후 교체), 재시작 시 복원
+  실행 중인 운행의 작업도 종료 (complete) 전까지 파일에 유지 - 운행 도중 재시작하면 대기 작업으로 복원해 다시 실행
+- 같은 집하/배송 영역의 시작 가능한 작업은 한 번의 운행으로 묶어서 꺼냄 (pop_batch)
+  한 운행에 실을 수 있는 수보다 물건이 많은 작업은 나눠서 꺼내고 나머지는 큐에 남김
+- 운행에서 집지 못한 물건 (미발견 / 적재 위치 부족) 은 대기 작업으로 되돌림 (requeue_items, 작업당 max_attempts 회까지)
+"""
+
+import json
+import os
+import threading
+import time
+from metrics import REGISTRY
+from structured_logging import get_logger
+
+log = get_logger(__name__)
+
+# 대기 시간 버킷 (초) - 수 초 ~ 30분
+TASK_WAIT_BUCKETS = (1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0)
+
+def task_items(task):
+    """작업의 물건 인덱스 목록 (item_idx: 정수 또는 목록)"""
+    item_idx = task.get("item_idx", 0)
+    return list(item_idx) if isinstance(item_idx, (list, tuple)) else [item_idx]
+
+class QueuedTask:
+    __slots__ = ("task_id", "priority", "task", "enqueued_at", "not_before")
+
+    def __init__(self, task_id, priority, task, enqueued_at, not_before):
+        self.task_id = task_id
+        self.priority = priority
+        self.task = task
+        self.enqueued_at = enqueued_at  # time.time() - 재시작 후에도 대기 시간 유지
+        self.not_before = not_before
+
+    def to_dict(self):
+        return {
+            "task_id": self.task_id,
+            "priority": self.priority,
+            "task": self.task,
+            "enqueued_at": self.enqueued_at,
+            "not_before": self.not_before,
+        }
+
+class TaskQueue:
+    def __init__(self, path=None, max_length=20):
+        self.path = path
+        self.max_length = max_length
+        self._lock = threading.Lock()
+        self._pending = []
+        self._inflight = []  # 실행 중인 운행의 작업 - complete() 전까지 파일에 유지
+        self._next_id = 1
+
+        self.enqueued = 0
+        self.rejected = 0
+        self.wait_time = REGISTRY.histogram(
+            "task_queue_wait_seconds", "명령 수신부터 작업 시작까지 대기 시간", buckets=TASK_WAIT_BUCKETS)
+        REGISTRY.gauge("task_queue_length", "대기 중인 작업 수", func=lambda: len(self._pending))
+
+    def load(self):
+        """이전 실행의 대기 작업 + 끝나지 않은 운행의 작업 복원 - 복원한 작업 수 반환"""
+        if not self.path or not os.path.exists(self.path):
+            return 0
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                records = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            log.error("작업 큐 로드 오류: %s", e)
+            return 0
+
+        if isinstance(records, list):
+            records = {"pending": records, "inflight": []}  # 이전 형식 (대기 작업 목록만)
+        inflight = [QueuedTask(**record) for record in records.get("inflight", [])]
+        for queued in inflight:
+            queued.not_before = 0.0  # 끝나지 않은 운행 - 바로 다시 실행
+            log.warning("운행 도중 재시작 - 작업 #%s 다시 실행 (물건 %s)", queued.task_id, queued.task.get("item_idx"))
+
+        with self._lock:
+            self._pending = inflight + [QueuedTask(**record) for record in records.get("pending", [])]
+            self._inflight = []
+            self._next_id = max((q.task_id for q in self._pending), default=0) + 1
+            if inflight:
+                self._save_locked()
+        return len(self._pending)
+
+    def push(self, task, priority=0, delay=0.0):
+        """작업 등록 - 큐가 가득 차면 None"""
+        now = time.time()
+        with self._lock:
+            if len(self._pending) >= self.max_length:
+                self.rejected += 1
+                return None
+            queued = QueuedTask(self._next_id, priority, task, now, now + max(0.0, delay))
+            self._next_id += 1
+            self._pending.append(queued)
+            self.enqueued += 1
+            self._save_locked()
+        return queued
+
+    def pop_batch(self, max_items):
+        """
+        우선순위가 가장 높은 시작 가능 작업과, 같은 집하/배송 영역의 시작 가능 작업을
+        물건 수 합계 max_items 까지 함께 꺼냄 (우선순위 순) - 없으면 빈 목록
+        첫 작업의 물건이 max_items 보다 많으면 앞의 max_items 개만 꺼내고 나머지는 같은 우선순위 / 대기 시각으로 남김
+        """
+        now = time.time()
+        with self._lock:
+            ready = sorted((q for q in self._pending if q.not_before <= now),
+                           key=lambda q: (-q.priority, q.enqueued_at, q.task_id))
+            if not ready:
+                return []
+            first = ready[0]
+            items = task_items(first.task)
+            if len(items) > max_items:
+                head = QueuedTask(self._next_id, first.priority, dict(first.task, item_idx=items[:max_items]),
+                                  first.enqueued_at, first.not_before)
+                self._next_id += 1
+                first.task = dict(first.task, item_idx=items[max_items:])
+                self._pending.append(head)
+                log.info("작업 #%s 물건 %s개 - %s개만 이번 운행, 나머지 %s 는 작업 #%s 로 대기",
+                         first.task_id, len(items), max_items, items[max_items:], first.task_id)
+                first = head
+            route = (first.task.get("start"), first.task.get("end"))
+            batch, count = [first], len(task_items(first.task))
+            for queued in ready[1:]:
+                if (queued.task.get("start"), queued.task.get("end")) != route:
+                    continue
+                items = len(task_items(queued.task))
+                if count + items > max_items:
+                    continue
+                batch.append(queued)
+                count += items
+            for queued in batch:
+                self._pending.remove(queued)
+            self._inflight = list(batch)
+            self._save_locked()
+        for queued in batch:
+            self.wait_time.observe(now - queued.enqueued_at)
+        return batch
+
+    def requeue_items(self, items, max_attempts=3):
+        """
+        실행 중인 운행에서 집지 못한 물건을 대기 작업으로 되돌림 - 원래 작업의 우선순위 / 대기 시각 유지
+        물건마다 max_attempts 번 운행해도 집지 못하면 버림 - (되돌린 작업 목록, 버린 물건 목록)
+        """
+        remaining = list(items)
+        requeued, dropped = [], []
+        now = time.time()
+        with self._lock:
+            for queued in self._inflight:
+                own = []
+                for idx in task_items(queued.task):
+                    if idx in remaining:
+                        remaining.remove(idx)
+                        own.append(idx)
+                if not own:
+                    continue
+                queued.task = dict(queued.task, item_idx=[idx for idx in task_items(queued.task) if idx not in own])
+                attempts = queued.task.get("attempts", 1) + 1
+                if attempts > max_attempts:
+                    dropped.extend(own)
+                    continue
+                back = QueuedTask(self._next_id, queued.priority, dict(queued.task, item_idx=own, attempts=attempts),
+                                  queued.enqueued_at, now)
+                self._next_id += 1
+                self._pending.append(back)
+                requeued.append(back)
+            self._inflight = [q for q in self._inflight if task_items(q.task)]
+            self._save_locked()
+        return requeued, dropped
+
+    def complete(self):
+        """실행 중이던 운행 종료 - 재시작 시 다시 실행하지 않도록 파일에서 제거"""
+        with self._lock:
+            if not self._inflight:
+                return
+            self._inflight = []
+            self._save_locked()
+
+    def delays(self):
+        """아직 시작 시각이 되지 않은 작업들의 남은 지연 (초) - 재시작 후 타이머 재예약용"""
+        now = time.time()
+        with self._lock:
+            return [q.not_before - now for q in self._pending if q.not_before > now]
+
+    def __len__(self):
+        return len(self._pending)
+
+    def _save_locked(self):
+        if not self.path:
+            return
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    "pending": [q.to_dict() for q in self._pending],
+                    "inflight": [q.to_dict() for q in self._inflight],
+                }, f, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            log.error("작업 큐 저장 오류: %s", e)
+
+    def stats(self):
+        """MQTT 로 송신하는 큐 상태"""
+        now = time.time()
+        with self._lock:
+            pending = [
+                {
+                    "task_id": q.task_id,
+                    "priority": q.priority,
+                    "item_idx": q.task.get("item_idx"),
+                    "route": [q.task.get("start"), q.task.get("end")],
+                    "wait_sec": round(now - q.enqueued_at, 1),
+                    "starts_in_sec": round(max(0.0, q.not_before - now), 1),
+                }
+                for q in sorted(self._pending, key=lambda q: (-q.priority, q.enqueued_at, q.task_id))
+            ]
+        wait = self.wait_time.snapshot()
+        return {
+            "length": len(pending),
+            "pending": pending,
+            "inflight": [q.task_id for q in self._inflight],
+            "enqueued": self.enqueued,
+            "rejected": self.rejected,
+            "wait_p50_sec": wait["p50"],
+            "wait_p90_sec": wait["p90"],
+        }
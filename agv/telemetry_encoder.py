@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+텔레메트리 이미지 인코더 - 변화 없는 프레임 생략, 바이트 예산 기반 JPEG 품질/해상도 조절
+센싱 스레드는 submit() 만 호출하고 인코딩은 별도 스레드에서 수행
+"""
+
+import math
+import threading
+import time
+import cv2
+from config import *
+from structured_logging import get_logger, WARNING
+
+log = get_logger(__name__)
+
+class TelemetryImageEncoder(threading.Thread):
+    def __init__(self, publish_callback, byte_budget=TELEMETRY_BYTE_BUDGET, encode_histogram=None):
+        super().__init__(name="telemetry-encoder")
+        self.daemon = True
+        self.publish_callback = publish_callback
+        self.byte_budget = byte_budget
+        self.encode_histogram = encode_histogram
+
+        self.th_flag = True
+        self._cond = threading.Condition()
+        self._pending = None  # (frame, meta, force) - 최신 프레임 하나만 유지
+
+        # 품질/해상도 상태
+        self.min_quality, self.max_quality = TELEMETRY_JPEG_QUALITY_RANGE
+        self.quality = self.max_quality
+        self.scale_idx = 0
+
+        # 변화 감지용 축소 프레임
+        self._last_small = None
+
+        # 송신량 통계 (EWMA)
+        self._rate_bps = 0.0
+        self._last_sent_time = None
+        self.sent_frames = 0
+        self.sent_bytes = 0
+        self.skipped_static = 0
+        self.skipped_budget = 0
+        self.replaced = 0
+
+    def submit(self, frame, meta=None, force=False):
+        """프레임 전달 (논블로킹) - 이전 프레임이 아직 대기 중이면 교체"""
+        if frame is None:
+            return
+        with self._cond:
+            if self._pending is not None:
+                self.replaced += 1
+                # 교체되는 프레임이 이벤트 프레임이면 강제 송신 유지
+                force = force or self._pending[2]
+            self._pending = (frame, meta, force)
+            self._cond.notify()
+
+    def run(self):
+        while self.th_flag:
+            with self._cond:
+                while self._pending is None and self.th_flag:
+                    self._cond.wait(0.5)
+                if not self.th_flag:
+                    break
+                frame, meta, force = self._pending
+                self._pending = None
+
+            try:
+                self._process(frame, meta, force)
+            except Exception as e:
+                log.throttled(5.0, WARNING, "텔레메트리 이미지 인코딩 오류: %s", e)
+
+    def _process(self, frame, meta, force):
+        # 1. 축소 프레임 비교로 정적 장면 생략
+        small = cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), TELEMETRY_DIFF_SIZE,
+                           interpolation=cv2.INTER_AREA)
+        if not force and self._last_small is not None:
+            diff = cv2.absdiff(small, self._last_small).mean()
+            if diff < TELEMETRY_CHANGE_THRESHOLD:
+                self.skipped_static += 1
+                return
+
+        # 2. 예산 초과 시 (이벤트 프레임 제외) 생략
+        now = time.monotonic()
+        rate = self._decayed_rate(now)
+        if not force and rate > self.byte_budget:
+            self.skipped_budget += 1
+            self._adapt(rate)
+            return
+
+        # 3. 현재 해상도/품질로 인코딩
+        scale = TELEMETRY_SCALE_STEPS[self.scale_idx]
+        if scale < 1.0:
+            frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        ok, buffer = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), int(self.quality)])
+        if self.encode_histogram is not None:
+            self.encode_histogram.observe(time.monotonic() - now)
+        if not ok:
+            return
+        jpeg_bytes = buffer.tobytes()
+
+        self.publish_callback(jpeg_bytes, meta)
+
+        self._last_small = small
+        self.sent_frames += 1
+        self.sent_bytes += len(jpeg_bytes)
+        self._record(now, len(jpeg_bytes))
+        self._adapt(self._rate_bps)
+
+    def _decayed_rate(self, now):
+        """마지막 송신 이후 시간만큼 감쇠된 송신률 (bytes/s)"""
+        if self._last_sent_time is None:
+            return 0.0
+        dt = now - self._last_sent_time
+        return self._rate_bps * math.exp(-dt / TELEMETRY_RATE_WINDOW)
+
+    def _record(self, now, nbytes):
+        """EWMA 송신률 갱신 - 한 윈도우 동안 nbytes 를 보낸 것으로 누적"""
+        self._rate_bps = self._decayed_rate(now) + nbytes / TELEMETRY_RATE_WINDOW
+        self._last_sent_time = now
+
+    def _adapt(self, rate):
+        """예산 대비 송신률에 따라 품질 -> 해상도 순으로 조절"""
+        if rate > self.byte_budget:
+            if self.quality > self.min_quality:
+                self.quality = max(self.min_quality, self.quality - TELEMETRY_QUALITY_STEP)
+            elif self.scale_idx < len(TELEMETRY_SCALE_STEPS) - 1:
+                self.scale_idx += 1
+        elif rate < self.byte_budget * 0.6:
+            if self.scale_idx > 0 and self.quality >= self.max_quality:
+                self.scale_idx -= 1
+                self.quality = self.min_quality
+            elif self.quality < self.max_quality:
+                self.quality = min(self.max_quality, self.quality + TELEMETRY_QUALITY_STEP)
+
+    def reset_reference(self):
+        """새 작업 시작 시 기준 프레임 초기화 (첫 프레임은 항상 송신)"""
+        self._last_small = None
+
+    def stats(self):
+        """송신 통계"""
+        return {
+            "bytes_per_sec": round(self._decayed_rate(time.monotonic()), 1),
+            "byte_budget": self.byte_budget,
+            "quality": self.quality,
+            "scale": TELEMETRY_SCALE_STEPS[self.scale_idx],
+            "sent_frames": self.sent_frames,
+            "sent_bytes": self.sent_bytes,
+            "skipped_static": self.skipped_static,
+            "skipped_budget": self.skipped_budget,
+            "replaced": self.replaced,
+        }
+
+    def stop(self):
+        self.th_flag = False
+        with self._cond:
+            self._cond.notify()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+비전 단계 실행 - 스레드 모드 (같은 프로세스) / 프로세스 모드 (작업 프로세스, GIL 분리)
+
+프로세스 모드:
+  호출 스레드 -> 프레임을 작업자 전용 공유 메모리 슬롯에 복사 -> Pipe 로 (작업 종류, shape, 인자) 전송
+  작업자 프로세스 -> 공유 메모리에서 프레임 읽어 처리 -> Pipe 로 결과 (좌표 / 마커 위치) 반환
+작업자는 spawn 으로 시작 (torch / CUDA 상태를 물려받지 않음), OpenCV / numpy 만 사용
+"""
+
+import multiprocessing as mp
+import queue
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+from config import *
+from camera_model import CameraModel
+from metrics import REGISTRY
+from structured_logging import get_logger
+
+log = get_logger(__name__)
+
+TASK_ZONE = "zone"
+TASK_MARKERS = "markers"
+
+def detect_zone(frame, lower, upper, camera_model):
+    """
+    작업영역(색상) 탐지 - 가장 큰 영역의 중심 (X, Y) 전체 프레임 좌표, 없으면 None
+    스레드 모드 / 프로세스 모드 공용
+    """
+    if AREA_UNDISTORT_ENABLED:
+        frame = camera_model.undistort(frame, roi=AREA_DETECTION_ROI)
+
+    hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+    hsv = cv2.blur(hsv, BLUR_KERNEL_SIZE)
+
+    mask = cv2.inRange(hsv, lower, upper)
+    mask = cv2.erode(mask, None, iterations=EROSION_ITERATIONS)
+    mask = cv2.dilate(mask, None, iterations=DILATION_ITERATIONS)
+
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return None
+
+    c = max(contours, key=cv2.contourArea)
+    if cv2.contourArea(c) < 500:
+        return None
+
+    ((box_x, box_y), radius) = cv2.minEnclosingCircle(c)
+    X, Y = int(box_x), int(box_y)
+
+    # ROI 사용 시 전체 프레임 좌표로 환산
+    if AREA_UNDISTORT_ENABLED and AREA_DETECTION_ROI is not None:
+        X += AREA_DETECTION_ROI[0]
+        Y += AREA_DETECTION_ROI[1]
+    return X, Y
+
+def _worker_main(conn, shm_name, slot_shape):
+    """작업자 프로세스 - 요청 (종류, shape, 인자) 를 받아 결과 반환, None 수신 시 종료"""
+    from control.BoxDetector import BoxDetector
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    slot = np.ndarray(slot_shape, dtype=np.uint8, buffer=shm.buf)
+    camera_model = CameraModel()
+    box_detector = None
+
+    try:
+        while True:
+            request = conn.recv()
+            if request is None:
+                break
+            kind, shape, args = request
+            frame = slot[:shape[0], :shape[1], :shape[2]]
+            start = time.perf_counter()
+            try:
+                if kind == TASK_ZONE:
+                    lower, upper = args
+                    result = detect_zone(frame, lower, upper, camera_model)
+                elif kind == TASK_MARKERS:
+                    if box_detector is None:
+                        box_detector = BoxDetector(camera_model=camera_model)
+                    result = {idx: pos.tolist() for idx, pos in box_detector.detect_boxes(frame).items()}
+                else:
+                    raise ValueError(f"알 수 없는 작업: {kind}")
+                conn.send((True, result, time.perf_counter() - start))
+            except Exception as e:
+                conn.send((False, repr(e), time.perf_counter() - start))
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        del slot
+        shm.close()
+
+class _Worker:
+    __slots__ = ("index", "process", "conn", "shm", "slot")
+
+    def __init__(self, index, ctx, max_frame_shape):
+        self.index = index
+        nbytes = int(np.prod(max_frame_shape))
+        self.shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        self.slot = np.ndarray(max_frame_shape, dtype=np.uint8, buffer=self.shm.buf)
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main, args=(child_conn, self.shm.name, max_frame_shape),
+            name=f"vision-worker-{index}", daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+
+    def close(self, timeout=1.0):
+        try:
+            self.conn.send(None)
+        except (OSError, BrokenPipeError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.conn.close()
+        del self.slot
+        self.shm.close()
+        self.shm.unlink()
+
+class VisionPool:
+    def __init__(self, workers=VISION_WORKERS, max_frame_shape=VISION_MAX_FRAME_SHAPE, timeout=VISION_TASK_TIMEOUT):
+        self.num_workers = max(1, workers)
+        self.max_frame_shape = tuple(max_frame_shape)
+        self.timeout = timeout
+        self._ctx = mp.get_context("spawn")
+        self._idle = queue.Queue()
+        self._workers = []
+
+        self.round_trip = {
+            kind: REGISTRY.histogram("vision_pool_round_trip_seconds", "프로세스 모드 요청 왕복 시간",
+                                     labels={"task": kind})
+            for kind in (TASK_ZONE, TASK_MARKERS)
+        }
+        self.worker_time = {
+            kind: REGISTRY.histogram("vision_pool_worker_seconds", "작업자 프로세스 처리 시간",
+                                     labels={"task": kind})
+            for kind in (TASK_ZONE, TASK_MARKERS)
+        }
+        self.timeouts = REGISTRY.counter("vision_pool_timeouts_total", "작업자 응답 시간 초과 (작업자 재시작)")
+
+    def start(self):
+        for index in range(self.num_workers):
+            worker = _Worker(index, self._ctx, self.max_frame_shape)
+            self._workers.append(worker)
+            self._idle.put(worker)
+        log.info("🧵 비전 작업 프로세스 시작", workers=self.num_workers, max_frame_shape=self.max_frame_shape)
+
+    def _call(self, kind, frame, args):
+        if frame.ndim != 3 or any(s > m for s, m in zip(frame.shape, self.max_frame_shape)):
+            raise ValueError(f"프레임 크기 초과: {frame.shape} > {self.max_frame_shape}")
+
+        worker = self._idle.get()
+        start = time.perf_counter()
+        try:
+            h, w, c = frame.shape
+            worker.slot[:h, :w, :c] = frame
+            worker.conn.send((kind, frame.shape, args))
+            if not worker.conn.poll(self.timeout):
+                raise TimeoutError(f"비전 작업자 {worker.index} 응답 없음 ({kind})")
+            ok, result, worker_seconds = worker.conn.recv()
+        except (TimeoutError, EOFError, OSError) as e:
+            self.timeouts.inc()
+            log.warning("비전 작업자 재시작: %s", e)
+            worker = self._restart(worker)
+            raise
+        finally:
+            self._idle.put(worker)
+
+        self.round_trip[kind].observe(time.perf_counter() - start)
+        self.worker_time[kind].observe(worker_seconds)
+        if not ok:
+            raise RuntimeError(f"비전 작업 오류 ({kind}): {result}")
+        return result
+
+    def _restart(self, worker):
+        worker.close(timeout=0.2)
+        replacement = _Worker(worker.index, self._ctx, self.max_frame_shape)
+        self._workers[worker.index] = replacement
+        return replacement
+
+    def detect_zone(self, frame, color_info):
+        """작업영역 중심 (X, Y) 또는 None"""
+        result = self._call(TASK_ZONE, frame, (color_info['lower'], color_info['upper']))
+        return tuple(result) if result is not None else None
+
+    def detect_markers(self, frame):
+        """{마커 ID: 위치 np.ndarray} - BoxDetector.detect_boxes 와 같은 형식"""
+        result = self._call(TASK_MARKERS, frame, None)
+        return {idx: np.array(pos) for idx, pos in result.items()}
+
+    def stop(self):
+        for worker in self._workers:
+            worker.close()
+        self._workers = []
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+AGV 레지스트리 - 첫 메시지 수신 시 AGV 등록, 마지막 수신 시각 / 수신율 집계, 유휴 AGV 제거
+AGV 상태 필드는 파이프라인 루프 스레드에서만 갱신, 등록/제거/조회는 락으로 보호
+"""
+
+import math
+import threading
+import time
+from structured_logging import get_logger
+
+log = get_logger(__name__)
+
+class RateMeter:
+    """지수 감쇠 이동 평균 수신율 (초당 값) - window 초 동안의 평균에 해당"""
+    __slots__ = ("window", "rate", "updated_at")
+
+    def __init__(self, window):
+        self.window = window
+        self.rate = 0.0
+        self.updated_at = None
+
+    def add(self, amount, now):
+        self.rate = self.value(now) + amount / self.window
+        self.updated_at = now
+
+    def value(self, now):
+        if self.updated_at is None:
+            return 0.0
+        return self.rate * math.exp(-(now - self.updated_at) / self.window)
+
+class AgvState:
+    __slots__ = (
+        "agv_id", "first_seen", "last_seen", "last_update",
+        "work_status", "current_work_id", "collision_count", "start_time", "end_time",
+        "last_seq", "lost_messages",
+        "messages", "bytes", "message_rate", "byte_rate",
+    )
+
+    def __init__(self, agv_id, now, rate_window):
+        self.agv_id = agv_id
+        self.first_seen = now
+        self.last_seen = now  # time.monotonic() 기준
+        self.last_update = None  # 마지막 센싱 처리 시각 (datetime)
+
+        self.work_status = 'idle'
+        self.current_work_id = None
+        self.collision_count = 0
+        self.start_time = None
+        self.end_time = None
+
+        self.last_seq = None
+        self.lost_messages = 0
+
+        self.messages = 0
+        self.bytes = 0
+        self.message_rate = RateMeter(rate_window)
+        self.byte_rate = RateMeter(rate_window)
+
+class AgvRegistry:
+    def __init__(self, idle_timeout=600.0, rate_window=10.0):
+        self.idle_timeout = idle_timeout
+        self.rate_window = rate_window
+        self._lock = threading.Lock()
+        self._agvs = {}  # agv_id(str) -> AgvState
+        self.discovered = 0
+        self.evicted = 0
+
+    def touch(self, agv_id, nbytes):
+        """메시지 수신 기록 - 처음 보는 AGV 는 등록 후 반환"""
+        now = time.monotonic()
+        state = self._agvs.get(agv_id)
+        if state is None:
+            with self._lock:
+                state = self._agvs.get(agv_id)
+                if state is None:
+                    state = AgvState(agv_id, now, self.rate_window)
+                    self._agvs[agv_id] = state
+                    self.discovered += 1
+                    log.info("🆕 AGV %s 발견 (등록 AGV %s대)", agv_id, len(self._agvs))
+
+        state.last_seen = now
+        state.messages += 1
+        state.bytes += nbytes
+        state.message_rate.add(1, now)
+        state.byte_rate.add(nbytes, now)
+        return state
+
+    def get(self, agv_id):
+        return self._agvs.get(agv_id)
+
+    def items(self):
+        with self._lock:
+            return sorted(self._agvs.items())
+
+    def __len__(self):
+        return len(self._agvs)
+
+    def evict_idle(self):
+        """idle_timeout 동안 메시지가 없는 AGV 제거 - 제거된 AGV ID 목록 반환"""
+        now = time.monotonic()
+        with self._lock:
+            idle = [agv_id for agv_id, state in self._agvs.items()
+                    if now - state.last_seen > self.idle_timeout]
+            for agv_id in idle:
+                del self._agvs[agv_id]
+            self.evicted += len(idle)
+
+        for agv_id in idle:
+            log.info("💤 AGV %s 유휴 상태로 레지스트리에서 제거", agv_id)
+        return idle
+
+    def rates(self):
+        """AGV별 수신 통계 - 초당 메시지 수 / 바이트 수, 마지막 수신 후 경과 시간"""
+        now = time.monotonic()
+        return {
+            agv_id: {
+                "messages": state.messages,
+                "bytes": state.bytes,
+                "msg_per_sec": round(state.message_rate.value(now), 2),
+                "bytes_per_sec": round(state.byte_rate.value(now), 1),
+                "idle_sec": round(now - state.last_seen, 1),
+            }
+            for agv_id, state in self.items()
+        }
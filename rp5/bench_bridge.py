@@ -0,0 +1,370 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+브릿지 부하 시험 - 센싱 메시지를 지정 속도 / 크기로 RaspberryPiBridge 수신부 (on_local_mqtt_message) 에 주입
+
+전송 방식:
+  inproc: 브로커 없이 on_local_mqtt_message 를 직접 호출 (paho 콜백 스레드 대역), 서버 업링크는 전송 없이 기록만
+  mqtt:   실제 로컬 브로커 (--broker) 로 발행, 브릿지는 같은 브로커에 로컬 / 서버 클라이언트로 연결
+
+메시지:
+  v1 (기본): JSON + base64 이미지 (agv/{id}/sensing)
+  v2: 센싱 헤더 (agv/{id}/sensing) + 이미지 메시지 (agv/{id}/image) - 틱 1회에 MQTT 메시지 2개
+  이미지는 --payload-bytes 크기의 합성 바이트 또는 --images 디렉토리의 녹화 JPEG
+  (프레임마다 끝에 카운터를 붙여 저장소의 중복 제거를 피함)
+  AGV 마다 작업 1회 = --work-length 틱 (start, 주행..., end), --collision-every 틱마다 col
+
+측정 (수신 시각 = on_local_mqtt_message 호출 시각):
+  수신 → 디스크: 이미지 저장 (ImageStore.put) 완료까지
+  수신 → 업링크: 상태 이벤트 (start/col/end) 를 서버로 전송할 때까지
+  단계마다 속도를 --ramp-factor 배씩 올려, 폐기 없이 / 지연 예산 안에서 처리한 최대 속도를 max_sustainable_rate 로 보고
+
+사용법: python bench_bridge.py [--transport inproc|mqtt] [--broker localhost:1883] [--agvs 8] [--rate 16]
+                               [--ramp-factor 1.5] [--max-rate 2000] [--step-duration 10] [--payload-bytes 40000]
+                               [--protocol 1] [--images 디렉토리] [--output 결과.json]
+"""
+
+import argparse
+import base64
+import glob
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import sensing_protocol
+from bridge_pipeline import StageStats
+from rp5 import RaspberryPiBridge
+from structured_logging import setup_logging
+
+SAMPLE_SIZE = 200000  # 단계별 지연 표본 수 한도
+BENCH_PI_ID = "bench_pi"
+
+class _Message:
+    """paho MQTTMessage 대역 (topic / payload 만 사용)"""
+    __slots__ = ("topic", "payload")
+
+    def __init__(self, topic, payload):
+        self.topic = topic
+        self.payload = payload
+
+class LoadGenerator:
+    """AGV 별 작업 흐름 (start → 주행 → col → end) 을 따르는 센싱 메시지 생성"""
+
+    def __init__(self, agvs, payload_bytes, protocol, work_length, collision_every, images=None):
+        self.protocol = protocol
+        self.work_length = max(2, work_length)
+        self.collision_every = collision_every
+        self.images = images or [os.urandom(payload_bytes)]
+        self.frame_counter = 0
+        self.ticks = {agv_id: 0 for agv_id in range(1, agvs + 1)}
+        self.work_ids = {agv_id: 100000 + agv_id * 1000 for agv_id in self.ticks}
+        self._order = list(self.ticks)
+        self._next = 0
+
+    def _cmd_string(self, tick):
+        position = tick % self.work_length
+        if position == 0:
+            return "start"
+        if position == self.work_length - 1:
+            return "end"
+        if self.collision_every and position % self.collision_every == 0:
+            return "col"
+        return None
+
+    def next_messages(self):
+        """다음 AGV 의 센싱 틱 1회 - [(토픽, 페이로드), ...]"""
+        agv_id = self._order[self._next]
+        self._next = (self._next + 1) % len(self._order)
+
+        tick = self.ticks[agv_id]
+        self.ticks[agv_id] = tick + 1
+        if tick and tick % self.work_length == 0:
+            self.work_ids[agv_id] += 1
+        work_id = self.work_ids[agv_id]
+        seq = tick % self.work_length + 1
+        cmd_string = self._cmd_string(tick)
+        is_finished = cmd_string == "end"
+
+        self.frame_counter += 1
+        image = self.images[self.frame_counter % len(self.images)] + self.frame_counter.to_bytes(8, 'big')
+        now = time.time()
+
+        if self.protocol >= 2:
+            header = sensing_protocol.pack_sensing(agv_id, work_id, seq, cmd_string, is_finished, 0, True, now)
+            image_payload = sensing_protocol.pack_image(agv_id, work_id, seq, image, cmd_string, is_finished, 0, now)
+            return [(f"agv/{agv_id}/sensing", header), (f"agv/{agv_id}/image", image_payload)]
+
+        sensing_data = {
+            "agvId": agv_id,
+            "workId": work_id,
+            "cmd_string": cmd_string,
+            "time": datetime.fromtimestamp(now).strftime("%Y-%m-%d %H:%M:%S"),
+            "image": base64.b64encode(image).decode('ascii'),
+            "box_idx": 0,
+            "is_finished": 1 if is_finished else 0,
+        }
+        return [(f"agv/{agv_id}/sensing", json.dumps(sensing_data).encode('utf-8'))]
+
+class LatencyProbe:
+    """브릿지 메서드를 감싸 수신 → 디스크 / 수신 → 업링크 시간 측정"""
+
+    def __init__(self, bridge, forward_uplink):
+        self.bridge = bridge
+        self.forward_uplink = forward_uplink
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._image_received = {}  # id(이미지 바이트) -> 수신 시각 (저장 완료까지 객체가 살아 있음)
+        self.reset()
+
+        handle_agv_message = bridge.handle_agv_message
+        save_agv_image = bridge.save_agv_image
+        publish = bridge.status_uplink.publish_func
+
+        def timed_handle(decoded, received_at):
+            # 파이프라인 루프 스레드 - 이벤트 업링크는 이 호출 안에서 동기 전송
+            if decoded["image_data"]:
+                with self._lock:
+                    self._image_received[id(decoded["image_data"])] = received_at
+            self._local.received_at = received_at
+            try:
+                return handle_agv_message(decoded, received_at)
+            finally:
+                self._local.received_at = None
+
+        def timed_save(agv_id, image_data, *args):
+            try:
+                return save_agv_image(agv_id, image_data, *args)
+            finally:
+                with self._lock:
+                    received_at = self._image_received.pop(id(image_data), None)
+                    self.stored += 1
+                if received_at is not None:
+                    self.disk.observe(time.monotonic() - received_at)
+
+        def timed_publish(data_string):
+            sent = publish(data_string) if self.forward_uplink else True
+            received_at = getattr(self._local, "received_at", None)
+            if received_at is not None:
+                # 이벤트 (스냅샷 스레드의 주기 전송은 수신 메시지와 연결되지 않으므로 제외)
+                self.uplink.observe(time.monotonic() - received_at)
+            return sent
+
+        # 파이프라인 / 상태 업링크가 참조하는 콜백 교체 (인스턴스 속성이 메서드보다 우선)
+        bridge.pipeline.process_func = timed_handle
+        bridge.save_agv_image = timed_save
+        bridge.status_uplink.publish_func = timed_publish
+
+    def reset(self):
+        self.disk = StageStats(SAMPLE_SIZE)
+        self.uplink = StageStats(SAMPLE_SIZE)
+        self.stored = 0
+
+class InProcessTransport:
+    name = "inproc"
+
+    def __init__(self, bridge):
+        self.bridge = bridge
+
+    def start(self):
+        self.bridge.pipeline.start()
+        self.bridge.status_uplink.start()
+
+    def publish(self, topic, payload):
+        self.bridge.on_local_mqtt_message(None, None, _Message(topic, payload))
+
+    def stop(self):
+        pass
+
+class MqttTransport:
+    name = "mqtt"
+
+    def __init__(self, bridge, qos):
+        import paho.mqtt.client as mqtt
+        self.bridge = bridge
+        self.qos = qos
+        self.client = mqtt.Client(client_id="bench_bridge_publisher")
+        self.host, self.port = bridge.local_broker
+
+    def start(self):
+        self.bridge.pipeline.start()
+        self.bridge.status_uplink.start()
+        if not (self.bridge.setup_server_mqtt() and self.bridge.setup_local_mqtt()):
+            raise RuntimeError("브릿지 MQTT 연결 실패")
+        self.client.connect(self.host, self.port, 60)
+        self.client.loop_start()
+        deadline = time.monotonic() + 10.0
+        while not (self.bridge.connected_to_local_mqtt and self.client.is_connected()):
+            if time.monotonic() > deadline:
+                raise RuntimeError("브로커 연결 대기 시간 초과")
+            time.sleep(0.05)
+        time.sleep(0.5)  # 브릿지 구독 완료 대기
+
+    def publish(self, topic, payload):
+        self.client.publish(topic, payload, self.qos)
+
+    def stop(self):
+        self.client.loop_stop()
+        self.client.disconnect()
+        for client in (self.bridge.server_mqtt_client, self.bridge.local_mqtt_client):
+            if client:
+                client.loop_stop()
+                client.disconnect()
+
+def run_step(rate, args, bridge, transport, generator, probe):
+    """rate (틱/초) 로 step_duration 동안 주입 후 처리 완료까지 대기"""
+    pipeline = bridge.pipeline
+    received_start, dropped_start = pipeline.received, pipeline.dropped
+    probe.reset()
+
+    ticks, messages = 0, 0
+    images_sent = 0
+    start = time.monotonic()
+    end = start + args.step_duration
+    while True:
+        now = time.monotonic()
+        if now >= end:
+            break
+        # 밀린 틱은 몰아서 전송 (sleep 정밀도보다 높은 속도 지원)
+        due = int((now - start) * rate) - ticks
+        for _ in range(due):
+            for topic, payload in generator.next_messages():
+                transport.publish(topic, payload)
+                messages += 1
+            images_sent += 1
+            ticks += 1
+        time.sleep(0.001)
+    elapsed = time.monotonic() - start
+
+    # 남은 큐 / I/O 처리 대기
+    drain_start = time.monotonic()
+    while time.monotonic() - drain_start < args.drain_timeout:
+        if pipeline.received - received_start >= messages and not pipeline.queue_depth():
+            break
+        time.sleep(0.01)
+    drain_seconds = time.monotonic() - drain_start
+
+    received = pipeline.received - received_start
+    dropped = pipeline.dropped - dropped_start
+    disk = probe.disk.snapshot()
+    uplink = probe.uplink.snapshot()
+    backlog = pipeline.queue_depth()  # 파일 I/O 대기 포함
+    achieved = ticks / elapsed if elapsed else 0.0
+
+    sustainable = (
+        dropped == 0 and backlog == 0 and received >= messages
+        and achieved >= rate * 0.95
+        and disk.get("p99_ms", 0.0) <= args.latency_budget_ms
+    )
+    return {
+        "offered_rate": round(rate, 1),
+        "achieved_rate": round(achieved, 1),
+        "messages_sent": messages,
+        "messages_received": received,
+        "dropped": dropped,
+        "images_sent": images_sent,
+        "images_stored": probe.stored,
+        "backlog_after_drain": backlog,
+        "drain_sec": round(drain_seconds, 2),
+        "ingest_mb_per_sec": round(images_sent * args.payload_bytes / elapsed / 1024 ** 2, 2),
+        "ingest_to_disk": disk,
+        "ingest_to_uplink": uplink,
+        "sustainable": sustainable,
+    }
+
+def load_images(directory):
+    paths = sorted(glob.glob(os.path.join(directory, "*.jpg")) + glob.glob(os.path.join(directory, "*.jpeg")))
+    images = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            images.append(f.read())
+    if not images:
+        raise SystemExit(f"JPEG 파일 없음: {directory}")
+    return images
+
+def parse_broker(text):
+    host, _, port = text.rpartition(':')
+    return host or "localhost", int(port)
+
+def main():
+    parser = argparse.ArgumentParser(description="RaspberryPiBridge 수신부 부하 시험")
+    parser.add_argument("--transport", choices=("inproc", "mqtt"), default="inproc")
+    parser.add_argument("--broker", default="localhost:1883", help="mqtt 전송 시 브로커 호스트:포트")
+    parser.add_argument("--qos", type=int, default=1, choices=(0, 1))
+    parser.add_argument("--agvs", type=int, default=8, help="가상 AGV 수")
+    parser.add_argument("--rate", type=float, default=16.0, help="시작 속도 (전체 센싱 틱/초, AGV 당 2Hz x 8대)")
+    parser.add_argument("--ramp-factor", type=float, default=1.5, help="단계마다 속도 배율 (1 이면 한 단계만)")
+    parser.add_argument("--max-rate", type=float, default=2000.0, help="속도 상한 (틱/초)")
+    parser.add_argument("--step-duration", type=float, default=10.0, help="단계별 주입 시간 (초)")
+    parser.add_argument("--drain-timeout", type=float, default=5.0, help="주입 종료 후 처리 완료 대기 (초)")
+    parser.add_argument("--latency-budget-ms", type=float, default=1000.0, help="수신 → 디스크 p99 허용치")
+    parser.add_argument("--payload-bytes", type=int, default=40000, help="합성 이미지 크기 (바이트)")
+    parser.add_argument("--images", default=None, help="녹화 JPEG 디렉토리 (합성 이미지 대신 사용)")
+    parser.add_argument("--protocol", type=int, choices=(1, 2), default=1, help="센싱 메시지 포맷")
+    parser.add_argument("--work-length", type=int, default=40, help="작업 1회의 틱 수")
+    parser.add_argument("--collision-every", type=int, default=10, help="작업 중 col 이벤트 간격 (틱, 0 이면 없음)")
+    parser.add_argument("--save-dir", default=None, help="이미지 / 작업 로그 저장 경로 (생략 시 임시 디렉토리)")
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--output", default=None, help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    setup_logging(args.log_level)
+    images = load_images(args.images) if args.images else None
+    if images:
+        args.payload_bytes = sum(len(image) for image in images) // len(images)
+
+    save_dir = args.save_dir or tempfile.mkdtemp(prefix="bench_bridge_")
+    host, port = parse_broker(args.broker)
+    bridge = RaspberryPiBridge(raspberry_pi_id=BENCH_PI_ID, server_broker=(host, port, None, None),
+                               local_broker=(host, port), image_save_path=save_dir)
+    bridge.running = True
+    transport = MqttTransport(bridge, args.qos) if args.transport == "mqtt" else InProcessTransport(bridge)
+    probe = LatencyProbe(bridge, forward_uplink=args.transport == "mqtt")
+    generator = LoadGenerator(args.agvs, args.payload_bytes, args.protocol, args.work_length,
+                              args.collision_every, images)
+
+    steps = []
+    try:
+        transport.start()
+        rate = args.rate
+        while rate <= args.max_rate:
+            step = run_step(rate, args, bridge, transport, generator, probe)
+            steps.append(step)
+            print(f"{step['offered_rate']} 틱/s: 디스크 p99 {step['ingest_to_disk'].get('p99_ms')}ms | "
+                  f"업링크 p99 {step['ingest_to_uplink'].get('p99_ms')}ms | 폐기 {step['dropped']} | "
+                  f"{'OK' if step['sustainable'] else '초과'}", flush=True)
+            if not step["sustainable"] or args.ramp_factor <= 1.0:
+                break
+            rate *= args.ramp_factor
+    finally:
+        bridge.running = False
+        transport.stop()
+        bridge.status_uplink.stop()
+        bridge.pipeline.stop()
+        bridge.work_log.close()
+        bridge.image_store.close()
+        if not args.save_dir:
+            shutil.rmtree(save_dir, ignore_errors=True)
+
+    sustainable = [step["offered_rate"] for step in steps if step["sustainable"]]
+    result = {
+        "transport": args.transport,
+        "protocol": args.protocol,
+        "agvs": args.agvs,
+        "payload_bytes": args.payload_bytes,
+        "messages_per_tick": 2 if args.protocol >= 2 else 1,
+        "max_sustainable_rate": max(sustainable) if sustainable else None,
+        "steps": steps,
+    }
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+브릿지 처리 파이프라인 - asyncio 이벤트 루프 기반
+paho 콜백 스레드는 수신 메시지를 큐에 넣기만 하고, 이후 단계는 루프에서 처리
+
+  수신(paho) -> 샤드 큐(AGV별 순서 보장) -> 디코딩(스레드 풀) -> 상태 처리(루프)
+                                                               ├─> 파일 I/O (스레드 풀)
+                                                               └─> 서버 업링크
+
+- 샤드 큐 크기 제한은 일반 메시지에만 적용 - 제어 이벤트 (start/col/end) 는 폐기하지 않고 같은 샤드에 순서대로 넣음
+- 파일 I/O 는 풀별로 대기 중 작업 수를 제한 - 가득 차면 루프가 기다리고, 그동안 샤드 큐가 차서 일반 메시지부터 폐기
+"""
+
+import asyncio
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from structured_logging import get_logger, WARNING
+
+log = get_logger(__name__)
+
+class StageStats:
+    """단계별 처리 시간 - 최근 N개 표본으로 백분위수 계산"""
+
+    def __init__(self, size=2048):
+        self._lock = threading.Lock()
+        self.samples = deque(maxlen=size)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds):
+        with self._lock:
+            self.samples.append(seconds)
+            self.count += 1
+            self.total += seconds
+
+    def snapshot(self):
+        with self._lock:
+            samples = sorted(self.samples)
+        if not samples:
+            return {"count": self.count}
+
+        def pct(q):
+            return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count * 1000, 3),
+            "p50_ms": round(pct(0.5) * 1000, 3),
+            "p90_ms": round(pct(0.9) * 1000, 3),
+            "p99_ms": round(pct(0.99) * 1000, 3),
+            "max_ms": round(samples[-1] * 1000, 3),
+        }
+
+class BridgePipeline:
+    def __init__(self, decode_func, process_func, queue_size=256, decode_workers=2, io_workers=2,
+                 is_event_func=None, io_max_pending=64):
+        """
+        decode_func(topic, payload) -> 디코딩 결과 또는 None (스레드 풀에서 실행)
+        process_func(decoded, received_at) -> 루프 스레드에서 실행 (상태 갱신, I/O/업링크 요청)
+        is_event_func(topic, payload) -> 폐기 불가 이벤트 여부 (루프 스레드에서 실행, 헤더만 확인할 것)
+        io_max_pending: 풀별 (io / log) 대기 + 실행 중 작업 수 상한
+        """
+        self.decode_func = decode_func
+        self.process_func = process_func
+        self.is_event_func = is_event_func
+        self.queue_size = queue_size
+        self.num_shards = max(1, decode_workers)
+        self.per_shard = max(1, queue_size // self.num_shards)
+
+        self.loop = None
+        self.thread = None
+        self.shards = []
+        self._shard_bulk = []  # 샤드별 폐기 가능한 (일반) 메시지 수
+        self._tasks = []
+        self._ready = threading.Event()
+
+        self.decode_pool = ThreadPoolExecutor(max_workers=self.num_shards, thread_name_prefix="bridge-decode")
+        self.io_pool = ThreadPoolExecutor(max_workers=max(1, io_workers), thread_name_prefix="bridge-io")
+        # 작업 로그는 순서 유지를 위해 단일 스레드에서 기록
+        self.log_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bridge-log")
+        # 스레드 풀 내부 큐는 제한이 없으므로 제출 수를 직접 제한
+        self._io_slots = {
+            "io": threading.BoundedSemaphore(max(1, io_max_pending)),
+            "log": threading.BoundedSemaphore(max(1, io_max_pending)),
+        }
+
+        self.stats = {
+            "queue_wait": StageStats(),
+            "decode": StageStats(),
+            "process": StageStats(),
+            "io": StageStats(),
+            "log": StageStats(),
+            "uplink": StageStats(),
+        }
+        self.received = 0
+        self.events = 0
+        self.dropped = 0
+        self.errors = 0
+        self.io_pending = 0
+        self._io_lock = threading.Lock()
+
+    def start(self):
+        """이벤트 루프 스레드 시작"""
+        self.thread = threading.Thread(target=self._run_loop, name="bridge-loop", daemon=True)
+        self.thread.start()
+        self._ready.wait(timeout=5.0)
+
+    def _run_loop(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+        # 크기 제한은 _enqueue 에서 일반 메시지에만 적용 (이벤트는 항상 넣음)
+        self.shards = [asyncio.Queue() for _ in range(self.num_shards)]
+        self._shard_bulk = [0] * self.num_shards
+        self._tasks = [self.loop.create_task(self._shard_worker(index)) for index in range(self.num_shards)]
+
+        self._ready.set()
+        self.loop.run_forever()
+        self.loop.close()
+
+    async def _shutdown(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self.loop.stop()
+
+    def submit(self, topic, payload):
+        """paho 콜백 스레드에서 호출 - 큐에 넣기만 하고 즉시 반환"""
+        if self.loop is None:
+            return
+        self.loop.call_soon_threadsafe(self._enqueue, topic, payload, time.monotonic())
+
+    def _enqueue(self, topic, payload, received_at):
+        self.received += 1
+        # 같은 AGV 토픽은 같은 샤드로 보내 메시지 순서 보장 (agv/{id}/...)
+        key = topic.split('/', 2)[1] if topic.count('/') >= 2 else topic
+        index = zlib.crc32(key.encode('utf-8')) % self.num_shards
+
+        is_event = False
+        if self.is_event_func is not None:
+            try:
+                is_event = self.is_event_func(topic, payload)
+            except Exception:
+                is_event = False  # 판별 불가 메시지는 일반 메시지로 취급
+
+        if is_event:
+            self.events += 1
+        elif self._shard_bulk[index] >= self.per_shard:
+            self.dropped += 1
+            return
+        else:
+            self._shard_bulk[index] += 1
+        self.shards[index].put_nowait((topic, payload, received_at, is_event))
+
+    async def _shard_worker(self, index):
+        shard = self.shards[index]
+        while True:
+            topic, payload, received_at, is_event = await shard.get()
+            if not is_event:
+                self._shard_bulk[index] -= 1
+            try:
+                start = time.monotonic()
+                self.stats["queue_wait"].observe(start - received_at)
+
+                decoded = await self.loop.run_in_executor(self.decode_pool, self.decode_func, topic, payload)
+                decoded_at = time.monotonic()
+                self.stats["decode"].observe(decoded_at - start)
+
+                if decoded is not None:
+                    self.process_func(decoded, received_at)
+                    self.stats["process"].observe(time.monotonic() - decoded_at)
+            except Exception as e:
+                self.errors += 1
+                log.throttled(5.0, WARNING, "파이프라인 처리 오류: %s", e)
+            finally:
+                shard.task_done()
+
+    def run_io(self, func, *args, stage="io"):
+        """파일 I/O 를 스레드 풀로 위임 (루프 스레드에서 호출) - 대기 작업이 상한이면 빈자리가 날 때까지 대기"""
+        pool = self.log_pool if stage == "log" else self.io_pool
+        slots = self._io_slots["log" if stage == "log" else "io"]
+        slots.acquire()
+        submitted_at = time.monotonic()
+        with self._io_lock:
+            self.io_pending += 1
+
+        def done():
+            with self._io_lock:
+                self.io_pending -= 1
+            slots.release()
+
+        def task():
+            try:
+                return func(*args)
+            except Exception as e:
+                log.throttled(5.0, WARNING, "파일 I/O 오류: %s", e)
+            finally:
+                self.stats[stage].observe(time.monotonic() - submitted_at)
+                done()
+
+        try:
+            return pool.submit(task)
+        except RuntimeError:
+            done()  # 종료 후 제출
+            raise
+
+    def timed_uplink(self, func, *args):
+        """서버 업링크 호출 시간 측정"""
+        start = time.monotonic()
+        try:
+            return func(*args)
+        finally:
+            self.stats["uplink"].observe(time.monotonic() - start)
+
+    def queue_depth(self):
+        """처리 대기 메시지 수 + 대기 / 실행 중 파일 I/O 수"""
+        return sum(shard.qsize() for shard in self.shards) + self.io_pending
+
+    def get_stats(self):
+        """단계별 지연 / 큐 깊이 통계"""
+        return {
+            "received": self.received,
+            "events": self.events,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "queue_depth": self.queue_depth(),
+            "io_pending": self.io_pending,
+            "stages": {name: stats.snapshot() for name, stats in self.stats.items()},
+        }
+
+    def stop(self):
+        if self.loop is not None and self.loop.is_running():
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop)
+        if self.thread is not None:
+            self.thread.join(timeout=2.0)
+        self.decode_pool.shutdown(wait=False)
+        self.io_pool.shutdown(wait=True)
+        self.log_pool.shutdown(wait=True)
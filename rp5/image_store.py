@@ -0,0 +1,248 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+AGV 이미지 저장소 - AGV/작업(work_id)별 세그먼트 파일에 프레임을 이어 붙여 저장
+
+파일 구성 (root 아래):
+  agv_{id}/work_{work_id}.seg   JPEG 프레임을 순서대로 이어 붙인 데이터
+  agv_{id}/work_{work_id}.idx   프레임 인덱스 (JSON 라인: 시간, 상태, 오프셋, 길이, 해시)
+같은 세그먼트 안에서 내용이 같은 프레임(sha1)은 데이터를 다시 쓰지 않고 인덱스만 추가
+보존 정책: 전체 크기(max_bytes) / 보관 기간(max_age) 초과 시 오래된 세그먼트부터 삭제
+  세그먼트 크기 / 마지막 기록 시각은 메모리 인덱스로 관리 (시작 시 한 번만 디렉터리 조회, 기록마다 갱신)
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from structured_logging import get_logger
+
+log = get_logger(__name__)
+
+SEGMENT_PATTERN = re.compile(r"work_(.+)\.seg$")
+
+class _OpenSegment:
+    __slots__ = ("data_file", "index_file", "size", "hashes")
+
+    def __init__(self, data_file, index_file, size, hashes):
+        self.data_file = data_file
+        self.index_file = index_file
+        self.size = size
+        self.hashes = hashes  # sha1 -> (offset, length)
+
+class ImageStore:
+    def __init__(self, root, max_bytes=2 * 1024 ** 3, max_age=7 * 24 * 3600, max_open_segments=16):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.max_open_segments = max_open_segments
+
+        self._lock = threading.Lock()
+        self._open = OrderedDict()  # (agv_id, work_id) -> _OpenSegment (LRU)
+        self._segments = OrderedDict()  # 세그먼트 경로 -> [인덱스 경로, 크기, 마지막 기록 시각] (오래된 순)
+
+        self.total_bytes = 0
+        self.frames_written = 0
+        self.frames_deduplicated = 0
+        self.bytes_written = 0
+        self.segments_evicted = 0
+
+        os.makedirs(root, exist_ok=True)
+        for seg_path, idx_path, size, mtime in sorted(self._list_segments(), key=lambda s: s[3]):
+            self._segments[seg_path] = [idx_path, size, mtime]
+        self.total_bytes = sum(entry[1] for entry in self._segments.values())
+
+    # ---- 경로 ----
+
+    def _paths(self, agv_id, work_id):
+        agv_dir = os.path.join(self.root, f"agv_{agv_id}")
+        base = os.path.join(agv_dir, f"work_{work_id}")
+        return agv_dir, base + ".seg", base + ".idx"
+
+    def _list_segments(self):
+        """(세그먼트 경로, 인덱스 경로, 크기, 수정 시각) 목록 - 시작 시 메모리 인덱스 구성용"""
+        segments = []
+        for agv_name in os.listdir(self.root):
+            agv_dir = os.path.join(self.root, agv_name)
+            if not agv_name.startswith("agv_") or not os.path.isdir(agv_dir):
+                continue
+            for name in os.listdir(agv_dir):
+                if SEGMENT_PATTERN.match(name):
+                    seg_path = os.path.join(agv_dir, name)
+                    st = os.stat(seg_path)
+                    segments.append((seg_path, seg_path[:-4] + ".idx", st.st_size, st.st_mtime))
+        return segments
+
+    # ---- 기록 ----
+
+    def _get_segment_locked(self, agv_id, work_id):
+        key = (str(agv_id), str(work_id))
+        segment = self._open.get(key)
+        if segment is not None:
+            self._open.move_to_end(key)
+            return segment
+
+        agv_dir, seg_path, idx_path = self._paths(*key)
+        os.makedirs(agv_dir, exist_ok=True)
+
+        # 기존 세그먼트에 이어 쓰는 경우 중복 검사용 해시 복원
+        hashes = {}
+        if os.path.exists(idx_path):
+            for meta in self._read_index(idx_path):
+                hashes.setdefault(meta["sha1"], (meta["off"], meta["len"]))
+
+        data_file = open(seg_path, 'ab')
+        index_file = open(idx_path, 'a', encoding='utf-8')
+        segment = _OpenSegment(data_file, index_file, data_file.tell(), hashes)
+        self._open[key] = segment
+
+        while len(self._open) > self.max_open_segments:
+            _, old = self._open.popitem(last=False)
+            self._close_segment(old)
+        return segment
+
+    def put(self, agv_id, work_id, image_data, status="work", timestamp=None):
+        """
+        프레임 저장
+        반환: (세그먼트 경로, 오프셋, 중복 여부)
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        digest = hashlib.sha1(image_data).hexdigest()
+
+        with self._lock:
+            segment = self._get_segment_locked(agv_id, work_id)
+
+            existing = segment.hashes.get(digest)
+            if existing is not None:
+                offset, length = existing
+                deduplicated = True
+                self.frames_deduplicated += 1
+            else:
+                offset, length = segment.size, len(image_data)
+                segment.data_file.write(image_data)
+                segment.data_file.flush()
+                segment.size += length
+                segment.hashes[digest] = (offset, length)
+                deduplicated = False
+                self.total_bytes += length
+                self.bytes_written += length
+
+            meta = {"t": round(timestamp, 3), "status": status, "off": offset, "len": length, "sha1": digest}
+            segment.index_file.write(json.dumps(meta) + '\n')
+            segment.index_file.flush()
+            self.frames_written += 1
+
+            seg_path = segment.data_file.name
+            entry = self._segments.pop(seg_path, None)
+            if entry is None:
+                entry = [segment.index_file.name, 0, 0.0]
+            entry[1], entry[2] = segment.size, time.time()
+            self._segments[seg_path] = entry  # 가장 최근 기록으로 이동
+
+            over_budget = self.total_bytes > self.max_bytes
+
+        if over_budget:
+            self.enforce_retention()
+
+        return segment.data_file.name, offset, deduplicated
+
+    # ---- 조회 ----
+
+    @staticmethod
+    def _read_index(idx_path):
+        entries = []
+        with open(idx_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    pass  # 기록 중 종료된 마지막 줄
+        return entries
+
+    def get_frames(self, agv_id, work_id):
+        """work_id 의 모든 프레임 [(메타, JPEG 바이트), ...] - 세그먼트를 한 번에 읽음"""
+        _, seg_path, idx_path = self._paths(agv_id, work_id)
+        if not os.path.exists(idx_path):
+            return []
+
+        with self._lock:
+            segment = self._open.get((str(agv_id), str(work_id)))
+            if segment is not None:
+                segment.data_file.flush()
+                segment.index_file.flush()
+
+        entries = self._read_index(idx_path)
+        with open(seg_path, 'rb') as f:
+            data = f.read()
+
+        view = memoryview(data)
+        return [(meta, bytes(view[meta["off"]:meta["off"] + meta["len"]])) for meta in entries
+                if meta["off"] + meta["len"] <= len(data)]
+
+    def list_works(self, agv_id):
+        """AGV 의 저장된 work_id 목록"""
+        agv_dir = os.path.join(self.root, f"agv_{agv_id}")
+        if not os.path.isdir(agv_dir):
+            return []
+        return sorted(m.group(1) for m in map(SEGMENT_PATTERN.match, os.listdir(agv_dir)) if m)
+
+    # ---- 보존 정책 ----
+
+    def enforce_retention(self):
+        """보관 기간 초과 세그먼트 삭제 후, 용량 초과 시 오래된 세그먼트부터 삭제 (메모리 인덱스 기준 - 디렉터리 조회 없음)"""
+        with self._lock:
+            now = time.time()
+            evicted = 0
+
+            for seg_path, (idx_path, size, mtime) in list(self._segments.items()):
+                expired = self.max_age and now - mtime > self.max_age
+                if not expired and self.total_bytes <= self.max_bytes:
+                    break
+                self._evict_locked(seg_path, idx_path)
+                self.total_bytes -= size
+                evicted += 1
+
+            self.segments_evicted += evicted
+
+        if evicted:
+            log.info("🧹 이미지 세그먼트 %s개 삭제 (보존 정책)", evicted)
+        return evicted
+
+    def _evict_locked(self, seg_path, idx_path):
+        self._segments.pop(seg_path, None)
+        for key, segment in list(self._open.items()):
+            if segment.data_file.name == seg_path:
+                self._close_segment(segment)
+                del self._open[key]
+        for path in (seg_path, idx_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def _close_segment(segment):
+        segment.data_file.close()
+        segment.index_file.close()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "total_bytes": self.total_bytes,
+                "open_segments": len(self._open),
+                "frames_written": self.frames_written,
+                "frames_deduplicated": self.frames_deduplicated,
+                "bytes_written": self.bytes_written,
+                "segments_evicted": self.segments_evicted,
+            }
+
+    def close(self):
+        with self._lock:
+            for segment in self._open.values():
+                self._close_segment(segment)
+            self._open.clear()
@@ -6,6 +6,16 @@ import os
 import threading
 from datetime import datetime
 
+import sensing_protocol
+from bridge_pipeline import BridgePipeline
+from work_log import WorkLogWriter
+from image_store import ImageStore
+from agv_registry import AgvRegistry
+from status_uplink import StatusUplink
+from structured_logging import get_logger, setup_logging, WARNING
+
+log = get_logger("rp5")
+
 # 외부 MQTT 브로커 설정 (별도 브로커 서버 필요)
 MQTT_BROKER_HOST = "mqtt.broker.address"  # 실제 브로커 주소로 변경
 MQTT_BROKER_PORT = 1883
@@ -15,9 +25,9 @@ MQTT_PASSWORD = "AgvRaspberry2025!"
 # 라즈베리파이 식별 정보
 RASPBERRY_PI_ID = "rpi_001"  # 각 라즈베리파이마다 고유 ID 설정
 
-# MQTT 토픽
-COMMAND_TOPIC = f"server/commands/{RASPBERRY_PI_ID}"
-STATUS_TOPIC = f"raspberrypi/status/{RASPBERRY_PI_ID}"
+# MQTT 토픽 (명령 server/commands/{ID}, 상태 raspberrypi/status/{ID} 는 RaspberryPiBridge 에서 생성)
+AGV_SENSING_TOPIC = "agv/+/sensing"
+AGV_IMAGE_TOPIC = "agv/+/image"
 HEARTBEAT_TOPIC = "raspberrypi/heartbeat"
 
 # 로컬 MQTT 브로커 설정 (AGV와 통신)
@@ -27,8 +37,49 @@ LOCAL_MQTT_PORT = 1883
 # 이미지 저장 경로
 IMAGE_SAVE_PATH = "/home/doit/ld/agv_images"
 
+# 로깅 설정 (structured_logging.py)
+LOG_LEVEL = "INFO"  # DEBUG 로 바꾸면 센싱 메시지마다 수신 로그 출력
+LOG_FORMAT = "text"  # "text" 또는 "json" (한 줄 JSON)
+
+# 처리 파이프라인 설정
+INGEST_QUEUE_SIZE = 512  # 수신 큐 최대 크기 (초과 시 폐기)
+DECODE_WORKERS = 2  # 디코딩 스레드 수 (AGV별 순서 보장 샤드 수)
+IO_WORKERS = 2  # 이미지 저장 스레드 수
+IO_MAX_PENDING = 64  # 이미지 저장 / 작업 로그 대기 작업 수 상한 (초과 시 수신 큐가 차서 일반 센싱부터 폐기)
+
+# 이미지 저장소 설정 (AGV/작업별 세그먼트 파일 + 오프셋 인덱스)
+IMAGE_STORE_MAX_BYTES = 20 * 1024 ** 3  # 전체 용량 한도 (초과 시 오래된 세그먼트부터 삭제)
+IMAGE_STORE_MAX_AGE = 14 * 24 * 3600  # 보관 기간 (초)
+IMAGE_STORE_MAX_OPEN_SEGMENTS = 16  # 동시에 열어 두는 세그먼트 파일 수
+
+# AGV 레지스트리 설정 (agv/+/sensing 첫 수신 시 자동 등록)
+AGV_IDLE_TIMEOUT = 600.0  # 이 시간 동안 메시지가 없으면 레지스트리에서 제거 (초)
+AGV_RATE_WINDOW = 10.0  # 수신율 평균 구간 (초)
+
+# 상태 업링크 설정 (이벤트는 즉시, 평상시 상태는 주기적 스냅샷)
+STATUS_SNAPSHOT_INTERVAL = 5.0  # 플릿 스냅샷 전송 주기 (초)
+STATUS_FULL_SNAPSHOT_EVERY = 12  # N번째 스냅샷마다 변경분이 아닌 전체 상태 전송
+
+# 작업 로그 설정 (IMAGE_SAVE_PATH/work_log 에 기록)
+WORK_LOG_FLUSH_BYTES = 64 * 1024  # 버퍼가 이 크기를 넘으면 flush
+WORK_LOG_FLUSH_INTERVAL = 2.0  # 최대 flush 간격 (초)
+WORK_LOG_FSYNC_POLICY = "flush"  # "always": 매 기록, "flush": flush 때마다, "never": OS 에 맡김
+WORK_LOG_SEGMENT_MAX_BYTES = 8 * 1024 * 1024  # 세그먼트 회전 크기 (닫힌 세그먼트는 gzip 압축)
+
 class RaspberryPiBridge:
-    def __init__(self):
+    def __init__(self, raspberry_pi_id=RASPBERRY_PI_ID, server_broker=None, local_broker=None,
+                 image_save_path=IMAGE_SAVE_PATH):
+        """
+        server_broker: (호스트, 포트, 사용자, 비밀번호) - 기본 MQTT_BROKER_*
+        local_broker: (호스트, 포트) - 기본 LOCAL_MQTT_*
+        인스턴스별 지정은 부하 시험 / 플릿 시뮬레이터용 (기본값은 위 설정)
+        """
+        self.raspberry_pi_id = raspberry_pi_id
+        self.server_broker = server_broker or (MQTT_BROKER_HOST, MQTT_BROKER_PORT, MQTT_USERNAME, MQTT_PASSWORD)
+        self.local_broker = local_broker or (LOCAL_MQTT_BROKER, LOCAL_MQTT_PORT)
+        self.command_topic = f"server/commands/{raspberry_pi_id}"
+        self.status_topic = f"raspberrypi/status/{raspberry_pi_id}"
+        
         # 중앙 서버와 통신용 MQTT 클라이언트
         self.server_mqtt_client = None
         self.connected_to_server = False
@@ -39,86 +90,98 @@ class RaspberryPiBridge:
         
         self.running = False
         
-        # AGV별 센싱 데이터 저장
-        self.agv_sensing_data = {}
+        # AGV별 상태 / 수신 통계 (상태 필드는 파이프라인 루프 스레드에서만 갱신)
+        self.agv_registry = AgvRegistry(idle_timeout=AGV_IDLE_TIMEOUT, rate_window=AGV_RATE_WINDOW)
         
-        # 이미지 저장 디렉토리 생성
-        self.ensure_image_directory()
+        # 수신 -> 디코딩 -> 처리 -> I/O/업링크 파이프라인
+        self.pipeline = BridgePipeline(
+            self.decode_agv_message, self.handle_agv_message,
+            queue_size=INGEST_QUEUE_SIZE, decode_workers=DECODE_WORKERS, io_workers=IO_WORKERS,
+            is_event_func=self.is_event_message, io_max_pending=IO_MAX_PENDING
+        )
         
-        print(f"라즈베리파이 브릿지 초기화 - ID: {RASPBERRY_PI_ID}")
-    
-    def ensure_image_directory(self):
-        """이미지 저장 디렉토리 생성"""
-        try:
-            if not os.path.exists(IMAGE_SAVE_PATH):
-                os.makedirs(IMAGE_SAVE_PATH)
-                print(f"이미지 저장 디렉토리 생성: {IMAGE_SAVE_PATH}")
-            
-            # AGV별 서브디렉토리 생성
-            for agv_id in range(1, 5):  # AGV 1-4
-                agv_dir = os.path.join(IMAGE_SAVE_PATH, f"agv_{agv_id}")
-                if not os.path.exists(agv_dir):
-                    os.makedirs(agv_dir)
-                    print(f"AGV {agv_id} 이미지 디렉토리 생성: {agv_dir}")
-                    
-        except Exception as e:
-            print(f"이미지 디렉토리 생성 오류: {e}")
+        # 중앙 서버 상태 업링크 (상태 변화 이벤트 즉시 + 변경분 스냅샷)
+        self.status_uplink = StatusUplink(
+            self.send_status_to_server, raspberry_pi_id,
+            interval=STATUS_SNAPSHOT_INTERVAL, full_every=STATUS_FULL_SNAPSHOT_EVERY
+        )
+        
+        # 이미지 저장소 (세그먼트 기록 + 해시 중복 제거 + 보존 정책, AGV 디렉토리는 첫 프레임 저장 시 생성)
+        self.image_store = ImageStore(
+            image_save_path,
+            max_bytes=IMAGE_STORE_MAX_BYTES,
+            max_age=IMAGE_STORE_MAX_AGE,
+            max_open_segments=IMAGE_STORE_MAX_OPEN_SEGMENTS
+        )
+        
+        # 작업 이벤트 로그 (버퍼링 + 세그먼트 회전 + work_id 인덱스)
+        self.work_log = WorkLogWriter(
+            os.path.join(image_save_path, "work_log"),
+            flush_bytes=WORK_LOG_FLUSH_BYTES,
+            flush_interval=WORK_LOG_FLUSH_INTERVAL,
+            fsync_policy=WORK_LOG_FSYNC_POLICY,
+            segment_max_bytes=WORK_LOG_SEGMENT_MAX_BYTES
+        )
+        
+        log.info("라즈베리파이 브릿지 초기화 - ID: %s", raspberry_pi_id)
     
     def setup_server_mqtt(self):
         """중앙 서버와 통신용 MQTT 클라이언트 설정"""
         try:
-            self.server_mqtt_client = mqtt.Client(client_id=f"{RASPBERRY_PI_ID}_server")
-            self.server_mqtt_client.username_pw_set(MQTT_USERNAME, MQTT_PASSWORD)
+            host, port, username, password = self.server_broker
+            self.server_mqtt_client = mqtt.Client(client_id=f"{self.raspberry_pi_id}_server")
+            if username:
+                self.server_mqtt_client.username_pw_set(username, password)
             
             self.server_mqtt_client.on_connect = self.on_server_mqtt_connect
             self.server_mqtt_client.on_disconnect = self.on_server_mqtt_disconnect
             self.server_mqtt_client.on_message = self.on_server_mqtt_message
             
-            self.server_mqtt_client.connect(MQTT_BROKER_HOST, MQTT_BROKER_PORT, 60)
+            self.server_mqtt_client.connect(host, port, 60)
             self.server_mqtt_client.loop_start()
             
             return True
         except Exception as e:
-            print(f"서버 MQTT 설정 오류: {e}")
+            log.error("서버 MQTT 설정 오류: %s", e)
             return False
     
     def setup_local_mqtt(self):
         """AGV와 통신용 로컬 MQTT 클라이언트 설정"""
         try:
-            self.local_mqtt_client = mqtt.Client(client_id=f"{RASPBERRY_PI_ID}_local")
+            self.local_mqtt_client = mqtt.Client(client_id=f"{self.raspberry_pi_id}_local")
             
             self.local_mqtt_client.on_connect = self.on_local_mqtt_connect
             self.local_mqtt_client.on_disconnect = self.on_local_mqtt_disconnect
             self.local_mqtt_client.on_message = self.on_local_mqtt_message
             
-            self.local_mqtt_client.connect(LOCAL_MQTT_BROKER, LOCAL_MQTT_PORT, 60)
+            self.local_mqtt_client.connect(*self.local_broker, 60)
             self.local_mqtt_client.loop_start()
             
             return True
         except Exception as e:
-            print(f"로컬 MQTT 설정 오류: {e}")
+            log.error("로컬 MQTT 설정 오류: %s", e)
             return False
     
     def on_server_mqtt_connect(self, client, userdata, flags, rc):
         """중앙 서버 MQTT 연결 콜백"""
         if rc == 0:
-            print("✅ 중앙 서버 MQTT 브로커 연결 성공")
+            log.info("✅ 중앙 서버 MQTT 브로커 연결 성공")
             self.connected_to_server = True
             
             # 명령 토픽 구독
-            client.subscribe(COMMAND_TOPIC, 1)
-            print(f"📡 명령 토픽 구독: {COMMAND_TOPIC}")
+            client.subscribe(self.command_topic, 1)
+            log.info("📡 명령 토픽 구독: %s", self.command_topic)
             
             # 하트비트 전송 시작
             self.start_heartbeat()
             
         else:
-            print(f"❌ 중앙 서버 MQTT 브로커 연결 실패: {rc}")
+            log.error("❌ 중앙 서버 MQTT 브로커 연결 실패: %s", rc)
             self.connected_to_server = False
     
     def on_server_mqtt_disconnect(self, client, userdata, rc):
         """중앙 서버 MQTT 연결 해제 콜백"""
-        print("❌ 중앙 서버 MQTT 브로커 연결 해제됨")
+        log.warning("❌ 중앙 서버 MQTT 브로커 연결 해제됨")
         self.connected_to_server = False
     
     def on_server_mqtt_message(self, client, userdata, msg):
@@ -126,65 +189,105 @@ class RaspberryPiBridge:
         try:
             command_string = msg.payload.decode('utf-8')
             command = json.loads(command_string)
-            print(f"📥 중앙 서버로부터 명령 수신: {command}")
+            log.info("📥 중앙 서버로부터 명령 수신: %s", command)
             
             # AGV로 명령 전달
             self.forward_command_to_agv(command)
             
         except json.JSONDecodeError as e:
-            print(f"JSON 파싱 오류: {e}")
+            log.warning("JSON 파싱 오류: %s", e)
         except Exception as e:
-            print(f"명령 수신 오류: {e}")
+            log.error("명령 수신 오류: %s", e)
     
     def on_local_mqtt_connect(self, client, userdata, flags, rc):
         """로컬 MQTT 연결 콜백"""
         if rc == 0:
-            print("✅ 로컬 MQTT 브로커 연결 성공")
+            log.info("✅ 로컬 MQTT 브로커 연결 성공")
             self.connected_to_local_mqtt = True
             
-            # AGV 센싱 토픽 구독 (AGV 1-4)
-            for agv_id in range(1, 5):
-                sensing_topic = f"agv/{agv_id}/sensing"
-                client.subscribe(sensing_topic, 1)
-                print(f"📡 AGV {agv_id} 센싱 토픽 구독: {sensing_topic}")
+            # 모든 AGV 센싱/이미지 토픽 구독 (AGV 는 첫 메시지 수신 시 등록)
+            client.subscribe([(AGV_SENSING_TOPIC, 1), (AGV_IMAGE_TOPIC, 1)])
+            log.info("📡 AGV 토픽 구독: %s, %s", AGV_SENSING_TOPIC, AGV_IMAGE_TOPIC)
                 
         else:
-            print(f"❌ 로컬 MQTT 브로커 연결 실패: {rc}")
+            log.error("❌ 로컬 MQTT 브로커 연결 실패: %s", rc)
             self.connected_to_local_mqtt = False
     
     def on_local_mqtt_disconnect(self, client, userdata, rc):
         """로컬 MQTT 연결 해제 콜백"""
-        print("❌ 로컬 MQTT 브로커 연결 해제됨")
+        log.warning("❌ 로컬 MQTT 브로커 연결 해제됨")
         self.connected_to_local_mqtt = False
     
     def on_local_mqtt_message(self, client, userdata, msg):
-        """AGV로부터 센싱 데이터 수신 콜백 - 새로운 JSON 포맷"""
+        """AGV로부터 센싱 데이터 수신 콜백 - 파이프라인 큐에 넣고 즉시 반환"""
+        self.pipeline.submit(msg.topic, msg.payload)
+    
+    def is_event_message(self, topic, payload):
+        """제어 이벤트 (start/col/end) 여부 - 수신 큐가 가득 차도 폐기하지 않음 (루프 스레드, 헤더만 확인)"""
+        return sensing_protocol.peek_cmd_string(payload) is not None
+    
+    def decode_agv_message(self, topic, payload):
+        """수신 메시지 디코딩 (디코딩 스레드 풀에서 실행) - v1 JSON / v2 바이너리 모두 지원"""
         try:
-            topic = msg.topic
-            message = msg.payload.decode('utf-8')
-            
-            # 토픽에서 AGV ID 추출 (agv/{agv_id}/sensing)
+            # 토픽에서 AGV ID 추출 (agv/{agv_id}/sensing, agv/{agv_id}/image)
             topic_parts = topic.split('/')
-            if len(topic_parts) >= 3 and topic_parts[0] == 'agv' and topic_parts[2] == 'sensing':
-                agv_id = str(topic_parts[1])  # 문자열로 통일
-                
-                # JSON 데이터 파싱
-                sensing_data = json.loads(message)
-                
-                # 새로운 포맷 필드 확인
-                work_id = sensing_data.get('workId')
-                cmd_string = sensing_data.get('cmd_string')
-                is_finished = sensing_data.get('is_finished', 0)
-                
-                print(f"AGV {agv_id} 센싱 데이터 수신: workId={work_id}, cmd_string={cmd_string}, is_finished={is_finished}")
-                
-                # 센싱 데이터 처리
-                self.process_sensing_data(agv_id, sensing_data)
+            if len(topic_parts) < 3 or topic_parts[0] != 'agv':
+                return None
+            
+            agv_id = str(topic_parts[1])  # 문자열로 통일
+            
+            if topic_parts[2] == 'image':
+                # v2 이미지 메시지: 헤더 + JPEG 원본
+                header, image_data = sensing_protocol.unpack(payload)
+                return {"agv_id": agv_id, "kind": "image", "sensing_data": header, "image_data": image_data,
+                        "size": len(payload)}
+            
+            if topic_parts[2] != 'sensing':
+                return None
+            
+            if sensing_protocol.is_binary(payload):
+                # v2 바이너리 헤더
+                sensing_data, _ = sensing_protocol.unpack(payload)
+                image_data = None
+            else:
+                # v1 JSON 데이터 파싱 (base64 이미지 포함)
+                sensing_data = json.loads(payload.decode('utf-8'))
+                image_b64 = sensing_data.pop('image', None)
+                image_data = base64.b64decode(image_b64) if image_b64 else None
+            
+            return {"agv_id": agv_id, "kind": "sensing", "sensing_data": sensing_data, "image_data": image_data,
+                    "size": len(payload)}
                 
         except json.JSONDecodeError as e:
-            print(f"센싱 데이터 JSON 파싱 오류: {e}")
+            log.throttled(5.0, WARNING, "센싱 데이터 JSON 파싱 오류: %s", e)
         except Exception as e:
-            print(f"센싱 데이터 처리 오류: {e}")
+            log.throttled(5.0, WARNING, "센싱 데이터 디코딩 오류: %s", e)
+        return None
+    
+    def handle_agv_message(self, decoded, received_at):
+        """디코딩된 메시지 처리 (파이프라인 루프 스레드에서 실행)"""
+        agv_id = decoded["agv_id"]
+        sensing_data = decoded["sensing_data"]
+        image_data = decoded["image_data"]
+        
+        # 처음 보는 AGV 는 자동 등록, 수신율 집계
+        agv_data = self.agv_registry.touch(agv_id, decoded["size"])
+        
+        work_id = sensing_data.get('workId')
+        cmd_string = sensing_data.get('cmd_string')
+        
+        # 이미지 저장은 I/O 스레드 풀로 위임
+        if image_data:
+            self.pipeline.run_io(self.save_agv_image, agv_id, image_data, cmd_string, datetime.now(), work_id)
+        
+        if decoded["kind"] != "sensing":
+            return
+        
+        is_finished = sensing_data.get('is_finished', 0)
+        log.debug("AGV %s 센싱 데이터 수신: workId=%s, cmd_string=%s, is_finished=%s", agv_id, work_id, cmd_string, is_finished)
+        
+        # 센싱 데이터 처리
+        self.process_sensing_data(agv_data, sensing_data)
     
     def forward_command_to_agv(self, command):
         """중앙 서버로부터 받은 명령을 AGV로 전달"""
@@ -194,126 +297,128 @@ class RaspberryPiBridge:
             if self.connected_to_local_mqtt:
                 mqtt_topic = f"agv/{agv_id}/command"
                 
-                # 명령 데이터 재구성
+                # 명령 데이터 재구성 (item_idx: 정수 또는 목록)
+                item_idx = command["item_idx"]
                 agv_command = {
                     "agv_id": agv_id,
                     "start": command["start"],
                     "end": command["end"],
                     "delays": int(command["delays"]),
-                    "item_idx": int(command["item_idx"]),
+                    "item_idx": [int(idx) for idx in item_idx] if isinstance(item_idx, list) else int(item_idx),
                     "timedata": command.get("timedata", datetime.now().isoformat())
                 }
+                if "priority" in command:
+                    agv_command["priority"] = int(command["priority"])
                 
                 command_json = json.dumps(agv_command, ensure_ascii=False)
                 self.local_mqtt_client.publish(mqtt_topic, command_json)
-                print(f"✅ 명령 전달 완료: AGV {agv_id} (물건 인덱스: {command['item_idx']})")
+                log.info("✅ 명령 전달 완료: AGV %s (물건 인덱스: %s)", agv_id, command['item_idx'])
             else:
-                print("❌ 로컬 MQTT 연결 없음")
+                log.warning("❌ 로컬 MQTT 연결 없음")
                 
         except Exception as e:
-            print(f"명령 전달 오류: {e}")
+            log.error("명령 전달 오류: %s", e)
     
-    def process_sensing_data(self, agv_id, sensing_data):
-        """AGV 센싱 데이터 처리 - 새로운 JSON 포맷"""
+    def process_sensing_data(self, agv_data, sensing_data):
+        """AGV 센싱 데이터 처리 - agv_data: 레지스트리의 AgvState"""
         try:
+            agv_id = agv_data.agv_id
+            
             # 새로운 포맷 필드 추출
             work_id = sensing_data.get('workId')
             cmd_string = sensing_data.get('cmd_string')
             is_finished = sensing_data.get('is_finished', 0)
-            image_b64 = sensing_data.get('image')
+            seq = sensing_data.get('seq')
             box_idx = sensing_data.get('box_idx', 0)
             time_str = sensing_data.get('time')
             
             # 현재 시간
             current_time = datetime.now()
+            previous_status = agv_data.work_status
             
-            # AGV별 센싱 데이터 초기화
-            if agv_id not in self.agv_sensing_data:
-                self.agv_sensing_data[agv_id] = {
-                    'last_update': None,
-                    'work_status': 'idle',
-                    'current_work_id': None,
-                    'collision_count': 0,
-                    'start_time': None,
-                    'end_time': None
-                }
-            
-            agv_data = self.agv_sensing_data[agv_id]
-            
-            # 이미지가 있는 경우 저장
-            if image_b64:
-                self.save_agv_image(agv_id, image_b64, cmd_string, current_time, work_id)
+            # v2 시퀀스 번호로 유실 메시지 집계 (작업 시작 시 seq 는 1부터 다시 시작)
+            if seq is not None:
+                last_seq = agv_data.last_seq
+                if last_seq is not None and seq > last_seq + 1:
+                    agv_data.lost_messages += seq - last_seq - 1
+                agv_data.last_seq = seq
             
             # cmd_string에 따른 작업 상태 처리
             if cmd_string == "start":
-                print(f"🚀 AGV {agv_id} 작업 시작! Work ID: {work_id}")
-                agv_data['work_status'] = 'working'
-                agv_data['current_work_id'] = work_id
-                agv_data['start_time'] = current_time
-                agv_data['collision_count'] = 0
+                log.info("🚀 AGV %s 작업 시작! Work ID: %s", agv_id, work_id)
+                agv_data.work_status = 'working'
+                agv_data.current_work_id = work_id
+                agv_data.start_time = current_time
+                agv_data.collision_count = 0
                 
                 # 작업 시작 로그
                 self.log_work_event(agv_id, "work_start", current_time, work_id, box_idx)
                 
             elif cmd_string == "col":
-                print(f"💥 AGV {agv_id} 충돌 발생! Work ID: {work_id}")
-                agv_data['collision_count'] += 1
+                log.info("💥 AGV %s 충돌 발생! Work ID: %s", agv_id, work_id)
+                agv_data.collision_count += 1
                 
                 # 충돌 로그
                 self.log_work_event(agv_id, "collision", current_time, work_id, box_idx)
                 
             elif cmd_string == "end":
-                print(f"🏁 AGV {agv_id} 작업 완료! Work ID: {work_id}")
-                agv_data['work_status'] = 'finished'
-                agv_data['end_time'] = current_time
+                log.info("🏁 AGV %s 작업 완료! Work ID: %s, 배송 %s개", agv_id, work_id, sensing_data.get('delivered'))
+                agv_data.work_status = 'finished'
+                agv_data.end_time = current_time
                 
                 # 작업 완료 로그
                 self.log_work_event(agv_id, "work_complete", current_time, work_id, box_idx)
                 
-            elif cmd_string is None and agv_data['work_status'] == 'finished':
+            elif cmd_string is None and agv_data.work_status == 'finished':
                 # 작업 완료 후 대기 상태로 복귀
-                print(f"⏸️ AGV {agv_id} 대기 상태로 복귀")
-                agv_data['work_status'] = 'idle'
-                agv_data['current_work_id'] = None
-                agv_data['start_time'] = None
-                agv_data['end_time'] = None
+                log.info("⏸️ AGV %s 대기 상태로 복귀", agv_id)
+                agv_data.work_status = 'idle'
+                agv_data.current_work_id = None
+                agv_data.start_time = None
+                agv_data.end_time = None
             
             # 마지막 업데이트 시간 갱신
-            agv_data['last_update'] = current_time
-            
-            # 중앙 서버로 상태 정보 전송
-            self.send_status_to_server(agv_id, agv_data, sensing_data)
+            agv_data.last_update = current_time
+            
+            # 중앙 서버 상태 업링크 - 작업 이벤트 / 상태 전환은 즉시, 그 외는 다음 스냅샷에 묶어서 전송
+            status_fields = {
+                "status": agv_data.work_status,
+                "work_id": agv_data.current_work_id,
+                "collision_count": agv_data.collision_count,
+                "box_idx": box_idx,
+                "lost_messages": agv_data.lost_messages,
+            }
+            event = None
+            if cmd_string is not None or agv_data.work_status != previous_status:
+                event = {"cmd_string": cmd_string, "is_finished": is_finished}
+                if cmd_string == "end":
+                    # AGV 가 보고한 배송 완료 물건 수 (디스패처 완료 집계용, 구버전 AGV 는 None)
+                    event["delivered"] = sensing_data.get('delivered')
+            self.pipeline.timed_uplink(self.status_uplink.update, agv_id, status_fields, event)
             
         except Exception as e:
-            print(f"센싱 데이터 처리 중 오류: {e}")
+            log.throttled(5.0, WARNING, "센싱 데이터 처리 중 오류: %s", e)
     
-    def save_agv_image(self, agv_id, image_b64, cmd_string, timestamp, work_id):
-        """AGV 이미지 저장 - 새로운 포맷"""
+    def save_agv_image(self, agv_id, image_data, cmd_string, timestamp, work_id):
+        """AGV 이미지 저장 - JPEG 바이트 (v1 은 base64 디코딩 후 전달)"""
         try:
-            # Base64 디코딩
-            image_data = base64.b64decode(image_b64)
-            
-            # 파일명 생성
-            time_str = timestamp.strftime("%Y%m%d_%H%M%S")
             status = cmd_string if cmd_string else "work"
-            filename = f"agv_{agv_id}_{status}_{work_id}_{time_str}.jpg"
-            
-            # 파일 경로
-            agv_dir = os.path.join(IMAGE_SAVE_PATH, f"agv_{agv_id}")
-            filepath = os.path.join(agv_dir, filename)
+            # 작업별 세그먼트 파일에 추가 (같은 작업 내 동일 프레임은 인덱스만 추가)
+            path, offset, deduplicated = self.image_store.put(
+                agv_id, work_id, image_data, status, timestamp.timestamp()
+            )
             
-            # 이미지 저장
-            with open(filepath, 'wb') as f:
-                f.write(image_data)
-            
-            print(f"📸 AGV {agv_id} 이미지 저장: {filename}")
-            
-            # 이미지 크기 확인
-            file_size = os.path.getsize(filepath)
-            print(f"   이미지 크기: {file_size} bytes")
+            if cmd_string:
+                # 이벤트 프레임만 출력 (주기 프레임은 상태 요약의 저장소 통계로 확인)
+                log.info("📸 AGV %s 이미지 저장: %s @%s", agv_id, os.path.basename(path), offset,
+                         size=len(image_data), deduplicated=deduplicated)
             
         except Exception as e:
-            print(f"이미지 저장 오류: {e}")
+            log.throttled(5.0, WARNING, "이미지 저장 오류: %s", e)
+    
+    def get_work_images(self, agv_id, work_id):
+        """work_id 의 모든 프레임 조회 [(메타, JPEG 바이트), ...]"""
+        return self.image_store.get_frames(agv_id, work_id)
     
     def log_work_event(self, agv_id, event_type, timestamp, work_id, box_idx):
         """작업 이벤트 로그"""
@@ -324,41 +429,33 @@ class RaspberryPiBridge:
             "work_id": work_id,
             "box_idx": box_idx
         }
-        self.write_log(log_entry)
+        # 파일 기록은 로그 전용 스레드로 위임 (순서 유지)
+        self.pipeline.run_io(self.write_log, log_entry, stage="log")
     
     def write_log(self, log_entry):
-        """로그 파일 작성"""
+        """로그 작성 - 메모리 버퍼에 추가 (크기/시간 기준으로 세그먼트 파일에 flush)"""
         try:
-            log_file = os.path.join(IMAGE_SAVE_PATH, "agv_work_log.txt")
-            with open(log_file, 'a', encoding='utf-8') as f:
-                f.write(json.dumps(log_entry, ensure_ascii=False) + '\n')
+            self.work_log.write(log_entry)
         except Exception as e:
-            print(f"로그 작성 오류: {e}")
+            log.throttled(5.0, WARNING, "로그 작성 오류: %s", e)
     
-    def send_status_to_server(self, agv_id, agv_data, original_sensing_data):
-        """AGV 상태를 중앙 서버로 전송 - 새로운 포맷"""
+    def get_work_events(self, work_id):
+        """work_id 의 작업 이벤트 조회 (인덱스 사용, 전체 로그 스캔 없음)"""
+        return self.work_log.lookup(work_id)
+    
+    def send_status_to_server(self, data_string):
+        """상태 메시지(이벤트 / 스냅샷)를 중앙 서버로 전송 - StatusUplink 에서 호출"""
         try:
             if not self.connected_to_server:
-                return
-            
-            status_data = {
-                "raspberry_pi_id": RASPBERRY_PI_ID,
-                "agv_id": str(agv_id),
-                "status": agv_data['work_status'],
-                "work_id": agv_data.get('current_work_id'),
-                "collision_count": agv_data.get('collision_count', 0),
-                "cmd_string": original_sensing_data.get('cmd_string'),
-                "is_finished": original_sensing_data.get('is_finished', 0),
-                "box_idx": original_sensing_data.get('box_idx', 0),
-                "timestamp": agv_data['last_update'].isoformat() if agv_data['last_update'] else None
-            }
+                return False
             
-            data_string = json.dumps(status_data, ensure_ascii=False)
-            self.server_mqtt_client.publish(STATUS_TOPIC, data_string, 1)
-            print(f"📊 AGV {agv_id} 상태 정보 중앙 서버 전송")
+            info = self.server_mqtt_client.publish(self.status_topic, data_string, 1)
+            # QoS 1 은 연결이 잠시 끊겨도 paho 가 보관 후 재전송
+            return info.rc in (mqtt.MQTT_ERR_SUCCESS, mqtt.MQTT_ERR_NO_CONN)
             
         except Exception as e:
-            print(f"서버 상태 전송 오류: {e}")
+            log.throttled(5.0, WARNING, "서버 상태 전송 오류: %s", e)
+            return False
     
     def start_heartbeat(self):
         """하트비트 전송 시작"""
@@ -366,17 +463,17 @@ class RaspberryPiBridge:
             while self.running and self.connected_to_server:
                 try:
                     heartbeat_data = {
-                        "raspberry_pi_id": RASPBERRY_PI_ID,
+                        "raspberry_pi_id": self.raspberry_pi_id,
                         "timestamp": datetime.now().isoformat(),
                         "status": "online"
                     }
                     
                     data_string = json.dumps(heartbeat_data, ensure_ascii=False)
                     self.server_mqtt_client.publish(HEARTBEAT_TOPIC, data_string, 1)
-                    print(f"💓 하트비트 전송: {RASPBERRY_PI_ID}")
+                    log.debug("💓 하트비트 전송: %s", self.raspberry_pi_id)
                     
                 except Exception as e:
-                    print(f"하트비트 전송 오류: {e}")
+                    log.throttled(5.0, WARNING, "하트비트 전송 오류: %s", e)
                 
                 time.sleep(30)  # 30초마다 하트비트 전송
         
@@ -385,34 +482,56 @@ class RaspberryPiBridge:
     
     def print_agv_status_summary(self):
         """AGV 상태 요약 출력 (주기적)"""
-        if not self.agv_sensing_data:
+        if not len(self.agv_registry):
             return
             
         print("\n=== AGV 상태 요약 ===")
-        for agv_id, data in self.agv_sensing_data.items():
-            last_update = data['last_update'].strftime("%H:%M:%S") if data['last_update'] else "없음"
-            status_icon = "🔄" if data['work_status'] == 'working' else "🏁" if data['work_status'] == 'finished' else "⏸️"
-            work_id = data.get('current_work_id', 'N/A')
-            collision_count = data.get('collision_count', 0)
-            print(f"AGV {agv_id}: {status_icon} {data['work_status']} | Work ID: {work_id} | 충돌: {collision_count}회 | 업데이트: {last_update}")
+        rates = self.agv_registry.rates()
+        for agv_id, data in self.agv_registry.items():
+            last_update = data.last_update.strftime("%H:%M:%S") if data.last_update else "없음"
+            status_icon = "🔄" if data.work_status == 'working' else "🏁" if data.work_status == 'finished' else "⏸️"
+            work_id = data.current_work_id if data.current_work_id is not None else 'N/A'
+            rate = rates.get(agv_id, {})
+            print(f"AGV {agv_id}: {status_icon} {data.work_status} | Work ID: {work_id} | 충돌: {data.collision_count}회 | "
+                  f"업데이트: {last_update} | {rate.get('msg_per_sec', 0)} msg/s, {rate.get('bytes_per_sec', 0) / 1024:.1f} KB/s")
+        self.print_pipeline_stats()
+        uplink = self.status_uplink.stats()
+        print(f"상태 업링크: 이벤트 {uplink['events_sent']} | 스냅샷 {uplink['snapshots_sent']} | "
+              f"묶음 처리 {uplink['updates_coalesced']} | {uplink['bytes_sent'] / 1024:.1f}KB")
+        store = self.image_store.stats()
+        print(f"이미지 저장소: {store['total_bytes'] / 1024 ** 2:.1f}MB | 프레임 {store['frames_written']} | "
+              f"중복 {store['frames_deduplicated']} | 삭제 세그먼트 {store['segments_evicted']}")
         print("==================\n")
     
+    def print_pipeline_stats(self):
+        """파이프라인 단계별 지연 / 큐 깊이 출력"""
+        stats = self.pipeline.get_stats()
+        print(f"파이프라인: 수신 {stats['received']} (이벤트 {stats['events']}) | 큐 {stats['queue_depth']} "
+              f"(I/O 대기 {stats['io_pending']}) | 폐기 {stats['dropped']} | 오류 {stats['errors']}")
+        for name, stage in stats['stages'].items():
+            if stage.get('count'):
+                print(f"  {name}: p50 {stage['p50_ms']}ms, p99 {stage['p99_ms']}ms, max {stage['max_ms']}ms ({stage['count']}건)")
+    
     def run(self):
         """메인 실행 루프"""
         self.running = True
         
+        # 처리 파이프라인 이벤트 루프 시작
+        self.pipeline.start()
+        self.status_uplink.start()
+        
         # 중앙 서버 MQTT 설정
         if not self.setup_server_mqtt():
-            print("❌ 중앙 서버 MQTT 설정 실패")
+            log.error("❌ 중앙 서버 MQTT 설정 실패")
             return
         
         # 로컬 MQTT 설정
         if not self.setup_local_mqtt():
-            print("❌ 로컬 MQTT 설정 실패")
+            log.error("❌ 로컬 MQTT 설정 실패")
             return
         
         # 연결 대기
-        print("⏳ MQTT 연결 대기 중...")
+        log.info("⏳ MQTT 연결 대기 중...")
         time.sleep(3)
         
         # 상태 요약 출력을 위한 카운터
@@ -422,34 +541,43 @@ class RaspberryPiBridge:
             while self.running:
                 # 연결 상태 확인
                 if not self.connected_to_server:
-                    print("⚠️ 중앙 서버 연결이 끊어졌습니다. 재연결 시도 중...")
+                    log.warning("⚠️ 중앙 서버 연결이 끊어졌습니다. 재연결 시도 중...")
                     self.setup_server_mqtt()
                 
                 if not self.connected_to_local_mqtt:
-                    print("⚠️ 로컬 MQTT 연결이 끊어졌습니다. 재연결 시도 중...")
+                    log.warning("⚠️ 로컬 MQTT 연결이 끊어졌습니다. 재연결 시도 중...")
                     self.setup_local_mqtt()
                 
                 # 주기적으로 AGV 상태 요약 출력 (30초마다)
                 status_counter += 1
                 if status_counter >= 6:  # 5초 * 6 = 30초
+                    for agv_id in self.agv_registry.evict_idle():
+                        self.status_uplink.remove(agv_id)
                     self.print_agv_status_summary()
+                    # 보관 기간이 지난 이미지 세그먼트 정리 (I/O 스레드)
+                    self.pipeline.run_io(self.image_store.enforce_retention)
                     status_counter = 0
                 
                 time.sleep(5)
         
         except KeyboardInterrupt:
-            print("프로그램 종료 요청")
+            log.info("프로그램 종료 요청")
         finally:
             self.running = False
+            self.status_uplink.stop()
             if self.server_mqtt_client:
                 self.server_mqtt_client.loop_stop()
                 self.server_mqtt_client.disconnect()
             if self.local_mqtt_client:
                 self.local_mqtt_client.loop_stop()
                 self.local_mqtt_client.disconnect()
-            print("프로그램 종료")
+            self.pipeline.stop()
+            self.work_log.close()
+            self.image_store.close()
+            log.info("프로그램 종료")
 
 
 if __name__ == "__main__":
+    setup_logging(LOG_LEVEL, LOG_FORMAT)
     bridge = RaspberryPiBridge()
     bridge.run()
\ No newline at end of file
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+센싱 데이터 바이너리 포맷 (v2)
+- agv/sensing_protocol.py 와 rp5/sensing_protocol.py 는 동일하게 유지할 것
+
+센싱 메시지 (agv/{id}/sensing): 고정 헤더만 전송
+이미지 메시지 (agv/{id}/image): 고정 헤더 + JPEG 원본 바이트
+
+v1 (JSON + base64 이미지) 메시지는 첫 바이트가 '{' 이므로 매직 바이트로 구분 가능
+"""
+
+import re
+import struct
+import time
+from datetime import datetime
+
+PROTOCOL_MAGIC = b'AS'
+PROTOCOL_VERSION = 2
+
+MSG_SENSING = 1
+MSG_IMAGE = 2
+
+FLAG_FINISHED = 0x01
+FLAG_HAS_IMAGE = 0x02
+FLAG_DELIVERED = 0x04  # 헤더 뒤에 배송 완료 물건 수 (DELIVERED) 추가 - end 메시지
+
+# cmd_string <-> 코드 변환
+CMD_CODES = {None: 0, "start": 1, "col": 2, "end": 3}
+CMD_STRINGS = {code: cmd for cmd, code in CMD_CODES.items()}
+
+# magic, version, header_len, msg_type, cmd, flags, reserved, agv_id, box_idx, work_id, seq, time_ms
+# header_len 을 함께 보내므로 이후 버전에서 필드를 뒤에 추가해도 이전 버전 디코더가 건너뛸 수 있음
+HEADER = struct.Struct('!2sBBBBBBHHIIQ')
+HEADER_SIZE = HEADER.size
+CMD_OFFSET = 5  # 헤더 안 cmd 바이트 위치
+
+# v1 JSON 의 cmd_string 값 (base64 이미지에는 따옴표가 없으므로 오탐 없음)
+V1_CMD_PATTERN = re.compile(rb'"cmd_string"\s*:\s*"(start|col|end)"')
+
+# 확장 필드: delivered (u16) - FLAG_DELIVERED 일 때만, header_len 에 포함
+DELIVERED = struct.Struct('!H')
+
+def is_binary(payload):
+    """v2 이상 바이너리 메시지 여부"""
+    return len(payload) >= HEADER_SIZE and payload[:2] == PROTOCOL_MAGIC
+
+def pack_header(msg_type, agv_id, work_id, seq, cmd_string=None, is_finished=False,
+                box_idx=0, has_image=False, timestamp=None, delivered=None):
+    """고정 헤더 생성 (delivered 지정 시 확장 필드 포함)"""
+    flags = 0
+    if is_finished:
+        flags |= FLAG_FINISHED
+    if has_image:
+        flags |= FLAG_HAS_IMAGE
+    if delivered is not None:
+        flags |= FLAG_DELIVERED
+
+    if timestamp is None:
+        timestamp = time.time()
+
+    header_len = HEADER_SIZE + (DELIVERED.size if delivered is not None else 0)
+    header = HEADER.pack(
+        PROTOCOL_MAGIC, PROTOCOL_VERSION, header_len, msg_type,
+        CMD_CODES.get(cmd_string, 0), flags, 0,
+        int(agv_id) & 0xFFFF, int(box_idx) & 0xFFFF,
+        int(work_id or 0) & 0xFFFFFFFF, int(seq) & 0xFFFFFFFF,
+        int(timestamp * 1000)
+    )
+    if delivered is not None:
+        header += DELIVERED.pack(int(delivered) & 0xFFFF)
+    return header
+
+def pack_sensing(agv_id, work_id, seq, cmd_string=None, is_finished=False,
+                 box_idx=0, has_image=False, timestamp=None, delivered=None):
+    """센싱 메시지 (헤더만)"""
+    return pack_header(MSG_SENSING, agv_id, work_id, seq, cmd_string, is_finished,
+                       box_idx, has_image, timestamp, delivered)
+
+def pack_image(agv_id, work_id, seq, jpeg_bytes, cmd_string=None, is_finished=False,
+               box_idx=0, timestamp=None):
+    """이미지 메시지 (헤더 + JPEG 원본)"""
+    header = pack_header(MSG_IMAGE, agv_id, work_id, seq, cmd_string, is_finished,
+                         box_idx, True, timestamp)
+    return header + bytes(jpeg_bytes)
+
+def peek_cmd_string(payload):
+    """전체 디코딩 없이 cmd_string (start/col/end) 만 확인 - v1 JSON / v2 바이너리, 없으면 None"""
+    if is_binary(payload):
+        return CMD_STRINGS.get(payload[CMD_OFFSET])
+    match = V1_CMD_PATTERN.search(payload)
+    return match.group(1).decode('ascii') if match else None
+
+def unpack(payload):
+    """
+    바이너리 메시지 디코딩
+    반환: (헤더 dict, 이미지 바이트 또는 None)
+    헤더 dict 는 v1 JSON 과 같은 키(agvId, workId, cmd_string, time, box_idx, is_finished, delivered)를 가짐
+    delivered: 확장 필드가 없으면 None
+    """
+    if not is_binary(payload):
+        raise ValueError("바이너리 센싱 메시지가 아님")
+
+    (_, version, header_len, msg_type, cmd, flags, _,
+     agv_id, box_idx, work_id, seq, time_ms) = HEADER.unpack_from(payload)
+
+    if header_len < HEADER_SIZE or header_len > len(payload):
+        raise ValueError(f"잘못된 헤더 길이: {header_len}")
+
+    delivered = None
+    if flags & FLAG_DELIVERED and header_len >= HEADER_SIZE + DELIVERED.size:
+        delivered, = DELIVERED.unpack_from(payload, HEADER_SIZE)
+
+    header = {
+        "version": version,
+        "msg_type": msg_type,
+        "agvId": agv_id,
+        "workId": work_id,
+        "seq": seq,
+        "cmd_string": CMD_STRINGS.get(cmd),
+        "time": datetime.fromtimestamp(time_ms / 1000.0).strftime("%Y-%m-%d %H:%M:%S"),
+        "time_ms": time_ms,
+        "box_idx": box_idx,
+        "is_finished": 1 if flags & FLAG_FINISHED else 0,
+        "has_image": bool(flags & FLAG_HAS_IMAGE),
+        "delivered": delivered,
+    }
+
+    image = None
+    if msg_type == MSG_IMAGE:
+        image = bytes(payload[header_len:])
+
+    return header, image
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+중앙 서버 상태 업링크 - 상태 변화 이벤트는 즉시, 평상시 상태는 주기적 플릿 스냅샷으로 묶어서 전송
+
+메시지 (raspberrypi/status/{pi_id}):
+  {"type": "event", "agv_id": ..., "status": ..., "cmd_string": ..., ...}   작업 시작/충돌/완료, 상태 전환
+  {"type": "snapshot", "seq": n, "full": false, "agvs": {agv_id: {변경 필드}}, "removed": [...]}
+스냅샷은 직전 스냅샷 대비 바뀐 필드만 포함 (변경 없으면 전송 생략)
+full_every 번째 스냅샷마다 전체 상태를 보내 서버가 중간 유실 후에도 상태를 복구할 수 있게 함
+"""
+
+import json
+import threading
+from datetime import datetime
+from structured_logging import get_logger, WARNING
+
+log = get_logger(__name__)
+
+class StatusUplink:
+    def __init__(self, publish_func, raspberry_pi_id, interval=5.0, full_every=12):
+        """publish_func(data_string) -> 전송 성공 여부"""
+        self.publish_func = publish_func
+        self.raspberry_pi_id = raspberry_pi_id
+        self.interval = interval
+        self.full_every = max(1, full_every)
+
+        self._lock = threading.Lock()
+        self._current = {}  # agv_id -> 최신 상태 필드
+        self._sent = {}  # agv_id -> 마지막 스냅샷에 반영된 상태 필드
+        self._removed = set()
+        self.snapshot_seq = 0
+
+        self.events_sent = 0
+        self.snapshots_sent = 0
+        self.updates_coalesced = 0
+        self.bytes_sent = 0
+
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._snapshot_loop, name="status-uplink", daemon=True)
+        self._thread.start()
+
+    def update(self, agv_id, fields, event=None):
+        """
+        AGV 상태 갱신 (파이프라인 루프 스레드)
+        event: 상태 변화 이벤트 정보 (cmd_string 등) - 지정 시 즉시 전송, 없으면 다음 스냅샷에 반영
+        """
+        with self._lock:
+            self._current[agv_id] = dict(fields)
+            self._removed.discard(agv_id)
+
+        if event is None:
+            self.updates_coalesced += 1
+            return
+
+        message = {"type": "event", "raspberry_pi_id": self.raspberry_pi_id, "agv_id": agv_id}
+        message.update(fields)
+        message.update(event)
+        message["timestamp"] = datetime.now().isoformat()
+        if self._publish(message):
+            self.events_sent += 1
+
+    def remove(self, agv_id):
+        """레지스트리에서 제거된 AGV - 다음 스냅샷에 removed 로 전달"""
+        with self._lock:
+            if self._current.pop(agv_id, None) is not None or agv_id in self._sent:
+                self._removed.add(agv_id)
+
+    def _build_snapshot_locked(self):
+        full = self.snapshot_seq % self.full_every == 0
+        agvs = {}
+        for agv_id, fields in self._current.items():
+            if full:
+                agvs[agv_id] = fields
+                continue
+            sent = self._sent.get(agv_id, {})
+            delta = {key: value for key, value in fields.items() if sent.get(key) != value}
+            if delta:
+                agvs[agv_id] = delta
+
+        removed = sorted(self._removed)
+        if not full and not agvs and not removed:
+            return None
+
+        return {
+            "type": "snapshot",
+            "raspberry_pi_id": self.raspberry_pi_id,
+            "seq": self.snapshot_seq,
+            "full": full,
+            "agvs": agvs,
+            "removed": removed,
+            "timestamp": datetime.now().isoformat(),
+        }
+
+    def send_snapshot(self):
+        """스냅샷 1회 전송 - 전송 실패 시 기준 상태를 갱신하지 않아 다음 스냅샷에 다시 포함"""
+        with self._lock:
+            message = self._build_snapshot_locked()
+            if message is None:
+                return False
+            current = {agv_id: dict(fields) for agv_id, fields in self._current.items()}
+
+        if not self._publish(message):
+            return False
+
+        with self._lock:
+            self._sent = current
+            self._removed.difference_update(message["removed"])
+            self.snapshot_seq += 1
+        self.snapshots_sent += 1
+        return True
+
+    def _snapshot_loop(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.send_snapshot()
+            except Exception as e:
+                log.throttled(5.0, WARNING, "상태 스냅샷 전송 오류: %s", e)
+
+    def _publish(self, message):
+        data_string = json.dumps(message, ensure_ascii=False)
+        if not self.publish_func(data_string):
+            return False
+        self.bytes_sent += len(data_string.encode('utf-8'))
+        return True
+
+    def stats(self):
+        return {
+            "events_sent": self.events_sent,
+            "snapshots_sent": self.snapshots_sent,
+            "updates_coalesced": self.updates_coalesced,
+            "bytes_sent": self.bytes_sent,
+        }
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
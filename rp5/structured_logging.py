@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+구조화 로깅 - 레벨 검사 후에만 메시지 생성, 백그라운드 큐 핸들러, 반복 메시지 빈도 제한
+
+사용:
+  log = get_logger(__name__)
+  log.info("센싱 데이터 전송: seq=%s", seq, work_id=work_id)   # 키워드 인자는 구조화 필드
+  log.throttled(5.0, logging.WARNING, "영역 탐지 오류: %s", e)  # 같은 메시지는 5초에 1번, 생략 횟수 첨부
+
+호출 스레드는 레코드를 큐에 넣기만 하고 포맷/출력은 리스너 스레드에서 수행
+agv/, rp5/, server/ 의 structured_logging.py 는 동일하게 유지
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+
+DEBUG = logging.DEBUG
+INFO = logging.INFO
+WARNING = logging.WARNING
+ERROR = logging.ERROR
+
+_listener = None
+_configured = False
+_setup_lock = threading.Lock()
+
+class StructuredFormatter(logging.Formatter):
+    """text: '12:00:00.123 INFO    mqtt_manager: 메시지 key=value', json: 한 줄 JSON"""
+
+    def __init__(self, fmt="text"):
+        super().__init__()
+        self.json_mode = fmt == "json"
+
+    def format(self, record):
+        message = record.getMessage()
+        fields = getattr(record, "fields", None)
+
+        if self.json_mode:
+            entry = {
+                "ts": round(record.created, 3),
+                "level": record.levelname,
+                "logger": record.name,
+                "thread": record.threadName,
+                "msg": message,
+            }
+            if fields:
+                entry.update(fields)
+            if record.exc_info:
+                entry["exc"] = self.formatException(record.exc_info)
+            return json.dumps(entry, ensure_ascii=False, default=str)
+
+        ts = time.strftime("%H:%M:%S", time.localtime(record.created))
+        line = f"{ts}.{int(record.msecs):03d} {record.levelname:<7} {record.name}: {message}"
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # 포맷은 리스너 스레드에서 수행 - 레코드를 그대로 전달
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass  # 출력이 밀리면 호출 스레드를 막지 않고 버림
+
+def setup_logging(level="INFO", fmt="text", stream=None, queue_size=10000):
+    """루트 로거에 큐 핸들러 연결 (여러 번 호출해도 1회만 설정)"""
+    global _listener, _configured
+    with _setup_lock:
+        root = logging.getLogger()
+        root.setLevel(level if isinstance(level, int) else logging.getLevelName(level.upper()))
+        if _configured:
+            return
+        _configured = True
+
+        output = logging.StreamHandler(stream or sys.stdout)
+        output.setFormatter(StructuredFormatter(fmt))
+
+        log_queue = queue.Queue(maxsize=queue_size)
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(_QueueHandler(log_queue))
+
+        _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=False)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+def shutdown_logging():
+    """남은 레코드 출력 후 리스너 종료"""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+class StructuredLogger:
+    def __init__(self, name):
+        self._logger = logging.getLogger(name)
+        self._throttle = {}  # key -> [마지막 출력 시각, 생략 횟수]
+
+    def enabled(self, level):
+        """비싼 로그 인자를 만들기 전에 확인"""
+        return self._logger.isEnabledFor(level)
+
+    def log(self, level, msg, *args, exc_info=None, **fields):
+        if not self._logger.isEnabledFor(level):
+            return
+        if not _configured:
+            setup_logging()  # 진입점에서 설정하지 않은 경우 기본값 (INFO, text)
+        self._logger._log(level, msg, args, exc_info=exc_info, extra={"fields": fields} if fields else None)
+
+    def debug(self, msg, *args, **fields):
+        self.log(DEBUG, msg, *args, **fields)
+
+    def info(self, msg, *args, **fields):
+        self.log(INFO, msg, *args, **fields)
+
+    def warning(self, msg, *args, **fields):
+        self.log(WARNING, msg, *args, **fields)
+
+    def error(self, msg, *args, **fields):
+        self.log(ERROR, msg, *args, **fields)
+
+    def exception(self, msg, *args, **fields):
+        self.log(ERROR, msg, *args, exc_info=True, **fields)
+
+    def throttled(self, interval, level, msg, *args, key=None, **fields):
+        """같은 key (기본: 메시지 형식 문자열) 는 interval 초에 1번만 출력, 생략된 횟수는 suppressed 필드로 첨부"""
+        if not self._logger.isEnabledFor(level):
+            return
+        key = key or msg
+        now = time.monotonic()
+        state = self._throttle.get(key)
+        if state is not None and now - state[0] < interval:
+            state[1] += 1
+            return
+        suppressed = state[1] if state is not None else 0
+        self._throttle[key] = [now, 0]
+        if suppressed:
+            fields["suppressed"] = suppressed
+        self.log(level, msg, *args, **fields)
+
+def get_logger(name):
+    return StructuredLogger(name)
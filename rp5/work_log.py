@@ -0,0 +1,254 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+작업 이벤트 로그 기록기 - 메모리 버퍼 + 크기/시간 기준 flush, 세그먼트 회전/압축, work_id 인덱스
+
+파일 구성 (directory 아래):
+  agv_work_log.00001.jsonl.gz   닫힌 세그먼트 (압축)
+  agv_work_log.00002.jsonl      현재 기록 중인 세그먼트
+  agv_work_log.index.json       work_id -> [[세그먼트 번호, 오프셋], ...]
+오프셋은 압축 전 세그먼트 기준이므로 압축 여부와 관계없이 같은 값으로 조회
+"""
+
+import gzip
+import json
+import os
+import re
+import shutil
+import sys
+import threading
+from structured_logging import get_logger, WARNING
+
+log = get_logger(__name__)
+
+FSYNC_ALWAYS = "always"  # 매 기록마다 flush + fsync
+FSYNC_ON_FLUSH = "flush"  # 버퍼 flush 때마다 fsync
+FSYNC_NEVER = "never"  # OS 에 맡김
+
+class WorkLogWriter:
+    def __init__(self, directory, base_name="agv_work_log", flush_bytes=64 * 1024,
+                 flush_interval=2.0, fsync_policy=FSYNC_ON_FLUSH,
+                 segment_max_bytes=8 * 1024 * 1024, compress=True, read_only=False):
+        self.directory = directory
+        self.base_name = base_name
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.fsync_policy = fsync_policy
+        self.segment_max_bytes = segment_max_bytes
+        self.compress = compress
+        self.read_only = read_only
+
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._buffered_bytes = 0
+        self._file = None
+
+        self.segment_no = 0
+        self.segment_size = 0  # 현재 세그먼트에 기록된 바이트 (버퍼 제외)
+        self.index = {}  # work_id(str) -> [[segment_no, offset], ...]
+
+        self.written = 0
+        self.flushes = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._open_existing()
+
+        self._stop_event = threading.Event()
+        if not read_only:
+            self._flusher = threading.Thread(target=self._flush_loop, name="work-log-flush", daemon=True)
+            self._flusher.start()
+
+    # ---- 경로 ----
+
+    def _segment_path(self, segment_no, compressed=False):
+        name = f"{self.base_name}.{segment_no:05d}.jsonl"
+        return os.path.join(self.directory, name + (".gz" if compressed else ""))
+
+    def _index_path(self):
+        return os.path.join(self.directory, f"{self.base_name}.index.json")
+
+    def _list_segments(self):
+        pattern = re.compile(re.escape(self.base_name) + r"\.(\d{5})\.jsonl(\.gz)?$")
+        segments = {}
+        for name in os.listdir(self.directory):
+            m = pattern.match(name)
+            if m:
+                segments[int(m.group(1))] = bool(m.group(2))
+        return segments
+
+    # ---- 시작 / 복구 ----
+
+    def _open_existing(self):
+        """저장된 인덱스 로드 후 마지막 (미압축) 세그먼트를 이어서 기록"""
+        segments = self._list_segments()
+
+        try:
+            with open(self._index_path(), 'r', encoding='utf-8') as f:
+                self.index = json.load(f).get("works", {})
+        except (OSError, ValueError):
+            self.index = {}
+
+        last = max(segments) if segments else 0
+        if last and not segments[last]:
+            # 인덱스 저장 이전에 종료되었을 수 있으므로 활성 세그먼트는 다시 스캔
+            self.segment_no = last
+            self._drop_index_for(last)
+            self._scan_segment(last)
+        else:
+            self.segment_no = last + 1
+
+        if self.read_only:
+            return
+        path = self._segment_path(self.segment_no)
+        self._file = open(path, 'ab')
+        self.segment_size = self._file.tell()
+
+    def _drop_index_for(self, segment_no):
+        for work_id in list(self.index):
+            entries = [e for e in self.index[work_id] if e[0] != segment_no]
+            if entries:
+                self.index[work_id] = entries
+            else:
+                del self.index[work_id]
+
+    def _scan_segment(self, segment_no):
+        offset = 0
+        with open(self._segment_path(segment_no), 'rb') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    self._index_entry(entry, segment_no, offset)
+                except ValueError:
+                    pass
+                offset += len(line)
+
+    def _index_entry(self, entry, segment_no, offset):
+        work_id = entry.get("work_id")
+        if work_id is None:
+            return
+        self.index.setdefault(str(work_id), []).append([segment_no, offset])
+
+    # ---- 기록 ----
+
+    def write(self, entry):
+        """로그 항목 추가 (메모리 버퍼)"""
+        line = (json.dumps(entry, ensure_ascii=False) + '\n').encode('utf-8')
+        with self._lock:
+            self._index_entry(entry, self.segment_no, self.segment_size + self._buffered_bytes)
+            self._buffer.append(line)
+            self._buffered_bytes += len(line)
+            self.written += 1
+
+            if self.fsync_policy == FSYNC_ALWAYS or self._buffered_bytes >= self.flush_bytes:
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._buffer or self._file is None:
+            return
+
+        self._file.write(b''.join(self._buffer))
+        self._file.flush()
+        if self.fsync_policy != FSYNC_NEVER:
+            os.fsync(self._file.fileno())
+
+        self.segment_size += self._buffered_bytes
+        self._buffer = []
+        self._buffered_bytes = 0
+        self.flushes += 1
+
+        if self.segment_size >= self.segment_max_bytes:
+            self._rotate_locked()
+
+    def _flush_loop(self):
+        while not self._stop_event.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                log.throttled(5.0, WARNING, "작업 로그 flush 오류: %s", e)
+
+    def _rotate_locked(self):
+        """현재 세그먼트를 닫고 압축 후 새 세그먼트 시작"""
+        self._file.close()
+        closed = self.segment_no
+
+        if self.compress:
+            src = self._segment_path(closed)
+            dst = self._segment_path(closed, compressed=True)
+            with open(src, 'rb') as f_in, gzip.open(dst + ".tmp", 'wb') as f_out:
+                shutil.copyfileobj(f_in, f_out)
+            os.replace(dst + ".tmp", dst)
+            os.remove(src)
+
+        self.segment_no += 1
+        self.segment_size = 0
+        self._file = open(self._segment_path(self.segment_no), 'ab')
+        self._save_index_locked()
+        log.info("🗂️ 작업 로그 세그먼트 회전: %s -> %s", closed, self.segment_no)
+
+    def _save_index_locked(self):
+        tmp = self._index_path() + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({"segment_no": self.segment_no, "works": self.index}, f)
+        os.replace(tmp, self._index_path())
+
+    # ---- 조회 ----
+
+    def lookup(self, work_id):
+        """work_id 의 이벤트 목록 - 인덱스의 세그먼트/오프셋만 읽음"""
+        with self._lock:
+            self._flush_locked()
+            locations = list(self.index.get(str(work_id), []))
+
+        entries = []
+        by_segment = {}
+        for segment_no, offset in locations:
+            by_segment.setdefault(segment_no, []).append(offset)
+
+        for segment_no, offsets in sorted(by_segment.items()):
+            compressed = os.path.exists(self._segment_path(segment_no, compressed=True))
+            path = self._segment_path(segment_no, compressed)
+            opener = gzip.open if compressed else open
+            try:
+                with opener(path, 'rb') as f:
+                    for offset in sorted(offsets):
+                        f.seek(offset)
+                        entries.append(json.loads(f.readline()))
+            except (OSError, ValueError) as e:
+                log.warning("작업 로그 조회 오류 (세그먼트 %s): %s", segment_no, e)
+        return entries
+
+    def stats(self):
+        with self._lock:
+            return {
+                "segment_no": self.segment_no,
+                "segment_size": self.segment_size,
+                "buffered_bytes": self._buffered_bytes,
+                "written": self.written,
+                "flushes": self.flushes,
+                "indexed_works": len(self.index),
+            }
+
+    def close(self):
+        self._stop_event.set()
+        if self.read_only:
+            return
+        with self._lock:
+            self._flush_locked()
+            self._save_index_locked()
+            self._file.close()
+
+
+if __name__ == "__main__":
+    # 사용법: python work_log.py <로그 디렉토리> <work_id>
+    if len(sys.argv) != 3:
+        print("사용법: python work_log.py <로그 디렉토리> <work_id>")
+        sys.exit(1)
+
+    reader = WorkLogWriter(sys.argv[1], read_only=True)
+    for event in reader.lookup(sys.argv[2]):
+        print(json.dumps(event, ensure_ascii=False))
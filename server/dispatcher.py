@@ -0,0 +1,597 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+배송 작업 디스패처 - 작업 대기열을 AGV 에 배정 (전체 완료 시각 최소화)
+
+입력:
+  작업: --jobs 파일 (JSON 목록) 또는 server/jobs 토픽 {"start": "red", "end": "blue", "item_idx": 3, "priority": 0}
+  AGV 상태: raspberrypi/status/{pi_id} (이벤트 / 스냅샷), raspberrypi/heartbeat
+출력:
+  server/commands/{pi_id} - server.cpp 와 같은 명령 형식 {"start": 색상 인덱스, "end", "delays", "agv_id", "timedata", "item_idx"}
+  server/dispatch/status - 대기 작업 수 / AGV 별 계획 / 예상 전체 완료 시각
+
+배정:
+  경로(start, end) 별 소요 시간은 AGV 의 start → end 이벤트 간격으로 학습 (지수 이동 평균, AGV 별 값 우선)
+  같은 경로 작업은 한 운행으로 묶고 (최대 BATCH_MAX_ITEMS 개), 우선순위 → 소요 시간이 긴 순서로
+  예상 완료 시각이 가장 빠른 AGV 에 배정 (LPT)
+  계획은 상태가 바뀔 때마다 다시 세우고, 대기 중인 AGV 에는 계획의 첫 운행만 전송
+재배정:
+  시작 확인 없음 (START_TIMEOUT) / 라즈베리파이 하트비트 끊김 / 운행 시간 초과 (예상 소요 시간 x TRIP_TIMEOUT_FACTOR)
+  / 운행 중인데 대기 (idle) 상태 이벤트 - 운행 중이던 작업을 대기열로 되돌림 (스냅샷은 이벤트보다 늦게 도착할 수 있어 제외)
+완료 집계: end 이벤트의 delivered (AGV 가 보고한 배송 완료 물건 수) 만 집계, 없으면 확인 안 된 운행으로 따로 집계
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from structured_logging import get_logger, setup_logging
+
+log = get_logger("dispatcher")
+
+# MQTT 토픽 (server.cpp 와 동일)
+COMMAND_TOPIC_PREFIX = "server/commands/"
+STATUS_TOPIC_PREFIX = "raspberrypi/status/"
+HEARTBEAT_TOPIC = "raspberrypi/heartbeat"
+JOBS_TOPIC = "server/jobs"
+DISPATCH_STATUS_TOPIC = "server/dispatch/status"
+
+COLOR_LIST = ["red", "green", "blue", "purple", "yellow", "orange"]
+
+# 배정 설정
+HEARTBEAT_TIMEOUT = 75.0  # 하트비트 (30초 주기) 가 이 시간 동안 없으면 해당 라즈베리파이의 AGV 제외
+START_TIMEOUT = 60.0  # 명령 전송 후 start 이벤트가 없으면 작업을 대기열로 되돌리고 그 AGV 는 같은 시간 동안 배정 제외
+DEFAULT_ROUTE_SECONDS = 120.0  # 관측 전 경로 소요 시간 추정값
+EXTRA_ITEM_SECONDS = 25.0  # 묶음 운행에서 물건 1개 추가 시 로봇팔 동작 시간 (집기 + 적재 + 내리기)
+TRIP_TIMEOUT_FACTOR = 3.0  # start 이벤트 후 예상 소요 시간의 이 배수가 지나도 end 가 없으면 작업 재배정
+BATCH_MAX_ITEMS = 1  # 한 운행 최대 물건 수 (AGV 의 ARM_BATCH_ENABLED 를 켜면 ARM_CARRY_POSITIONS 개수)
+ROUTE_EWMA_ALPHA = 0.3
+TICK_INTERVAL = 1.0
+STATUS_INTERVAL = 10.0
+
+def color_name(value):
+    """색상 이름 또는 인덱스 -> 이름 (잘못된 값은 ValueError)"""
+    if isinstance(value, int) or (isinstance(value, str) and value.isdigit()):
+        return COLOR_LIST[int(value)]
+    if value not in COLOR_LIST:
+        raise ValueError(f"잘못된 색상: {value}")
+    return value
+
+def topic_matches(pattern, topic):
+    """MQTT 토픽 필터 매칭 (+: 한 단계, #: 나머지 전체)"""
+    pattern_parts = pattern.split('/')
+    topic_parts = topic.split('/')
+    for i, part in enumerate(pattern_parts):
+        if part == '#':
+            return True
+        if i >= len(topic_parts) or (part != '+' and part != topic_parts[i]):
+            return False
+    return len(pattern_parts) == len(topic_parts)
+
+class Job:
+    __slots__ = ("job_id", "start", "end", "items", "priority", "created_at")
+
+    def __init__(self, job_id, start, end, items, priority=0, created_at=None):
+        self.job_id = job_id
+        self.start = start
+        self.end = end
+        self.items = items
+        self.priority = priority
+        self.created_at = created_at if created_at is not None else time.time()
+
+    @property
+    def route(self):
+        return (self.start, self.end)
+
+class RouteStats:
+    """경로별 소요 시간 (물건 1개 기준) - AGV 별 / 전체, 파일에 저장해 재시작 후에도 유지"""
+
+    def __init__(self, path=None, alpha=ROUTE_EWMA_ALPHA, default=DEFAULT_ROUTE_SECONDS):
+        self.path = path
+        self.alpha = alpha
+        self.default = default
+        self._lock = threading.Lock()
+        self._stats = {}  # "red>blue" 또는 "rp5_1/1|red>blue" -> {"mean": 초, "count": 수}
+
+    @staticmethod
+    def _key(route, agv_key=None):
+        route_key = f"{route[0]}>{route[1]}"
+        return f"{agv_key[0]}/{agv_key[1]}|{route_key}" if agv_key else route_key
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._stats = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            log.error("경로 통계 로드 오류: %s", e)
+
+    def _save_locked(self):
+        if not self.path:
+            return
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._stats, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            log.error("경로 통계 저장 오류: %s", e)
+
+    def observe(self, agv_key, route, duration, items=1):
+        base = max(1.0, duration - (items - 1) * EXTRA_ITEM_SECONDS)
+        with self._lock:
+            for key in (self._key(route, agv_key), self._key(route)):
+                entry = self._stats.get(key)
+                if entry is None:
+                    self._stats[key] = {"mean": base, "count": 1}
+                else:
+                    entry["mean"] += self.alpha * (base - entry["mean"])
+                    entry["count"] += 1
+            self._save_locked()
+
+    def estimate(self, agv_key, route, items=1):
+        """AGV 별 관측값 -> 경로 전체 관측값 -> 전체 경로 평균 -> 기본값 순으로 사용"""
+        with self._lock:
+            entry = self._stats.get(self._key(route, agv_key)) or self._stats.get(self._key(route))
+            if entry is not None:
+                base = entry["mean"]
+            else:
+                routes = [e["mean"] for k, e in self._stats.items() if '|' not in k]
+                base = sum(routes) / len(routes) if routes else self.default
+        return base + (items - 1) * EXTRA_ITEM_SECONDS
+
+    def snapshot(self):
+        with self._lock:
+            return {key: dict(entry) for key, entry in self._stats.items()}
+
+class AgvView:
+    __slots__ = ("pi_id", "agv_id", "status", "work_id", "batch", "dispatched_at", "started_at", "blocked_until")
+
+    def __init__(self, pi_id, agv_id):
+        self.pi_id = pi_id
+        self.agv_id = agv_id
+        self.status = "idle"
+        self.work_id = None
+        self.batch = None  # 전송한 운행 (Job 목록) - start 이벤트 전에도 유지
+        self.dispatched_at = None
+        self.started_at = None
+        self.blocked_until = 0.0  # 시작 확인 시간 초과 후 배정 제외 (늦게 시작한 명령과 중복 방지)
+
+    @property
+    def key(self):
+        return (self.pi_id, self.agv_id)
+
+class Dispatcher:
+    def __init__(self, publish_func, route_stats=None, fleet=(), batch_max_items=BATCH_MAX_ITEMS,
+                 heartbeat_timeout=HEARTBEAT_TIMEOUT, start_timeout=START_TIMEOUT,
+                 trip_timeout_factor=TRIP_TIMEOUT_FACTOR):
+        """publish_func(topic, payload_string), fleet: [(pi_id, agv_id)] - 상태 보고 전에도 배정 대상"""
+        self.publish_func = publish_func
+        self.route_stats = route_stats if route_stats is not None else RouteStats()
+        self.batch_max_items = max(1, batch_max_items)
+        self.heartbeat_timeout = heartbeat_timeout
+        self.start_timeout = start_timeout
+        self.trip_timeout_factor = trip_timeout_factor
+
+        self._lock = threading.RLock()
+        self.pending = []
+        self.agvs = {}  # (pi_id, agv_id) -> AgvView
+        self.last_heartbeat = {}  # pi_id -> time.monotonic()
+        self._next_job_id = 1
+        self.plan = {}
+        self.makespan = 0.0
+
+        self.dispatched = 0
+        self.completed_items = 0  # end 이벤트로 확인된 배송 완료 물건 수
+        self.unconfirmed_trips = 0  # 배송 수 보고 없이 끝난 운행 (구버전 AGV)
+        self.requeued = 0
+
+        for pi_id, agv_id in fleet:
+            self._agv(pi_id, agv_id)
+
+    # ---- 입력 ----
+
+    def attach(self, transport):
+        """transport: subscribe(pattern, callback(topic, payload)) 를 제공하는 MQTT 클라이언트 / InProcessBroker"""
+        for pattern in (STATUS_TOPIC_PREFIX + "+", HEARTBEAT_TOPIC, JOBS_TOPIC):
+            transport.subscribe(pattern, self.on_message)
+
+    def add_jobs(self, job_specs):
+        """
+        작업 추가 - [{"start", "end", "item_idx", "priority"}], 추가된 작업 수 반환
+        물건이 batch_max_items 보다 많은 작업은 batch_max_items 개씩 나눠서 추가 (한 운행에 실을 수 있는 만큼)
+        """
+        added = 0
+        with self._lock:
+            for spec in job_specs:
+                try:
+                    item_idx = spec["item_idx"]
+                    items = [int(i) for i in item_idx] if isinstance(item_idx, list) else [int(item_idx)]
+                    start, end = color_name(spec["start"]), color_name(spec["end"])
+                    priority = int(spec.get("priority", 0))
+                except (KeyError, ValueError, IndexError, TypeError) as e:
+                    log.warning("잘못된 작업 무시: %s (%s)", spec, e)
+                    continue
+                if not items:
+                    log.warning("물건 없는 작업 무시: %s", spec)
+                    continue
+                for offset in range(0, len(items), self.batch_max_items):
+                    job = Job(self._next_job_id, start, end, items[offset:offset + self.batch_max_items], priority)
+                    self._next_job_id += 1
+                    self.pending.append(job)
+                    added += 1
+        if added:
+            log.info("📥 작업 %s개 추가 (대기 %s개)", added, len(self.pending))
+            self.dispatch()
+        return added
+
+    def on_message(self, topic, payload):
+        try:
+            data = json.loads(payload)
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            log.warning("JSON 파싱 오류 (%s): %s", topic, e)
+            return
+
+        if topic == HEARTBEAT_TOPIC:
+            with self._lock:
+                pi_id = data.get("raspberry_pi_id")
+                if pi_id:
+                    self.last_heartbeat[pi_id] = time.monotonic()
+            self.dispatch()
+        elif topic == JOBS_TOPIC:
+            self.add_jobs(data if isinstance(data, list) else [data])
+        elif topic.startswith(STATUS_TOPIC_PREFIX):
+            self._on_status(topic[len(STATUS_TOPIC_PREFIX):], data)
+
+    def _agv(self, pi_id, agv_id):
+        key = (pi_id, str(agv_id))
+        agv = self.agvs.get(key)
+        if agv is None:
+            agv = AgvView(pi_id, str(agv_id))
+            self.agvs[key] = agv
+        return agv
+
+    def _on_status(self, pi_id, data):
+        """status_uplink.py 의 이벤트 / 스냅샷 메시지 반영"""
+        with self._lock:
+            # 상태 메시지도 라즈베리파이 생존 신호로 취급
+            self.last_heartbeat[pi_id] = time.monotonic()
+            if data.get("type") == "event":
+                self._apply_status(self._agv(pi_id, data["agv_id"]), data, data.get("cmd_string"), event=True)
+            elif data.get("type") == "snapshot":
+                for agv_id, fields in data.get("agvs", {}).items():
+                    self._apply_status(self._agv(pi_id, agv_id), fields, None)
+        self.dispatch()
+
+    def _apply_status(self, agv, fields, cmd_string, event=False):
+        """event: 상태 변화 이벤트 (파이프라인 순서대로 전송) - 스냅샷은 다른 스레드에서 만들어져 이벤트보다 오래된 상태일 수 있음"""
+        if "status" in fields:
+            agv.status = fields["status"]
+        if "work_id" in fields:
+            agv.work_id = fields["work_id"]
+
+        now = time.monotonic()
+        if cmd_string is not None:
+            agv.blocked_until = 0.0  # 응답 확인
+        if cmd_string == "start" and agv.batch is not None:
+            agv.started_at = now
+        elif cmd_string == "end":
+            # 완료 집계는 AGV 가 보고한 배송 수만 (디스패처 밖 운행 / AGV 가 다시 실행한 물건 포함)
+            delivered = fields.get("delivered")
+            if delivered is not None:
+                self.completed_items += int(delivered)
+            else:
+                self.unconfirmed_trips += 1
+            if agv.batch is None:
+                return
+            items = sum(len(job.items) for job in agv.batch)
+            if agv.started_at is not None:
+                duration = now - agv.started_at
+                self.route_stats.observe(agv.key, agv.batch[0].route, duration, items)
+                log.info("🏁 AGV %s/%s 운행 완료: %s → %s, 물건 %s개 중 %s개 배송, %.1f초",
+                         agv.pi_id, agv.agv_id, agv.batch[0].start, agv.batch[0].end, items,
+                         "?" if delivered is None else delivered, duration)
+            agv.batch = None
+            agv.dispatched_at = None
+            agv.started_at = None
+        elif (event and cmd_string is None and agv.batch is not None and agv.started_at is not None
+              and agv.status == "idle"):
+            # end 이벤트 유실 / 라즈베리파이 재시작 - 운행 결과를 모르므로 다시 배정
+            # (스냅샷의 idle 은 start 이벤트 이전 상태일 수 있어 무시 - 끝나지 않는 운행은 운행 시간 초과로 처리)
+            self._requeue_batch(agv, now, "운행 중 대기 상태 보고")
+
+    # ---- 배정 ----
+
+    def _online(self, pi_id, now):
+        seen = self.last_heartbeat.get(pi_id)
+        return seen is not None and now - seen < self.heartbeat_timeout
+
+    def _is_free(self, agv):
+        return agv.batch is None and agv.status in ("idle", "finished")
+
+    def _available_at(self, agv, now):
+        """AGV 가 다음 운행을 시작할 수 있는 예상 시각 (now 기준 초)"""
+        if self._is_free(agv):
+            return 0.0
+        if agv.batch is None:
+            return self.route_stats.default / 2  # 디스패처 밖에서 받은 작업 수행 중 - 남은 시간 모름
+        items = sum(len(job.items) for job in agv.batch)
+        estimate = self.route_stats.estimate(agv.key, agv.batch[0].route, items)
+        elapsed = now - agv.started_at if agv.started_at is not None else 0.0
+        return max(0.0, estimate - elapsed)
+
+    def _make_batches(self):
+        """같은 경로 작업을 우선순위 / 접수 순으로 BATCH_MAX_ITEMS 까지 묶음"""
+        by_route = {}
+        for job in sorted(self.pending, key=lambda j: (-j.priority, j.created_at, j.job_id)):
+            by_route.setdefault(job.route, []).append(job)
+
+        batches = []
+        for jobs in by_route.values():
+            batch, count = [], 0
+            for job in jobs:
+                if batch and count + len(job.items) > self.batch_max_items:
+                    batches.append(batch)
+                    batch, count = [], 0
+                batch.append(job)
+                count += len(job.items)
+            if batch:
+                batches.append(batch)
+        return batches
+
+    def _build_plan(self, now):
+        agvs = [agv for agv in self.agvs.values() if self._online(agv.pi_id, now) and agv.blocked_until <= now]
+        plan = {agv.key: [] for agv in agvs}
+        if not agvs:
+            return plan, None
+
+        finish = {agv.key: self._available_at(agv, now) for agv in agvs}
+        batches = self._make_batches()
+
+        def weight(batch):
+            items = sum(len(job.items) for job in batch)
+            return self.route_stats.estimate(None, batch[0].route, items)
+
+        # 우선순위가 높은 운행 먼저, 같은 우선순위에서는 소요 시간이 긴 운행부터 (LPT)
+        batches.sort(key=lambda b: (-max(job.priority for job in b), -weight(b)))
+        for batch in batches:
+            items = sum(len(job.items) for job in batch)
+            best = min(agvs, key=lambda agv: (finish[agv.key] + self.route_stats.estimate(agv.key, batch[0].route, items),
+                                              agv.key))
+            finish[best.key] += self.route_stats.estimate(best.key, batch[0].route, items)
+            plan[best.key].append(batch)
+
+        return plan, max(finish.values())
+
+    def dispatch(self):
+        """계획을 다시 세우고 대기 중인 AGV 에 첫 운행 전송"""
+        now = time.monotonic()
+        commands = []
+        with self._lock:
+            self._requeue_stalled(now)
+            plan, makespan = self._build_plan(now)
+            for key, batches in plan.items():
+                agv = self.agvs[key]
+                if not batches or not self._is_free(agv):
+                    continue
+                batch = batches.pop(0)
+                for job in batch:
+                    self.pending.remove(job)
+                agv.batch = batch
+                agv.dispatched_at = now
+                agv.started_at = None
+                agv.status = "assigned"
+                commands.append((agv, batch))
+            self.plan = plan
+            self.makespan = makespan or 0.0
+            self.dispatched += len(commands)
+
+        for agv, batch in commands:
+            self._send_command(agv, batch)
+        if commands:
+            self.publish_status()
+        return len(commands)
+
+    def _requeue_stalled(self, now):
+        """
+        끝나지 않는 운행은 대기열로 되돌림
+        - 라즈베리파이 하트비트 끊김
+        - 명령 전송 후 START_TIMEOUT 동안 start 이벤트 없음
+        - start 후 예상 소요 시간 x trip_timeout_factor 동안 end 이벤트 없음
+        """
+        for agv in self.agvs.values():
+            if agv.batch is None:
+                continue
+            if not self._online(agv.pi_id, now):
+                reason = "하트비트 없음"
+            elif agv.started_at is None:
+                if now - agv.dispatched_at < self.start_timeout:
+                    continue
+                reason = "시작 확인 없음"
+            else:
+                items = sum(len(job.items) for job in agv.batch)
+                limit = self.trip_timeout_factor * self.route_stats.estimate(agv.key, agv.batch[0].route, items)
+                if now - agv.started_at < limit:
+                    continue
+                reason = f"운행 시간 초과 ({limit:.0f}초)"
+            self._requeue_batch(agv, now, reason)
+
+    def _requeue_batch(self, agv, now, reason):
+        """AGV 의 현재 운행을 대기열로 되돌리고 START_TIMEOUT 동안 배정 제외 (늦게 끝난 운행과 중복 방지)"""
+        log.warning("⏱️ AGV %s/%s %s - 작업 %s 재배정", agv.pi_id, agv.agv_id, reason,
+                    [job.job_id for job in agv.batch])
+        self.pending.extend(agv.batch)
+        self.requeued += len(agv.batch)
+        if agv.started_at is None:
+            agv.status = "idle"  # 시작 전 - 운행 중이면 다음 상태 보고 (idle / finished) 까지 배정 대상 아님
+        agv.batch = None
+        agv.dispatched_at = None
+        agv.started_at = None
+        agv.blocked_until = now + self.start_timeout
+
+    def _send_command(self, agv, batch):
+        items = [idx for job in batch for idx in job.items]
+        command = {
+            "start": COLOR_LIST.index(batch[0].start),
+            "end": COLOR_LIST.index(batch[0].end),
+            "delays": 0,
+            "agv_id": agv.agv_id,
+            "timedata": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "item_idx": items[0] if len(items) == 1 else items,
+            "priority": max(job.priority for job in batch),
+        }
+        self.publish_func(COMMAND_TOPIC_PREFIX + agv.pi_id, json.dumps(command, ensure_ascii=False))
+        log.info("🚚 AGV %s/%s 배정: %s → %s, 물건 %s (작업 %s)", agv.pi_id, agv.agv_id,
+                 batch[0].start, batch[0].end, items, [job.job_id for job in batch])
+
+    # ---- 상태 ----
+
+    def tick(self):
+        """주기 호출 - 시작 확인 / 운행 시간 초과 처리, 오프라인 AGV 반영"""
+        self.dispatch()
+
+    def status(self):
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "pending_jobs": len(self.pending),
+                "dispatched": self.dispatched,
+                "completed_items": self.completed_items,
+                "unconfirmed_trips": self.unconfirmed_trips,
+                "requeued": self.requeued,
+                "makespan_sec": round(self.makespan, 1),
+                "agvs": {
+                    f"{agv.pi_id}/{agv.agv_id}": {
+                        "online": self._online(agv.pi_id, now),
+                        "blocked": agv.blocked_until > now,
+                        "status": agv.status,
+                        "current": [job.job_id for job in agv.batch] if agv.batch else None,
+                        "planned": [[job.job_id for job in batch] for batch in self.plan.get(agv.key, [])],
+                    }
+                    for agv in self.agvs.values()
+                },
+                "timestamp": datetime.now().isoformat(),
+            }
+
+    def publish_status(self):
+        self.publish_func(DISPATCH_STATUS_TOPIC, json.dumps(self.status(), ensure_ascii=False))
+
+    def run_forever(self, stop_event):
+        last_status = 0.0
+        while not stop_event.wait(TICK_INTERVAL):
+            self.tick()
+            if time.monotonic() - last_status >= STATUS_INTERVAL:
+                self.publish_status()
+                last_status = time.monotonic()
+
+class InProcessBroker:
+    """MQTT 브로커 대역 - 같은 프로세스 안에서 토픽 필터(+, #) 매칭 후 동기 전달 (시험 / 모의 실행용)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = []  # (pattern, callback)
+        self.published = 0
+
+    def subscribe(self, pattern, callback):
+        with self._lock:
+            self._subscriptions.append((pattern, callback))
+
+    def publish(self, topic, payload, qos=1):
+        with self._lock:
+            targets = [callback for pattern, callback in self._subscriptions if topic_matches(pattern, topic)]
+            self.published += 1
+        for callback in targets:
+            callback(topic, payload)
+
+class MqttTransport:
+    """paho 클라이언트를 InProcessBroker 와 같은 subscribe / publish 형태로 감쌈 (재연결 시 재구독)"""
+
+    def __init__(self, host, port=1883, username=None, password=None, client_id="agv-dispatcher"):
+        import paho.mqtt.client as mqtt
+        self.client = mqtt.Client(client_id=client_id)
+        if username:
+            self.client.username_pw_set(username, password)
+        self._subscriptions = []
+        self.client.on_connect = self._on_connect
+        self.client.on_message = self._on_message
+        self.client.connect(host, port, 60)
+
+    def _on_connect(self, client, userdata, flags, rc):
+        if rc == 0:
+            log.info("✅ MQTT 브로커 연결 성공")
+            for pattern, _ in self._subscriptions:
+                client.subscribe(pattern, 1)
+        else:
+            log.error("❌ MQTT 연결 실패: %s", rc)
+
+    def _on_message(self, client, userdata, msg):
+        for pattern, callback in self._subscriptions:
+            if topic_matches(pattern, msg.topic):
+                callback(msg.topic, msg.payload.decode('utf-8'))
+
+    def subscribe(self, pattern, callback):
+        self._subscriptions.append((pattern, callback))
+        self.client.subscribe(pattern, 1)
+
+    def publish(self, topic, payload, qos=1):
+        self.client.publish(topic, payload, qos)
+
+    def start(self):
+        self.client.loop_start()
+
+    def stop(self):
+        self.client.loop_stop()
+        self.client.disconnect()
+
+def parse_fleet(values):
+    """["rp5_1:1", "rp5_1:2"] -> [("rp5_1", "1"), ("rp5_1", "2")]"""
+    fleet = []
+    for value in values:
+        pi_id, _, agv_id = value.partition(':')
+        if not agv_id:
+            raise argparse.ArgumentTypeError(f"--fleet 형식은 <라즈베리파이 ID>:<AGV ID>: {value}")
+        fleet.append((pi_id, agv_id))
+    return fleet
+
+def main():
+    parser = argparse.ArgumentParser(description="AGV 배송 작업 디스패처")
+    parser.add_argument("--broker", default="localhost", help="MQTT 브로커 주소")
+    parser.add_argument("--port", type=int, default=1883)
+    parser.add_argument("--username", default=None)
+    parser.add_argument("--password", default=None)
+    parser.add_argument("--fleet", action="append", default=[], help="배정 대상 AGV (<라즈베리파이 ID>:<AGV ID>, 반복 지정)")
+    parser.add_argument("--jobs", default=None, help="초기 작업 목록 JSON 파일")
+    parser.add_argument("--route-stats", default="route_stats.json", help="경로별 소요 시간 저장 파일")
+    parser.add_argument("--batch-max-items", type=int, default=BATCH_MAX_ITEMS)
+    parser.add_argument("--log-level", default="INFO")
+    args = parser.parse_args()
+
+    setup_logging(args.log_level)
+
+    route_stats = RouteStats(args.route_stats)
+    route_stats.load()
+
+    transport = MqttTransport(args.broker, args.port, args.username, args.password)
+    dispatcher = Dispatcher(transport.publish, route_stats, parse_fleet(args.fleet), args.batch_max_items)
+    dispatcher.attach(transport)
+    transport.start()
+
+    if args.jobs:
+        with open(args.jobs, 'r', encoding='utf-8') as f:
+            dispatcher.add_jobs(json.load(f))
+
+    stop_event = threading.Event()
+    try:
+        dispatcher.run_forever(stop_event)
+    except KeyboardInterrupt:
+        log.info("디스패처 종료")
+    finally:
+        stop_event.set()
+        transport.stop()
+
+if __name__ == "__main__":
+    main()
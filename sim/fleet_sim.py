@@ -0,0 +1,367 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+헤드리스 플릿 시뮬레이터 - 가상 AGV N대 + 실제 RaspberryPiBridge 로 브릿지 확장성 측정 (로봇 / 카메라 불필요)
+
+구성:
+  브로커: mini_broker.py 하위 프로세스 (또는 --broker 로 외부 브로커)
+  브릿지: rp5/rp5.py 의 RaspberryPiBridge 를 하위 프로세스로 실행 (임시 디렉토리에 이미지 / 작업 로그 기록)
+  가상 AGV: agv/mqtt_manager.py 의 MQTTManager + 합성 카메라 (움직이는 노이즈 프레임)
+           대기 → 작업 시작 → 운행 중 확률적 충돌 → 작업 완료 를 반복
+  관측: agv/+/sensing 과 raspberrypi/status/+ 를 함께 구독해 이벤트 (start/col/end) 를 짝지음
+
+단계별 (--agvs 의 N 마다 브릿지를 새로 띄워 측정) 출력:
+  이벤트 종단 지연 (AGV 송신 시각 → 서버 상태 토픽 수신) p50 / p90 / p99
+  브릿지 CPU 사용률 (/proc/{pid}/stat), 디스크 기록량 (저장 디렉토리 증가분, /proc/{pid}/io)
+  유실 이벤트 (센싱 토픽에 나갔지만 상태 토픽으로 전달되지 않은 이벤트), AGV 송신 큐 폐기 수
+
+사용법: python fleet_sim.py [--agvs 1,4,8,16] [--stage-duration 60] [--trip-time 8,20] [--idle-time 1,4]
+                            [--collision-rate 0.05] [--image-size 640x480] [--broker 호스트:포트] [--output 결과.json]
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import paho.mqtt.client as mqtt
+
+SIM_DIR = os.path.dirname(os.path.abspath(__file__))
+AGV_DIR = os.path.join(SIM_DIR, "..", "agv")
+RP5_DIR = os.path.join(SIM_DIR, "..", "rp5")
+
+SIM_PI_ID = "sim_pi"
+BRIDGE_READY_TIMEOUT = 15.0  # 브릿지 하트비트 대기 (초)
+DRAIN_GRACE = 3.0  # 단계 종료 후 남은 이벤트 전달 대기 (초)
+
+class SyntheticCamera:
+    """camera.value 로 매번 조금씩 이동한 노이즈 프레임 반환 (인코더의 변화 없는 프레임 생략을 피함)"""
+
+    def __init__(self, width, height, seed=0):
+        rng = np.random.default_rng(seed)
+        self._base = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+        self._offset = 0
+
+    @property
+    def value(self):
+        self._offset = (self._offset + 7) % self._base.shape[1]
+        return np.roll(self._base, self._offset, axis=1)
+
+class VirtualAgv:
+    def __init__(self, agv_id, host, port, camera, journal_path, trip_time, idle_time, collision_rate, seed):
+        from mqtt_manager import MQTTManager
+        self.agv_id = agv_id
+        self.mqtt = MQTTManager(camera=camera, agv_id=agv_id, broker_address=host, broker_port=port,
+                                journal_path=journal_path)
+        self.trip_time = trip_time
+        self.idle_time = idle_time
+        self.collision_rate = collision_rate
+        self.rng = random.Random(seed)
+        self.trips = 0
+        self.collisions = 0
+        self._thread = None
+
+    def start(self, stop_event):
+        self.mqtt.connect()
+        self._thread = threading.Thread(target=self._run, args=(stop_event,), name=f"sim-agv-{self.agv_id}",
+                                        daemon=True)
+        self._thread.start()
+
+    def _run(self, stop_event):
+        from config import SENSING_INTERVAL
+        while not stop_event.wait(self.rng.uniform(*self.idle_time)):
+            self.mqtt.start_sensing_transmission()
+            trip_end = time.monotonic() + self.rng.uniform(*self.trip_time)
+            while time.monotonic() < trip_end and not stop_event.wait(0.1):
+                # 초당 collision_rate 확률
+                if self.rng.random() < self.collision_rate * 0.1:
+                    self.mqtt.trigger_collision()
+                    self.collisions += 1
+            # 진행 중인 운행은 단계가 끝나도 완료 신호까지 보냄
+            self.mqtt.set_task_finished()
+            sensing_thread = self.mqtt.sensing_thread
+            if sensing_thread is not None:
+                sensing_thread.join(timeout=SENSING_INTERVAL * 4)
+            self.mqtt.stop_sensing_transmission()
+            self.trips += 1
+
+    def join(self):
+        if self._thread is not None:
+            self._thread.join()
+
+    def close(self):
+        self.mqtt.disconnect()
+
+class EventMonitor:
+    """AGV 가 보낸 이벤트와 브릿지가 서버로 올린 이벤트를 짝지어 종단 지연 / 유실 집계"""
+
+    def __init__(self, host, port):
+        import sensing_protocol
+        self._unpack = sensing_protocol.unpack
+        self._lock = threading.Lock()
+        self.sent = {}  # (agv_id, work_id, cmd_string) -> AGV 송신 시각
+        self.latencies = []
+        self.unmatched_status = 0
+        self.heartbeat = threading.Event()
+
+        self.client = mqtt.Client(client_id="fleet_sim_monitor")
+        self.client.on_connect = self._on_connect
+        self.client.on_message = self._on_message
+        self.client.connect(host, port, 60)
+        self.client.loop_start()
+
+    def _on_connect(self, client, userdata, flags, rc):
+        client.subscribe([("agv/+/sensing", 1), ("raspberrypi/status/+", 1), ("raspberrypi/heartbeat", 1)])
+
+    def _on_message(self, client, userdata, msg):
+        now = time.time()
+        try:
+            if msg.topic == "raspberrypi/heartbeat":
+                self.heartbeat.set()
+            elif msg.topic.startswith("agv/"):
+                header, _ = self._unpack(msg.payload)
+                if header["cmd_string"]:
+                    key = (msg.topic.split('/')[1], header["workId"], header["cmd_string"])
+                    with self._lock:
+                        self.sent.setdefault(key, header["time_ms"] / 1000.0)
+            else:
+                data = json.loads(msg.payload.decode('utf-8'))
+                if data.get("type") != "event" or not data.get("cmd_string"):
+                    return
+                key = (str(data["agv_id"]), data.get("work_id"), data["cmd_string"])
+                with self._lock:
+                    sent_at = self.sent.pop(key, None)
+                    if sent_at is None:
+                        self.unmatched_status += 1
+                    else:
+                        self.latencies.append(now - sent_at)
+        except Exception:
+            pass
+
+    def take(self):
+        """현재까지 집계 반환 후 초기화 - (지연 목록, 전달되지 않은 이벤트 수, 짝 없는 상태 이벤트 수)"""
+        with self._lock:
+            latencies, self.latencies = self.latencies, []
+            pending, self.sent = len(self.sent), {}
+            unmatched, self.unmatched_status = self.unmatched_status, 0
+        return latencies, pending, unmatched
+
+    def close(self):
+        self.client.loop_stop()
+        self.client.disconnect()
+
+def percentiles(values):
+    if not values:
+        return None
+    arr = np.array(values) * 1000.0
+    return {
+        "count": len(values),
+        "p50_ms": round(float(np.percentile(arr, 50)), 1),
+        "p90_ms": round(float(np.percentile(arr, 90)), 1),
+        "p99_ms": round(float(np.percentile(arr, 99)), 1),
+        "max_ms": round(float(arr.max()), 1),
+    }
+
+def process_cpu_seconds(pid):
+    """/proc/{pid}/stat 의 utime + stime (초) - 없으면 None"""
+    try:
+        with open(f"/proc/{pid}/stat", 'r') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+def process_write_bytes(pid):
+    """/proc/{pid}/io 의 write_bytes - 없으면 None"""
+    try:
+        with open(f"/proc/{pid}/io", 'r') as f:
+            for line in f:
+                if line.startswith("write_bytes:"):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return None
+
+def directory_bytes(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+def delta(end, start):
+    return None if end is None or start is None else end - start
+
+def start_broker(port):
+    process = subprocess.Popen([sys.executable, os.path.join(SIM_DIR, "mini_broker.py"), "--port", str(port)])
+    time.sleep(0.5)
+    return process
+
+def start_bridge(host, port, save_dir):
+    return subprocess.Popen([sys.executable, os.path.abspath(__file__), "--role", "bridge",
+                             "--broker", f"{host}:{port}", "--save-dir", save_dir])
+
+def stop_process(process, timeout=10.0):
+    if process.poll() is not None:
+        return
+    process.send_signal(signal.SIGINT)
+    try:
+        process.wait(timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+def run_stage(num_agvs, args, host, port, work_dir, monitor):
+    save_dir = os.path.join(work_dir, f"bridge_{num_agvs}")
+    monitor.heartbeat.clear()
+    bridge = start_bridge(host, port, save_dir)
+    agvs = []
+    try:
+        if not monitor.heartbeat.wait(BRIDGE_READY_TIMEOUT):
+            raise RuntimeError("브릿지 연결 대기 시간 초과")
+        time.sleep(0.5)  # 로컬 구독 완료 대기
+        monitor.take()
+
+        width, height = args.image_size
+        stop_event = threading.Event()
+        for agv_id in range(1, num_agvs + 1):
+            agv = VirtualAgv(
+                agv_id, host, port, SyntheticCamera(width, height, seed=agv_id),
+                os.path.join(work_dir, f"journal_{num_agvs}_{agv_id}.jsonl"),
+                args.trip_time, args.idle_time, args.collision_rate, seed=args.seed * 1000 + agv_id
+            )
+            agv.start(stop_event)
+            agvs.append(agv)
+
+        cpu_start = process_cpu_seconds(bridge.pid)
+        io_start = process_write_bytes(bridge.pid)
+        disk_start = directory_bytes(save_dir)
+        wall_start = time.monotonic()
+
+        time.sleep(args.stage_duration)
+        stop_event.set()
+        for agv in agvs:
+            agv.join()
+        time.sleep(DRAIN_GRACE)
+
+        wall = time.monotonic() - wall_start
+        cpu = delta(process_cpu_seconds(bridge.pid), cpu_start)
+        io_bytes = delta(process_write_bytes(bridge.pid), io_start)
+        disk_bytes = directory_bytes(save_dir) - disk_start
+        latencies, undelivered, unmatched = monitor.take()
+
+        queue_dropped = 0
+        for agv in agvs:
+            queue_dropped += sum(agv.mqtt.get_publish_queue_stats()["dropped"].values())
+
+        return {
+            "agvs": num_agvs,
+            "duration_sec": round(wall, 1),
+            "trips": sum(agv.trips for agv in agvs),
+            "collisions_triggered": sum(agv.collisions for agv in agvs),
+            "event_latency": percentiles(latencies),
+            "events_delivered": len(latencies),
+            "events_dropped": undelivered,
+            "status_events_unmatched": unmatched,
+            "agv_queue_dropped": queue_dropped,
+            "bridge_cpu_percent": None if cpu is None else round(cpu / wall * 100.0, 1),
+            "disk_bytes_per_sec": round(disk_bytes / wall, 1),
+            "io_write_bytes_per_sec": None if io_bytes is None else round(io_bytes / wall, 1),
+        }
+    finally:
+        for agv in agvs:
+            agv.close()
+        stop_process(bridge)
+
+def run_bridge(args):
+    """--role bridge: 하위 프로세스에서 실제 RaspberryPiBridge 실행"""
+    sys.path.insert(0, RP5_DIR)
+    from structured_logging import setup_logging
+    from rp5 import RaspberryPiBridge
+    setup_logging(args.log_level)
+
+    host, port = parse_broker(args.broker)
+    bridge = RaspberryPiBridge(raspberry_pi_id=SIM_PI_ID, server_broker=(host, port, None, None),
+                               local_broker=(host, port), image_save_path=args.save_dir)
+    bridge.run()
+
+def parse_broker(text):
+    host, _, port = text.rpartition(':')
+    return host or "127.0.0.1", int(port)
+
+def parse_range(text):
+    low, _, high = text.partition(',')
+    return float(low), float(high or low)
+
+def parse_size(text):
+    width, _, height = text.lower().partition('x')
+    return int(width), int(height)
+
+def main():
+    parser = argparse.ArgumentParser(description="가상 AGV 플릿으로 라즈베리파이 브릿지 확장성 측정")
+    parser.add_argument("--agvs", default="1,4,8,16", help="단계별 가상 AGV 수 (쉼표 구분)")
+    parser.add_argument("--stage-duration", type=float, default=60.0, help="단계별 측정 시간 (초)")
+    parser.add_argument("--trip-time", type=parse_range, default=(8.0, 20.0), help="운행 시간 범위 (최소,최대 초)")
+    parser.add_argument("--idle-time", type=parse_range, default=(1.0, 4.0), help="운행 간 대기 범위 (최소,최대 초)")
+    parser.add_argument("--collision-rate", type=float, default=0.05, help="운행 중 초당 충돌 확률")
+    parser.add_argument("--image-size", type=parse_size, default=(640, 480), help="합성 카메라 크기 (가로x세로)")
+    parser.add_argument("--broker", default=None, help="외부 브로커 호스트:포트 (생략 시 mini_broker.py 실행)")
+    parser.add_argument("--broker-port", type=int, default=18830, help="mini_broker.py 포트")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--output", default=None, help="결과 JSON 저장 경로")
+    parser.add_argument("--role", choices=("fleet", "bridge"), default="fleet", help=argparse.SUPPRESS)
+    parser.add_argument("--save-dir", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.role == "bridge":
+        run_bridge(args)
+        return
+
+    sys.path.insert(0, AGV_DIR)
+    from structured_logging import setup_logging
+    setup_logging(args.log_level)
+
+    broker = None
+    if args.broker:
+        host, port = parse_broker(args.broker)
+    else:
+        host, port = "127.0.0.1", args.broker_port
+        broker = start_broker(port)
+
+    work_dir = tempfile.mkdtemp(prefix="fleet_sim_")
+    monitor = EventMonitor(host, port)
+    results = []
+    try:
+        for num_agvs in (int(n) for n in args.agvs.split(",")):
+            result = run_stage(num_agvs, args, host, port, work_dir, monitor)
+            results.append(result)
+            print(f"AGV {num_agvs}대: 이벤트 p99 {(result['event_latency'] or {}).get('p99_ms')}ms | "
+                  f"유실 {result['events_dropped']} | 브릿지 CPU {result['bridge_cpu_percent']}% | "
+                  f"디스크 {result['disk_bytes_per_sec'] / 1024:.1f}KB/s", file=sys.stderr)
+    finally:
+        monitor.close()
+        if broker is not None:
+            stop_process(broker)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    text = json.dumps(results, ensure_ascii=False, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+시험용 MQTT 3.1.1 브로커 (asyncio, 외부 의존성 없음) - mosquitto 가 없는 환경에서 fleet_sim.py 의 브로커 대역
+
+지원: CONNECT / SUBSCRIBE / UNSUBSCRIBE / PUBLISH (QoS 0, 1, 2) / PINGREQ / DISCONNECT, 토픽 필터 +, #
+미지원: 인증 (사용자/비밀번호는 무시), retain, will, 세션 유지, 구독자 측 QoS 1 재전송
+구독자로 전달할 때 QoS 는 min(발행 QoS, 구독 QoS, 1)
+
+사용법: python mini_broker.py [--host 127.0.0.1] [--port 1883]
+"""
+
+import argparse
+import asyncio
+import struct
+
+CONNECT, CONNACK, PUBLISH, PUBACK, PUBREC, PUBREL, PUBCOMP = 1, 2, 3, 4, 5, 6, 7
+SUBSCRIBE, SUBACK, UNSUBSCRIBE, UNSUBACK, PINGREQ, PINGRESP, DISCONNECT = 8, 9, 10, 11, 12, 13, 14
+
+def topic_matches(pattern, topic):
+    """MQTT 토픽 필터 매칭 (+: 한 단계, #: 나머지 전체)"""
+    pattern_parts = pattern.split('/')
+    topic_parts = topic.split('/')
+    for i, part in enumerate(pattern_parts):
+        if part == '#':
+            return True
+        if i >= len(topic_parts) or (part != '+' and part != topic_parts[i]):
+            return False
+    return len(pattern_parts) == len(topic_parts)
+
+def encode_length(length):
+    out = bytearray()
+    while True:
+        byte = length % 128
+        length //= 128
+        out.append(byte | 0x80 if length else byte)
+        if not length:
+            return bytes(out)
+
+def packet(packet_type, flags, body=b''):
+    return bytes([(packet_type << 4) | flags]) + encode_length(len(body)) + body
+
+def read_string(data, offset):
+    (length,) = struct.unpack_from('!H', data, offset)
+    start = offset + 2
+    return data[start:start + length].decode('utf-8'), start + length
+
+class Session:
+    def __init__(self, writer):
+        self.writer = writer
+        self.client_id = None
+        self.subscriptions = {}  # 토픽 필터 -> QoS
+        self.next_packet_id = 0
+
+    def packet_id(self):
+        self.next_packet_id = self.next_packet_id % 0xFFFF + 1
+        return self.next_packet_id
+
+    def deliver(self, topic, payload, qos):
+        granted = max((q for f, q in self.subscriptions.items() if topic_matches(f, topic)), default=None)
+        if granted is None:
+            return False
+        qos = min(qos, granted, 1)
+        body = struct.pack('!H', len(topic.encode('utf-8'))) + topic.encode('utf-8')
+        if qos:
+            body += struct.pack('!H', self.packet_id())
+        self.writer.write(packet(PUBLISH, qos << 1, body + payload))
+        return True
+
+class MiniBroker:
+    def __init__(self, host="127.0.0.1", port=1883):
+        self.host = host
+        self.port = port
+        self.sessions = set()
+        self.server = None
+
+        self.messages_in = 0
+        self.messages_out = 0
+        self.bytes_in = 0
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        # port=0 이면 OS 가 배정한 포트
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    def stats(self):
+        return {
+            "clients": len(self.sessions),
+            "messages_in": self.messages_in,
+            "messages_out": self.messages_out,
+            "bytes_in": self.bytes_in,
+        }
+
+    async def _read_packet(self, reader):
+        first = await reader.readexactly(1)
+        length, multiplier = 0, 1
+        while True:
+            byte = (await reader.readexactly(1))[0]
+            length += (byte & 0x7F) * multiplier
+            if not byte & 0x80:
+                break
+            multiplier *= 128
+        body = await reader.readexactly(length) if length else b''
+        return first[0] >> 4, first[0] & 0x0F, body
+
+    async def _handle_client(self, reader, writer):
+        session = Session(writer)
+        self.sessions.add(session)
+        try:
+            while True:
+                packet_type, flags, body = await self._read_packet(reader)
+                if packet_type == CONNECT:
+                    self._on_connect(session, body)
+                elif packet_type == PUBLISH:
+                    self._on_publish(session, flags, body)
+                elif packet_type == PUBREL:
+                    writer.write(packet(PUBCOMP, 0, body[:2]))
+                elif packet_type == SUBSCRIBE:
+                    self._on_subscribe(session, body)
+                elif packet_type == UNSUBSCRIBE:
+                    self._on_unsubscribe(session, body)
+                elif packet_type == PINGREQ:
+                    writer.write(packet(PINGRESP, 0))
+                elif packet_type == DISCONNECT:
+                    break
+                # PUBACK / PUBREC / PUBCOMP (구독자 응답) 은 무시 - 재전송하지 않음
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.sessions.discard(session)
+            writer.close()
+
+    def _on_connect(self, session, body):
+        _, offset = read_string(body, 0)  # 프로토콜 이름
+        offset += 4  # 프로토콜 레벨, 연결 플래그, keep-alive
+        session.client_id, _ = read_string(body, offset)
+        session.writer.write(packet(CONNACK, 0, b'\x00\x00'))
+
+    def _on_publish(self, session, flags, body):
+        qos = (flags >> 1) & 0x03
+        topic, offset = read_string(body, 0)
+        if qos:
+            packet_id = body[offset:offset + 2]
+            offset += 2
+            session.writer.write(packet(PUBACK if qos == 1 else PUBREC, 0, packet_id))
+        payload = body[offset:]
+
+        self.messages_in += 1
+        self.bytes_in += len(payload)
+        for target in list(self.sessions):
+            if target.deliver(topic, payload, qos):
+                self.messages_out += 1
+
+    def _on_subscribe(self, session, body):
+        packet_id = body[:2]
+        offset, granted = 2, bytearray()
+        while offset < len(body):
+            topic_filter, offset = read_string(body, offset)
+            qos = min(body[offset], 1)
+            offset += 1
+            session.subscriptions[topic_filter] = qos
+            granted.append(qos)
+        session.writer.write(packet(SUBACK, 0, packet_id + bytes(granted)))
+
+    def _on_unsubscribe(self, session, body):
+        offset = 2
+        while offset < len(body):
+            topic_filter, offset = read_string(body, offset)
+            session.subscriptions.pop(topic_filter, None)
+        session.writer.write(packet(UNSUBACK, 0, body[:2]))
+
+def main():
+    parser = argparse.ArgumentParser(description="시험용 MQTT 브로커")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1883)
+    args = parser.parse_args()
+
+    broker = MiniBroker(args.host, args.port)
+    try:
+        asyncio.run(broker.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()